@@ -0,0 +1 @@
+"""Offline performance checks for the backend (run from the backend directory)."""
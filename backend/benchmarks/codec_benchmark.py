@@ -0,0 +1,96 @@
+"""
+Micro-benchmark: snapshot codec vs. the original hand-written datetime loops.
+
+Usage (from the backend directory):
+    python -m benchmarks.codec_benchmark [--nodes 10000] [--repeat 5]
+
+Builds a synthetic map in memory, so the real mindmap_data.json is never touched.
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+
+import server
+from server import MindMapData
+
+from benchmarks.synthetic import build_synthetic_map
+
+
+# The pre-codec implementation, kept verbatim in spirit as the baseline
+DATETIME_FIELDS = {
+    'topics': ('created_at', 'updated_at', 'last_updated'),
+    'cases': ('created_at', 'updated_at', 'encounter_date'),
+    'tasks': ('created_at', 'updated_at', 'due_date'),
+    'literature': ('created_at', 'updated_at'),
+}
+
+
+def legacy_encode(data: MindMapData) -> str:
+    data_dict = data.dict()
+    for collection, fields in DATETIME_FIELDS.items():
+        for item in data_dict.get(collection, []):
+            for field in fields:
+                if field in item and item[field]:
+                    item[field] = item[field].isoformat()
+    return json.dumps(data_dict, indent=2, ensure_ascii=False, default=str)
+
+
+def legacy_decode(raw: str) -> MindMapData:
+    data = json.loads(raw)
+    for collection, fields in DATETIME_FIELDS.items():
+        for item in data.get(collection, []):
+            for field in fields:
+                if field in item and item[field]:
+                    item[field] = datetime.fromisoformat(item[field].replace('Z', '+00:00'))
+    return MindMapData(**data)
+
+
+def best_of(repeat: int, func, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run(nodes: int, repeat: int) -> dict:
+    data = build_synthetic_map(nodes)
+    legacy_raw = legacy_encode(data)
+    codec_raw = server.encode_mind_map(data, 1)
+
+    # Both codecs must round-trip to the same map before timing means anything
+    assert legacy_decode(legacy_raw) == server.decode_mind_map(codec_raw)[0] == data
+
+    results = {
+        'nodes': nodes,
+        'legacy_save_s': best_of(repeat, legacy_encode, data),
+        'codec_save_s': best_of(repeat, server.encode_mind_map, data, 1),
+        'legacy_load_s': best_of(repeat, legacy_decode, legacy_raw),
+        'codec_load_s': best_of(repeat, server.decode_mind_map, codec_raw),
+        'legacy_bytes': len(legacy_raw.encode('utf-8')),
+        'codec_bytes': len(codec_raw),
+    }
+    results['save_speedup'] = results['legacy_save_s'] / results['codec_save_s']
+    results['load_speedup'] = results['legacy_load_s'] / results['codec_load_s']
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(args.nodes, args.repeat)
+    print(f"Synthetic map: {results['nodes']} nodes")
+    print(f"  save  legacy {results['legacy_save_s'] * 1000:8.1f} ms   codec {results['codec_save_s'] * 1000:8.1f} ms"
+          f"   x{results['save_speedup']:.1f}")
+    print(f"  load  legacy {results['legacy_load_s'] * 1000:8.1f} ms   codec {results['codec_load_s'] * 1000:8.1f} ms"
+          f"   x{results['load_speedup']:.1f}")
+    print(f"  size  legacy {results['legacy_bytes'] / 1024:8.0f} KiB  codec {results['codec_bytes'] / 1024:8.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+"""
+Load test: the ASGI app in-process under concurrent clients, on synthetic maps.
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test [--sizes 100,10000,100000] [--clients 8] [--duration 5]
+                                   [--output results.json] [--compare baseline.json]
+
+Runs against a scratch MINDMAP_DATA_DIR, so the real mindmap_data.json and uploads
+are never touched. For each map size it times load_mind_map_data/save_mind_map_data
+directly and the main endpoints through httpx's ASGI transport, then reports p50/p99
+latency, throughput and peak RSS. Results are written as JSON; --compare exits with
+status 1 when a scenario's p50 or p99 is worse than that baseline by more than
+--tolerance (and --min-delta-ms).
+
+benchmarks/baseline.json is the committed reference run. Latencies only compare on
+the same machine, so regenerate it before checking a change: on the commit the change
+is based on, run with --output benchmarks/baseline.json; then, with the change, run
+with --compare benchmarks/baseline.json.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+# Title swapped into the pre-encoded PUT body, same length every time
+PUT_MARKER = 'BENCH-TITLE-000000'
+UPLOAD_BYTES = 1024 * 1024
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an unsorted list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def summarize(latencies: list, errors: int, wall: float) -> dict:
+    if not latencies:
+        return {'count': 0, 'errors': errors}
+    return {
+        'count': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'max_ms': round(max(latencies) * 1000, 3),
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else None,
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process so far; None where it cannot be measured"""
+    try:
+        import resource  # POSIX only
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        # Windows reports the peak working set
+        peak = getattr(psutil.Process().memory_info(), 'peak_wset', None)
+        return None if peak is None else round(peak / (1024 * 1024), 1)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def time_calls(func, duration: float, max_calls: int) -> dict:
+    """Call func back to back until duration or max_calls runs out (at least once)"""
+    latencies = []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    while not latencies or (len(latencies) < max_calls and time.perf_counter() < deadline):
+        call_started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, 0, time.perf_counter() - started)
+
+
+async def run_clients(clients: int, duration: float, max_requests: int, request) -> dict:
+    """clients concurrent loops issuing request(sequence) until duration or max_requests runs out"""
+    latencies = []
+    errors = 0
+    issued = 0
+    deadline = time.perf_counter() + duration
+
+    async def client() -> None:
+        nonlocal errors, issued
+        while issued < max_requests and (issued == 0 or time.perf_counter() < deadline):
+            issued += 1
+            started = time.perf_counter()
+            try:
+                response = await request(issued)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def synthetic_pdf(sequence: int) -> bytes:
+    """A PDF-looking body of UPLOAD_BYTES, unique per sequence so uploads never deduplicate"""
+    header = f'%PDF-1.4\n% benchmark upload {sequence}\n'.encode()
+    return header + os.urandom(UPLOAD_BYTES - len(header))
+
+
+async def run_size(server, build_synthetic_map, nodes: int, args) -> dict:
+    import httpx
+
+    started = time.perf_counter()
+    data = build_synthetic_map(nodes)
+    generate_s = time.perf_counter() - started
+    server.save_mind_map_data(data)
+    results = {'nodes': nodes, 'generate_s': round(generate_s, 3), 'direct': {}, 'http': {}}
+    print(f"{nodes} nodes (generated in {generate_s:.1f} s)")
+
+    def load_cold():
+        server.mindmap_store.invalidate()
+        server.load_mind_map_data()
+
+    topic = data.topics[0]
+    counter = iter(range(1, 1 << 62))
+
+    def save_one_change():
+        changed = topic.model_copy(update={'title': f'bench {next(counter)}'})
+        server.save_mind_map_data(data.model_copy(update={'topics': [changed, *data.topics[1:]]}))
+
+    direct = {
+        'load_mind_map_data_cold': load_cold,
+        'load_mind_map_data_warm': server.load_mind_map_data,
+        'save_mind_map_data_one_change': save_one_change,
+    }
+    for name, func in direct.items():
+        results['direct'][name] = time_calls(func, args.duration, args.requests)
+        report(name, results['direct'][name])
+
+    state = server.load_mind_map_state()
+    topic_ids = [item.id for item in state.data.topics]
+    put_data = state.data.model_copy(update={'topics': [state.data.topics[0].model_copy(update={'title': PUT_MARKER}),
+                                                        *state.data.topics[1:]]})
+    put_body = put_data.model_dump_json().encode()
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        etag = (await client.get('/api/mindmap-data')).headers.get('etag', '')
+
+        def put_mindmap(sequence):
+            marker = f'BENCH-TITLE-{sequence % 1000000:06d}'.encode()
+            return client.put('/api/mindmap-data', content=put_body.replace(PUT_MARKER.encode(), marker),
+                              headers={'Content-Type': 'application/json'})
+
+        scenarios = {
+            'GET /api/mindmap-data': lambda sequence: client.get('/api/mindmap-data'),
+            'GET /api/mindmap-data (304)': lambda sequence: client.get('/api/mindmap-data',
+                                                                        headers={'If-None-Match': etag}),
+            'GET /api/topics/{id}': lambda sequence: client.get(f'/api/topics/{topic_ids[sequence % len(topic_ids)]}'),
+            'PATCH /api/topics/{id}': lambda sequence: client.patch(
+                f'/api/topics/{topic_ids[sequence % len(topic_ids)]}', json={'title': f'patched {sequence}'}),
+            'PUT /api/mindmap-data': put_mindmap,
+            'POST /api/upload-pdf': lambda sequence: client.post(
+                '/api/upload-pdf', files={'pdf': (f'bench-{sequence}.pdf', synthetic_pdf(sequence),
+                                                  'application/pdf')}),
+        }
+        for name, request in scenarios.items():
+            if name.startswith('GET /api/mindmap-data (304)'):
+                # Writes from earlier scenarios move the ETag on
+                etag = (await client.get('/api/mindmap-data')).headers.get('etag', '')
+            results['http'][name] = await run_clients(args.clients, args.duration, args.requests, request)
+            report(name, results['http'][name])
+    results['peak_rss_mb'] = peak_rss_mb()
+    if results['peak_rss_mb'] is not None:
+        print(f"  peak RSS {results['peak_rss_mb']:.0f} MiB")
+    return results
+
+
+def report(name: str, stats: dict) -> None:
+    if not stats.get('count'):
+        print(f"  {name:<40} no samples")
+        return
+    print(f"  {name:<40} p50 {stats['p50_ms']:9.2f} ms  p99 {stats['p99_ms']:9.2f} ms"
+          f"  {stats['throughput_rps']:9.1f} req/s  n={stats['count']}"
+          + (f"  errors={stats['errors']}" if stats['errors'] else ''))
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    """
+    Scenarios whose p50 or p99 got worse than the baseline by more than tolerance
+    (and by at least min_delta_ms, so sub-millisecond jitter is not a regression)
+    """
+    regressions = []
+    for size, current in results['sizes'].items():
+        previous = baseline.get('sizes', {}).get(size)
+        if previous is None:
+            continue
+        for group in ('direct', 'http'):
+            for name, stats in current[group].items():
+                before = previous.get(group, {}).get(name)
+                if not before or not stats.get('count') or not before.get('count'):
+                    continue
+                for metric in ('p50_ms', 'p99_ms'):
+                    if (stats[metric] > before[metric] * (1 + tolerance)
+                            and stats[metric] - before[metric] >= min_delta_ms):
+                        regressions.append(f"{size} nodes, {name}: {metric} {before[metric]:.2f} -> {stats[metric]:.2f}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='100,10000,100000', help='comma-separated node counts')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent clients per HTTP scenario')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per scenario (at most)')
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario (at most)')
+    parser.add_argument('--output', type=Path, default=Path('benchmarks/results.json'))
+    parser.add_argument('--compare', type=Path, help='baseline JSON to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown before a regression')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='ignore slowdowns smaller than this')
+    args = parser.parse_args()
+
+    # Read up front: --output may name the same file
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+
+    if 'server' in sys.modules:
+        sys.exit("Run as a fresh process: the server module must be imported after MINDMAP_DATA_DIR is set")
+    scratch = tempfile.mkdtemp(prefix='mindmap-bench-')
+    os.environ['MINDMAP_DATA_DIR'] = scratch
+    # Nothing in the background competes with the measurements: no automatic
+    # snapshots, and uploads queue extraction jobs that no worker picks up
+    os.environ.setdefault('MINDMAP_HISTORY_INTERVAL', '0')
+    os.environ.setdefault('MINDMAP_PDF_WORKERS', '0')
+    import server
+    from benchmarks.synthetic import build_synthetic_map
+    logging.getLogger('server').setLevel(logging.WARNING)
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    async def run_all() -> dict:
+        await server.app.router.startup()
+        try:
+            return {str(nodes): await run_size(server, build_synthetic_map, nodes, args)
+                    for nodes in sorted(int(size) for size in args.sizes.split(','))}
+        finally:
+            await server.app.router.shutdown()
+
+    try:
+        sizes = asyncio.run(run_all())
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    results = {
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'clients': args.clients,
+        'sizes': sizes,
+    }
+    args.output.write_text(json.dumps(results, indent=2) + '\n')
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
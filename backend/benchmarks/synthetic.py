@@ -0,0 +1,110 @@
+"""
+Synthetic mind maps for benchmarks: the node mix, text lengths and link density
+of a resident's real map, generated deterministically from a seed.
+"""
+import random
+from datetime import datetime, timedelta
+
+from server import Literature, MindMapData, PatientCase, PsychiatricTopic, Task
+
+CLINICAL_TERMS = (
+    "depression anxiety psychosis mania hypomania insomnia anhedonia irritability rumination panic "
+    "avoidance hypervigilance flashbacks dissociation catatonia delusions hallucinations paranoia "
+    "lithium valproate lamotrigine quetiapine olanzapine aripiprazole clozapine sertraline fluoxetine "
+    "escitalopram venlafaxine bupropion mirtazapine buspirone lorazepam CBT DBT psychodynamic "
+    "supportive formulation transference countertransference alliance rupture repair insight "
+    "adherence relapse remission titration augmentation side-effects akathisia weight sedation "
+    "suicidality safety-plan collateral family housing substance alcohol cannabis withdrawal"
+).split()
+FILLER = "the a with and of for after during since over patient reports denies describes notes".split()
+DIAGNOSES = (
+    "Major Depressive Disorder", "Generalized Anxiety Disorder", "Bipolar I Disorder", "Bipolar II Disorder",
+    "Schizophrenia", "Schizoaffective Disorder", "PTSD", "OCD", "Panic Disorder", "Borderline Personality Disorder",
+    "ADHD", "Alcohol Use Disorder", "Anorexia Nervosa", "Adjustment Disorder",
+)
+CATEGORIES = ("Mood Disorders", "Anxiety Disorders", "Psychotic Disorders", "Personality Disorders",
+              "Substance Use", "Psychopharmacology", "Psychotherapy", "Neurodevelopmental")
+
+
+def build_synthetic_map(nodes: int, seed: int = 7) -> MindMapData:
+    """
+    Roughly the mix of a real map: 20% topics, 40% cases, 25% tasks, 15% literature.
+    Cases link 1-3 topics and literature 1-2; tasks point at a case or a topic; drawn
+    connections follow those links plus some topic-to-topic ones (about 3 links per node).
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+
+    def sentence(words: int) -> str:
+        picked = [rng.choice(CLINICAL_TERMS) if rng.random() < 0.6 else rng.choice(FILLER) for _ in range(words)]
+        return ' '.join(picked).capitalize() + '.'
+
+    def text(words: int) -> str:
+        sentences = []
+        while words > 0:
+            length = min(words, rng.randint(6, 18))
+            sentences.append(sentence(length))
+            words -= length
+        return ' '.join(sentences)
+
+    def position() -> dict:
+        return {"x": rng.uniform(-5000, 5000), "y": rng.uniform(-5000, 5000)}
+
+    def stamp() -> datetime:
+        return start + timedelta(minutes=rng.randrange(500000))
+
+    topics = [
+        PsychiatricTopic(title=f"{rng.choice(DIAGNOSES)} {rng.choice(CLINICAL_TERMS)}", category=rng.choice(CATEGORIES),
+                         description=text(20), position=position(), definition=text(40),
+                         diagnostic_criteria=[sentence(8) for _ in range(5)],
+                         tags=', '.join(rng.sample(CLINICAL_TERMS, 3)), created_at=stamp(), updated_at=stamp(),
+                         last_updated=stamp())
+        for _ in range(max(1, nodes * 20 // 100))
+    ]
+    topic_ids = [topic.id for topic in topics]
+    cases = [
+        PatientCase(case_id=f"CASE-{i:05d}", encounter_date=stamp(), primary_diagnosis=rng.choice(DIAGNOSES),
+                    age=rng.randint(16, 85), gender=rng.choice(("Female", "Male", "Non-binary")),
+                    chief_complaint=sentence(8), history_present_illness=text(60), therapy_progress=text(40),
+                    clinical_reflection=text(40),
+                    linked_topics=rng.sample(topic_ids, min(rng.randint(1, 3), len(topic_ids))),
+                    timeline=[{"date": stamp().isoformat(), "note": sentence(10)} for _ in range(3)],
+                    position=position(), created_at=stamp(), updated_at=stamp())
+        for i in range(nodes * 40 // 100)
+    ]
+    tasks = []
+    for _ in range(nodes * 25 // 100):
+        on_case = cases and rng.random() < 0.5
+        tasks.append(Task(title=sentence(4), description=text(15), due_date=stamp(),
+                          linked_case_id=rng.choice(cases).id if on_case else None,
+                          linked_topic_id=None if on_case else rng.choice(topic_ids),
+                          position=position(), created_at=stamp(), updated_at=stamp()))
+    literature = [
+        Literature(title=sentence(8), authors=', '.join(f"{rng.choice('ABCDEFGHKLMNPRST')}. {rng.choice(FILLER).title()}"
+                                                         for _ in range(3)),
+                   publication=rng.choice(("Am J Psychiatry", "JAMA Psychiatry", "Lancet Psychiatry", "BMJ")),
+                   abstract=text(80), year=rng.randrange(1990, 2025),
+                   linked_topics=rng.sample(topic_ids, min(rng.randint(1, 2), len(topic_ids))), position=position(),
+                   created_at=stamp(), updated_at=stamp())
+        for _ in range(nodes * 15 // 100)
+    ]
+
+    connections = []
+
+    def connect(source: str, target: str) -> None:
+        connections.append({"id": f"conn-{len(connections)}", "source": source, "target": target, "label": ""})
+
+    for case in cases:
+        for topic_id in case.linked_topics:
+            connect(f"case-{case.id}", f"topic-{topic_id}")
+    for item in literature:
+        for topic_id in item.linked_topics:
+            connect(f"literature-{item.id}", f"topic-{topic_id}")
+    for task in tasks:
+        connect(f"task-{task.id}", f"case-{task.linked_case_id}" if task.linked_case_id
+                else f"topic-{task.linked_topic_id}")
+    for _ in range(len(topics) // 2):
+        source, target = rng.sample(topic_ids, 2) if len(topic_ids) > 1 else (topic_ids[0], topic_ids[0])
+        if source != target:
+            connect(f"topic-{source}", f"topic-{target}")
+    return MindMapData(topics=topics, cases=cases, tasks=tasks, literature=literature, connections=connections)
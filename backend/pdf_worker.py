@@ -0,0 +1,48 @@
+"""
+PDF text extraction for server.py's process pool. Spawned workers import the
+module of the function they run, so this one stays free of side effects: no
+app, store, data directories or exit hooks, just pypdf and the tokenizer the
+search indexes share.
+"""
+import re
+from typing import Any, Dict, List
+
+try:
+    import pypdf  # optional: text extraction for uploaded PDFs
+except ImportError:
+    pypdf = None
+
+PDF_SUMMARY_CHARS = 400
+_SEARCH_TOKEN = re.compile(r'\w+')
+
+
+def search_tokens(text: str) -> List[str]:
+    """Lower-cased word tokens, for both the entity search index and PDF term counts"""
+    return _SEARCH_TOKEN.findall(text.lower())
+
+
+def pdf_summary(text: str) -> str:
+    """The opening sentences of text, cut at a sentence end near PDF_SUMMARY_CHARS"""
+    text = ' '.join(text.split())
+    if len(text) <= PDF_SUMMARY_CHARS:
+        return text
+    cut = text.rfind('. ', 0, PDF_SUMMARY_CHARS)
+    return text[:cut + 1] if cut >= PDF_SUMMARY_CHARS // 2 else text[:PDF_SUMMARY_CHARS].rstrip() + '…'
+
+
+def extract_pdf_text(path: str, max_pages: int) -> Dict[str, Any]:
+    """Page count, summary and term counts of one PDF (only its first max_pages pages are read)"""
+    if pypdf is None:
+        raise RuntimeError("PDF text extraction needs the pypdf package")
+    reader = pypdf.PdfReader(path)
+    terms: Dict[str, int] = {}
+    opening = ''
+    chars = 0
+    for page in reader.pages[:max_pages]:
+        text = page.extract_text() or ''
+        chars += len(text)
+        if len(opening) < PDF_SUMMARY_CHARS * 2:
+            opening += ' ' + text[:PDF_SUMMARY_CHARS * 2]
+        for token in search_tokens(text):
+            terms[token] = terms.get(token, 0) + 1
+    return {"pages": len(reader.pages), "summary": pdf_summary(opening), "chars": chars, "terms": terms}
@@ -1,25 +1,227 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.datastructures import Headers
 from starlette.staticfiles import StaticFiles
 import os
 import json
+import re
 import logging
+import numpy as np
+import pandas as pd
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from pydantic_core import to_json
+from typing import List, Optional, Dict, Any, NamedTuple, Tuple, Union, BinaryIO
+import asyncio
+import atexit
+import base64
+import bisect
+import hashlib
+import heapq
+import itertools
+import math
+import mimetypes
+import multiprocessing
+import struct
 import uuid
 import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import partial
 from datetime import datetime
+from email.utils import formatdate
 from enum import Enum
 
-ROOT_DIR = Path(__file__).parent
+try:
+    import msgpack  # optional compact binary wire format
+except ImportError:
+    msgpack = None
+
+try:
+    import fcntl  # POSIX advisory file locks, to serialize writers across worker processes
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt  # Windows: the same serialization with a byte-range lock
+except ImportError:
+    msvcrt = None
+
+from pdf_worker import extract_pdf_text, search_tokens
+
+# Where the data file, uploads and other server state live (benchmarks point this at a scratch directory)
+ROOT_DIR = Path(os.environ.get('MINDMAP_DATA_DIR', Path(__file__).parent))
 
 # Local JSON file for mind map data storage
 MINDMAP_DATA_FILE = ROOT_DIR / 'mindmap_data.json'
+# Append-only change log next to the data file (see PERSISTENCE_MODE)
+MINDMAP_JOURNAL_FILE = ROOT_DIR / 'mindmap_data.journal'
+MINDMAP_COMPACTING_FILE = ROOT_DIR / 'mindmap_data.journal.compacting'
+# "journal": saves append only the changed entities and a background compaction
+# folds the log into a fresh snapshot; "snapshot": every save rewrites the file
+PERSISTENCE_MODE = os.environ.get('MINDMAP_PERSISTENCE', 'journal')
+JOURNAL_COMPACT_BYTES = int(os.environ.get('MINDMAP_JOURNAL_COMPACT_BYTES', 1024 * 1024))
+# Write-behind: when > 0, writes are acknowledged once applied in memory and the
+# accumulated changes are flushed to the backend at most once per this many ms.
+# Acknowledged writes from the last interval are lost if the process is killed;
+# meant for a single writer process (e.g. while nodes are being dragged around).
+WRITE_BEHIND_MS = int(os.environ.get('MINDMAP_WRITE_BEHIND_MS', 0))
+# "json" (MINDMAP_DATA_FILE + journal) or "sqlite" (MINDMAP_DB_FILE, migrated from the JSON on first start)
+STORAGE_BACKEND = os.environ.get('MINDMAP_STORAGE', 'json')
+MINDMAP_DB_FILE = ROOT_DIR / 'mindmap_data.db'
+# Held (flock) by whichever process is writing, so uvicorn workers take turns
+MINDMAP_LOCK_FILE = ROOT_DIR / 'mindmap_data.lock'
+# Reject writes that carry no If-Match/?revision= precondition (428) instead of last-writer-wins
+REQUIRE_WRITE_PRECONDITION = os.environ.get('MINDMAP_REQUIRE_IF_MATCH', '0') == '1'
 UPLOADS_DIR = ROOT_DIR / 'uploads'
 
+# Responses under /api larger than this are gzip-compressed for clients that accept it
+COMPRESSION_MIN_BYTES = int(os.environ.get('API_COMPRESSION_MIN_BYTES', 1024))
+# zlib level: 6 compresses map JSON nearly as well as 9 in a fraction of the time
+COMPRESSION_LEVEL = int(os.environ.get('API_COMPRESSION_LEVEL', 6))
+# Streams must reach the client as each line is written: gzip would hold lines back until zlib emits a block
+UNCOMPRESSED_API_PATHS = {'/api/mindmap-data/events', '/api/mindmap-data/stream', '/api/import-spreadsheet'}
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, 'application/x-msgpack')
+
+class ApiCompressionMiddleware:
+    """GZip for /api only: uploaded PDFs are already compressed and need byte ranges intact"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES, compresslevel: int = COMPRESSION_LEVEL):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'].startswith('/api') \
+                and scope['path'] not in UNCOMPRESSED_API_PATHS:
+            await self.gzip(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+# Uploaded files never change under a given name (blobs are named by their hash,
+# older uploads by a uuid), so they are cached as immutable and support byte
+# ranges, which lets PDF viewers fetch only the pages on screen.
+UPLOAD_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+UPLOAD_SEND_CHUNK_BYTES = 256 * 1024
+_BYTE_RANGE = re.compile(r'bytes=(\d*)-(\d*)$')
+_BLOB_NAME = re.compile(r'[0-9a-f]{64}')
+
+def _upload_etag(path: Path, stat_result: os.stat_result) -> str:
+    # A blob's name is its SHA-256: the ETag needs no extra hashing
+    if _BLOB_NAME.fullmatch(path.stem):
+        return f'"{path.stem}"'
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+def _byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(start, end inclusive) for a single "bytes=" range; None means serve the whole file"""
+    match = _BYTE_RANGE.match(header.replace(' ', ''))
+    if match is None:
+        return None  # multiple or non-byte ranges: a full 200 is always a valid answer
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes (none of an empty file, and bytes=-0 asks for none)
+        start, end = max(size - int(last), 0), (size - 1 if int(last) else -1)
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, headers={'Content-Range': f'bytes */{size}'})
+    return start, end
+
+class FileRangeResponse(Response):
+    """
+    Bytes start..end of a file. Sent with the ASGI zero-copy extension (sendfile)
+    when the server offers it, otherwise read in chunks on the I/O executor.
+    """
+
+    def __init__(self, path: Path, start: int, end: int, status_code: int, headers: Dict[str, str],
+                 send_body: bool = True):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.start = start
+        self.count = end - start + 1
+        self.send_body = send_body
+        self.raw_headers = [(name, value) for name, value in self.raw_headers if name != b'content-length']
+        self.raw_headers.append((b'content-length', str(self.count).encode('latin-1')))
+
+    async def __call__(self, scope, receive, send):
+        await send({'type': 'http.response.start', 'status': self.status_code, 'headers': self.raw_headers})
+        if not self.send_body or self.count == 0:
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        file = await run_io(open, self.path, 'rb')
+        try:
+            if 'http.response.zerocopy' in scope.get('extensions', {}):
+                await send({'type': 'http.response.zerocopy', 'file': file, 'offset': self.start,
+                            'count': self.count, 'more_body': False})
+                return
+            # The handle belongs to this response alone, so one seek and then sequential reads
+            # (portable, unlike os.pread, which Windows lacks)
+            await run_io(file.seek, self.start)
+            remaining = self.count
+            while remaining:
+                chunk = await run_io(file.read, min(UPLOAD_SEND_CHUNK_BYTES, remaining))
+                if not chunk:
+                    break  # truncated underneath us; the client sees a short body
+                remaining -= len(chunk)
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': bool(remaining)})
+            if remaining:
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            await run_io(file.close)
+
+class UploadFiles(StaticFiles):
+    """StaticFiles with strong ETags, immutable caching and single byte-range requests"""
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        path = Path(full_path)
+        size = stat_result.st_size
+        etag = _upload_etag(path, stat_result)
+        headers = {
+            'ETag': etag,
+            'Last-Modified': formatdate(stat_result.st_mtime, usegmt=True),
+            'Cache-Control': UPLOAD_CACHE_CONTROL,
+            'Accept-Ranges': 'bytes',
+        }
+        if_none_match = request_headers.get('if-none-match')
+        if if_none_match is not None:
+            if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+                return Response(status_code=304, headers=headers)
+        elif self.is_not_modified(Headers(headers), request_headers):
+            return Response(status_code=304, headers=headers)
+
+        media_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+        headers['Content-Type'] = media_type
+        byte_range = None
+        range_header = request_headers.get('range')
+        # If-Range: only honour the range when the client's copy is still current
+        if range_header and status_code == 200 and request_headers.get('if-range', etag) == etag:
+            try:
+                byte_range = _byte_range(range_header, size)
+            except HTTPException as e:
+                return Response(status_code=e.status_code, headers={**headers, **e.headers})
+        send_body = scope['method'] != 'HEAD'
+        if byte_range is None:
+            return FileRangeResponse(path, 0, size - 1, status_code, headers, send_body)
+        start, end = byte_range
+        headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+        return FileRangeResponse(path, start, end, 206, headers, send_body)
+
 # Create the main app
 app = FastAPI()
+app.add_middleware(ApiCompressionMiddleware)
 
 # CORS middleware should be added near the top, before routes are defined.
 app.add_middleware(
@@ -34,7 +236,7 @@ app.add_middleware(
 UPLOADS_DIR.mkdir(exist_ok=True)
 
 # Mount the uploads directory to be served statically
-app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
+app.mount("/uploads", UploadFiles(directory=UPLOADS_DIR), name="uploads")
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -50,6 +252,18 @@ class CaseStatus(str, Enum):
     ARCHIVED = "archived"
     FOLLOW_UP = "follow_up"
 
+class MindMapCollection(str, Enum):
+    TOPICS = "topics"
+    CASES = "cases"
+    TASKS = "tasks"
+    LITERATURE = "literature"
+    CONNECTIONS = "connections"
+
+class PatchOp(str, Enum):
+    ADD = "add"          # insert a new entity (full body)
+    REPLACE = "replace"  # merge the given fields into an existing entity
+    REMOVE = "remove"    # delete an entity by id
+
 # Models
 class Literature(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -143,6 +357,7 @@ class LiteratureCreate(BaseModel):
     abstract: Optional[str] = None
     notes: Optional[str] = None
     linked_topics: List[str] = Field(default_factory=list)
+    position: Dict[str, float] = Field(default_factory=lambda: {"x": 0, "y": 0})
 
 class PsychiatricTopicCreate(BaseModel):
     title: str
@@ -159,6 +374,7 @@ class PsychiatricTopicCreate(BaseModel):
     differential_diagnoses: List[str] = Field(default_factory=list)
     medications: List[Dict[str, Any]] = Field(default_factory=list)
     psychotherapy_modalities: List[Dict[str, Any]] = Field(default_factory=list)
+    position: Dict[str, float] = Field(default_factory=lambda: {"x": 0, "y": 0})
 
 class PatientCaseCreate(BaseModel):
     case_id: str
@@ -184,6 +400,7 @@ class PatientCaseCreate(BaseModel):
     notes: Optional[str] = None
     linked_topics: List[str] = Field(default_factory=list)
     timeline: List[Dict[str, Any]] = Field(default_factory=list)  # Timeline entries for case progression
+    position: Dict[str, float] = Field(default_factory=lambda: {"x": 0, "y": 0})
 
 class TaskCreate(BaseModel):
     title: str
@@ -193,6 +410,15 @@ class TaskCreate(BaseModel):
     linked_case_id: Optional[str] = None
     linked_topic_id: Optional[str] = None
     notes: Optional[str] = None
+    position: Dict[str, float] = Field(default_factory=lambda: {"x": 0, "y": 0})
+
+class ConnectionCreate(BaseModel):
+    model_config = ConfigDict(extra="allow")  # edges carry arbitrary UI fields (label, style, ...)
+
+    id: Optional[str] = None
+    source: str  # node id, e.g. "topic-<id>"
+    target: str
+    label: Optional[str] = None
 
 class MindMapData(BaseModel):
     topics: List[PsychiatricTopic] = Field(default_factory=list)
@@ -201,97 +427,1159 @@ class MindMapData(BaseModel):
     literature: List[Literature] = Field(default_factory=list)
     connections: List[Dict[str, Any]] = Field(default_factory=list)
 
-# Utility functions for JSON file operations
-def load_mind_map_data() -> MindMapData:
-    """Load mind map data from JSON file"""
+class MindMapOperation(BaseModel):
+    op: PatchOp
+    collection: MindMapCollection
+    id: Optional[str] = None  # required for replace/remove; optional for add
+    value: Optional[Dict[str, Any]] = None
+
+class MindMapPatch(BaseModel):
+    operations: List[MindMapOperation]
+
+class PackedPositions(BaseModel):
+    """ids plus little-endian float64 x, y pairs in the same order (base64 in JSON, raw bytes in MessagePack)"""
+    ids: List[str]
+    xy: Union[str, bytes]
+
+PositionEntries = Optional[Union[List[Tuple[str, float, float]], PackedPositions]]
+
+class PositionBatch(BaseModel):
+    """Node moves per collection, either as [[id, x, y], ...] or packed"""
+    topics: PositionEntries = None
+    cases: PositionEntries = None
+    tasks: PositionEntries = None
+    literature: PositionEntries = None
+
+class LayoutRequest(BaseModel):
+    """Options for POST /api/layout"""
+    nodes: Optional[List[str]] = None  # node ids ("topic-<id>", ...) to lay out; default: the whole map
+    depth: int = Field(0, ge=0, le=10)  # also lay out everything within this many links of nodes
+    pinned: List[str] = Field(default_factory=list)  # node ids that keep their position
+    unplaced_only: bool = False  # only move nodes stacked on one spot (defaults, fresh imports)
+    spacing: float = Field(150.0, gt=0, le=10000)  # preferred distance between linked nodes
+    iterations: int = Field(300, ge=1, le=5000)
+    time_budget_ms: int = Field(5000, ge=10, le=60000)
+    seed: int = 0
+    dry_run: bool = False  # return positions without saving them
+
+class MindMapSnapshot(MindMapData):
+    """On-disk snapshot layout: the map plus the revision it was written at"""
+    revision: int = 0
+
+# Utility functions for JSON file operations. pydantic-core parses and emits the
+# JSON in one pass driven by the schema, including every datetime field.
+def decode_mind_map(raw: bytes) -> Tuple[MindMapData, int]:
+    """Parse snapshot JSON into a MindMapData model and its stored revision"""
+    snapshot = MindMapSnapshot.model_validate_json(raw)
+    # Re-wrap the already validated lists without validating them again
+    data = MindMapData.model_construct(**{name: getattr(snapshot, name) for name in MindMapData.model_fields})
+    return data, snapshot.revision
+
+def encode_mind_map(data: MindMapData, revision: int) -> bytes:
+    """Serialize a MindMapData model (plus revision) to compact snapshot JSON"""
+    snapshot = MindMapSnapshot.model_construct(
+        revision=revision, **{name: getattr(data, name) for name in MindMapData.model_fields}
+    )
+    return snapshot.model_dump_json().encode('utf-8')
+
+def _read_mind_map_file() -> Tuple[MindMapData, int]:
+    """Parse the JSON data file into a MindMapData model and its stored revision"""
+    with open(MINDMAP_DATA_FILE, 'rb') as f:
+        return decode_mind_map(f.read())
+
+def _write_bytes_tmp(path: Path, payload: bytes) -> Path:
+    """Write payload to a durable temp file next to path; the caller renames it into place"""
+    # A unique name per call: other threads or worker processes may be writing one too
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + '.', suffix='.tmp')
+    try:
+        with open(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    return Path(tmp_name)
+
+def _fsync_dir(path: Path) -> None:
+    """Make new and renamed entries of a directory durable (skipped where directories cannot be opened)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
     try:
-        if MINDMAP_DATA_FILE.exists():
-            with open(MINDMAP_DATA_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Convert datetime strings back to datetime objects
-            for topic in data.get('topics', []):
-                if 'created_at' in topic:
-                    topic['created_at'] = datetime.fromisoformat(topic['created_at'].replace('Z', '+00:00'))
-                if 'updated_at' in topic:
-                    topic['updated_at'] = datetime.fromisoformat(topic['updated_at'].replace('Z', '+00:00'))
-                if 'last_updated' in topic and topic['last_updated']:
-                    topic['last_updated'] = datetime.fromisoformat(topic['last_updated'].replace('Z', '+00:00'))
-            
-            for case in data.get('cases', []):
-                if 'created_at' in case:
-                    case['created_at'] = datetime.fromisoformat(case['created_at'].replace('Z', '+00:00'))
-                if 'updated_at' in case:
-                    case['updated_at'] = datetime.fromisoformat(case['updated_at'].replace('Z', '+00:00'))
-                if 'encounter_date' in case:
-                    case['encounter_date'] = datetime.fromisoformat(case['encounter_date'].replace('Z', '+00:00'))
-            
-            for task in data.get('tasks', []):
-                if 'created_at' in task:
-                    task['created_at'] = datetime.fromisoformat(task['created_at'].replace('Z', '+00:00'))
-                if 'updated_at' in task:
-                    task['updated_at'] = datetime.fromisoformat(task['updated_at'].replace('Z', '+00:00'))
-                if 'due_date' in task and task['due_date']:
-                    task['due_date'] = datetime.fromisoformat(task['due_date'].replace('Z', '+00:00'))
-            
-            for lit in data.get('literature', []):
-                if 'created_at' in lit:
-                    lit['created_at'] = datetime.fromisoformat(lit['created_at'].replace('Z', '+00:00'))
-                if 'updated_at' in lit:
-                    lit['updated_at'] = datetime.fromisoformat(lit['updated_at'].replace('Z', '+00:00'))
-            
-            return MindMapData(**data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _write_bytes_atomic(path: Path, payload: bytes) -> None:
+    """Write via temp file + fsync + rename so a crash never truncates path"""
+    os.replace(_write_bytes_tmp(path, payload), path)
+
+def _write_mind_map_file(data: MindMapData, revision: int) -> None:
+    """Serialize a MindMapData model to the JSON data file"""
+    _write_bytes_atomic(MINDMAP_DATA_FILE, encode_mind_map(data, revision))
+
+# Journal helpers. A journal line is {"rev": ..., "ts": ..., "ops": [[op, collection, id, value], ...]}
+# where op is "put" (insert or replace the whole entity), "pos" (value is just the
+# entity's new position) or "del". All are idempotent, so replaying a record that already made it into the snapshot is harmless.
+COLLECTION_MODELS = {
+    'topics': PsychiatricTopic,
+    'cases': PatientCase,
+    'tasks': Task,
+    'literature': Literature,
+    'connections': None,  # plain dicts
+}
+
+def _entity_key(item: Any) -> str:
+    """Stable id for a model or connection dict"""
+    if isinstance(item, dict):
+        return item.get('id') or f"{item.get('source')}->{item.get('target')}"
+    return item.id
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _encode_entity(entity: Any) -> str:
+    """Compact JSON for one entity (model, connection dict or None)"""
+    if isinstance(entity, BaseModel):
+        return entity.model_dump_json()
+    return json.dumps(entity, ensure_ascii=False, separators=(',', ':'), default=_json_default)
+
+def _put_op(old: Any, new: Any) -> str:
+    """'pos' when only the position changed (the common drag case), else 'put'"""
+    if isinstance(old, BaseModel) and 'position' in type(old).model_fields and old.position != new.position:
+        if old.model_copy(update={'position': new.position}) == new:
+            return 'pos'
+    return 'put'
+
+def _encode_ops(ops: List[list]) -> str:
+    """Store ops as comma-separated journal-format arrays (entities encoded straight from the models)"""
+    return ','.join(
+        f'[{json.dumps(op)},{json.dumps(collection)},{json.dumps(key)},'
+        f'{_encode_entity(entity.position if op == "pos" else entity)}]'
+        for op, collection, key, entity in ops
+    )
+
+def _diff_mind_map(old: MindMapData, new: MindMapData) -> List[list]:
+    """Return journal ops that turn old into new"""
+    ops = []
+    for collection in COLLECTION_MODELS:
+        old_items = {_entity_key(item): item for item in getattr(old, collection)}
+        new_keys = set()
+        for item in getattr(new, collection):
+            key = _entity_key(item)
+            new_keys.add(key)
+            old_item = old_items.get(key)
+            if old_item != item:
+                ops.append([_put_op(old_item, item), collection, key, item])
+        for key in old_items.keys() - new_keys:
+            ops.append(['del', collection, key, None])
+    return ops
+
+def _build_index(data: MindMapData) -> Dict[str, Dict[str, int]]:
+    """collection -> {id: list position}, so lookups never scan a collection"""
+    return {
+        collection: {_entity_key(item): position for position, item in enumerate(getattr(data, collection))}
+        for collection in COLLECTION_MODELS
+    }
+
+# Stands in for an entity deleted earlier in the same batch until its list is compacted
+_REMOVED = object()
+
+def _apply_ops(data: MindMapData, ops: List[list], index: Dict[str, Dict[str, int]]) -> None:
+    """
+    Apply [op, collection, id, entity] changes to data in place, keeping index in
+    sync. "pos" ops carry the whole moved entity here, so they apply like "put".
+
+    Lookups are O(1). Deletes are not: lists keep their order, so everything after
+    a deleted entity moves up and is re-indexed. A delete only leaves a placeholder,
+    and each list closes its gaps once at the end, so a batch of deletes (a cascade)
+    costs one pass over the tail of the list rather than one per delete.
+    """
+    first_gap: Dict[str, int] = {}
+    for op, collection, key, entity in ops:
+        items = getattr(data, collection)
+        positions = index[collection]
+        position = positions.get(key)
+        if op == 'del':
+            if position is not None:
+                items[position] = _REMOVED
+                del positions[key]
+                first_gap[collection] = min(position, first_gap.get(collection, position))
+        elif position is None:
+            positions[key] = len(items)
+            items.append(entity)
+        else:
+            items[position] = entity
+    for collection, start in first_gap.items():
+        items = getattr(data, collection)
+        positions = index[collection]
+        items[start:] = [item for item in items[start:] if item is not _REMOVED]
+        for position in range(start, len(items)):
+            positions[_entity_key(items[position])] = position
+
+def _apply_journal_ops(data: MindMapData, ops: List[list], index: Dict[str, Dict[str, int]]) -> None:
+    """Apply journal ops (entities stored as plain dicts) to data in place"""
+    entity_ops = []
+    for op, collection, key, value in ops:
+        model = COLLECTION_MODELS[collection]
+        if op == 'pos':
+            # Later ops in the same record may depend on this one, so apply what came before first
+            _apply_ops(data, entity_ops, index)
+            entity_ops = []
+            position = index[collection].get(key)
+            if position is None:
+                continue
+            items = getattr(data, collection)
+            items[position] = items[position].model_copy(update={'position': value})
+            continue
+        if op == 'put' and model:
+            value = model.model_validate(value)
+        entity_ops.append([op, collection, key, value])
+    _apply_ops(data, entity_ops, index)
+
+def _replay_journal(data: MindMapData, path: Path) -> Tuple[int, int]:
+    """Replay every complete record in a journal file; returns (record count, last revision)"""
+    replayed = revision = 0
+    if not path.exists():
+        return replayed, revision
+    index = _build_index(data)
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A record torn by a crash mid-append. Later appends start on a new
+                # line (see _open_journal), so the records after it are intact
+                logger.warning(f"Ignoring incomplete journal record in {path.name}")
+                continue
+            _apply_journal_ops(data, record['ops'], index)
+            replayed += 1
+            revision = record.get('rev', revision)
+    return replayed, revision
+
+def _open_journal(path: Path) -> BinaryIO:
+    """Open a journal for appending, first ending a record torn by a crash with a newline"""
+    f = open(path, 'a+b')
+    end = f.seek(0, os.SEEK_END)
+    if end:
+        f.seek(end - 1)
+        if f.read(1) != b'\n':
+            f.write(b'\n')
+    return f
+
+# Storage backends. MindMapStore owns the in-memory model, revisions and locking;
+# a backend only knows how to load a full map and persist snapshots or changes.
+class StorageBackend:
+    """Persistence strategy behind MindMapStore (all calls happen under the store lock)"""
+
+    def exists(self) -> bool:
+        raise NotImplementedError
+
+    def signature(self) -> Optional[tuple]:
+        """Cheap token that changes when the data is modified outside this process"""
+        raise NotImplementedError
+
+    def load(self) -> Tuple[MindMapData, int]:
+        raise NotImplementedError
+
+    def write_snapshot(self, data: MindMapData, revision: int) -> None:
+        raise NotImplementedError
+
+    def write_changes(self, data: MindMapData, ops: List[list], revision: int) -> None:
+        """Persist [op, collection, id, entity] changes; data is the already-updated model"""
+        raise NotImplementedError
+
+    def after_write(self, store: 'MindMapStore') -> None:
+        """Hook for background maintenance once a write has been committed"""
+
+class JsonFileBackend(StorageBackend):
+    """
+    MINDMAP_DATA_FILE snapshot, plus (in journal mode) an append-only change log
+    that a background thread periodically folds into a fresh snapshot.
+    """
+
+    def __init__(self, mode: str = PERSISTENCE_MODE):
+        self.mode = mode
+        self._compacting = False
+
+    def exists(self) -> bool:
+        return MINDMAP_DATA_FILE.exists()
+
+    def signature(self) -> Optional[tuple]:
+        signature = []
+        for path in (MINDMAP_DATA_FILE, MINDMAP_COMPACTING_FILE, MINDMAP_JOURNAL_FILE):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                signature.append(None)
+                continue
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def load(self) -> Tuple[MindMapData, int]:
+        data, revision = _read_mind_map_file()
+        # Snapshot first, then the log being compacted, then the live log
+        replayed = 0
+        for path in (MINDMAP_COMPACTING_FILE, MINDMAP_JOURNAL_FILE):
+            count, last_revision = _replay_journal(data, path)
+            replayed += count
+            revision = max(revision, last_revision)
+        if replayed:
+            logger.info(f"Replayed {replayed} journal records")
+        return data, revision
+
+    def write_snapshot(self, data: MindMapData, revision: int) -> None:
+        _write_mind_map_file(data, revision)
+
+    def write_changes(self, data: MindMapData, ops: List[list], revision: int) -> None:
+        if self.mode != 'journal':
+            _write_mind_map_file(data, revision)
+            return
+        line = f'{{"rev":{revision},"ts":"{datetime.utcnow().isoformat()}","ops":[{_encode_ops(ops)}]}}'
+        with _open_journal(MINDMAP_JOURNAL_FILE) as f:
+            f.write(line.encode('utf-8') + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def after_write(self, store: 'MindMapStore') -> None:
+        if self.mode != 'journal' or self._compacting:
+            return
+        try:
+            journal_size = MINDMAP_JOURNAL_FILE.stat().st_size
+        except FileNotFoundError:
+            return
+        if journal_size < JOURNAL_COMPACT_BYTES:
+            return
+        self._compacting = True
+        threading.Thread(target=self._compact, args=(store,), name='journal-compaction', daemon=True).start()
+
+    @staticmethod
+    def _compacting_identity() -> Optional[tuple]:
+        try:
+            stat = MINDMAP_COMPACTING_FILE.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _compact(self, store: 'MindMapStore') -> None:
+        """
+        Fold the journal into a new snapshot without blocking writers for the file
+        write. Rotation and commit run under the cross-process lock. Another worker
+        may start compacting in between by appending the live log to our rotated
+        one; we then leave the commit to it, since its snapshot is the newer one.
+        """
+        tmp_path = None
+        try:
+            with store.exclusive():
+                if not MINDMAP_JOURNAL_FILE.exists():
+                    return  # another worker rotated it first
+                # Catch up with other workers' writes before our own file changes
+                # become the signature we treat as current
+                state = store.state()
+                # Rotate the live log so new saves go to a fresh journal while we write
+                if MINDMAP_COMPACTING_FILE.exists():
+                    # Left over from an interrupted compaction, or another worker's in
+                    # progress; either way keep its records ahead of ours
+                    with _open_journal(MINDMAP_COMPACTING_FILE) as dst, open(MINDMAP_JOURNAL_FILE, 'rb') as src:
+                        shutil.copyfileobj(src, dst)
+                    MINDMAP_JOURNAL_FILE.unlink()
+                else:
+                    os.replace(MINDMAP_JOURNAL_FILE, MINDMAP_COMPACTING_FILE)
+                rotated = self._compacting_identity()
+                store.refresh_signature()
+                payload = encode_mind_map(state.data, state.revision)
+
+            tmp_path = _write_bytes_tmp(MINDMAP_DATA_FILE, payload)
+
+            with store.exclusive():
+                if self._compacting_identity() != rotated:
+                    logger.info("Journal compaction taken over by another worker")
+                    return
+                store.state()
+                os.replace(tmp_path, MINDMAP_DATA_FILE)
+                tmp_path = None
+                MINDMAP_COMPACTING_FILE.unlink()
+                store.refresh_signature()
+            logger.info("Mind map journal compacted into snapshot")
+        except Exception as e:
+            logger.error(f"Error compacting mind map journal: {e}")
+        finally:
+            if tmp_path is not None:
+                tmp_path.unlink(missing_ok=True)
+            self._compacting = False
+
+# Indexed columns per table, pulled out of each entity next to its JSON body
+SQLITE_COLUMNS = {
+    'topics': ('category', 'updated_at'),
+    'cases': ('case_id', 'status', 'updated_at'),
+    'tasks': ('status', 'priority', 'due_date', 'linked_case_id', 'linked_topic_id', 'updated_at'),
+    'literature': ('year', 'updated_at'),
+    'connections': ('source', 'target'),
+}
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS topics (id TEXT PRIMARY KEY, category TEXT, updated_at TEXT, body TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS cases (id TEXT PRIMARY KEY, case_id TEXT, status TEXT, updated_at TEXT, body TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY, status TEXT, priority TEXT, due_date TEXT,
+    linked_case_id TEXT, linked_topic_id TEXT, updated_at TEXT, body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS literature (id TEXT PRIMARY KEY, year INTEGER, updated_at TEXT, body TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS connections (id TEXT PRIMARY KEY, source TEXT, target TEXT, body TEXT NOT NULL);
+-- linked_topics lists of cases and literature, one row per link
+CREATE TABLE IF NOT EXISTS linked_topics (
+    collection TEXT NOT NULL, entity_id TEXT NOT NULL, topic_id TEXT NOT NULL,
+    PRIMARY KEY (collection, entity_id, topic_id)
+);
+CREATE INDEX IF NOT EXISTS idx_linked_topics_topic ON linked_topics (topic_id);
+CREATE INDEX IF NOT EXISTS idx_cases_status ON cases (status);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status);
+CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks (due_date);
+CREATE INDEX IF NOT EXISTS idx_tasks_linked_case ON tasks (linked_case_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_linked_topic ON tasks (linked_topic_id);
+CREATE INDEX IF NOT EXISTS idx_connections_source ON connections (source);
+CREATE INDEX IF NOT EXISTS idx_connections_target ON connections (target);
+"""
+
+def _sql_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+class SQLiteBackend(StorageBackend):
+    """
+    Stdlib sqlite3 storage: one table per entity type keyed by id, with the
+    columns used for lookups indexed and the full entity kept as a JSON body.
+    Changes are upserts/deletes by primary key inside one transaction.
+    """
+
+    def __init__(self, path: Path = MINDMAP_DB_FILE):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SQLITE_SCHEMA)
+        # Separate connection for change detection, so readers never touch the
+        # writer's connection while it is inside a transaction
+        self._probe = sqlite3.connect(path, check_same_thread=False)
+        self._probe_lock = threading.Lock()
+        # A database that holds a revision never becomes empty again, so once
+        # seen, exists() answers without a query
+        self._populated = False
+
+    def _stored_revision(self) -> Optional[int]:
+        """Writer connection: only call under the store lock"""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+        return None if row is None else int(row[0])
+
+    def exists(self) -> bool:
+        # Called on every read without the store lock, so it stays off the writer's connection
+        if not self._populated:
+            with self._probe_lock:
+                row = self._probe.execute("SELECT 1 FROM meta WHERE key = 'revision'").fetchone()
+            self._populated = row is not None
+        # An empty database is populated from the JSON file on first load
+        return self._populated or MINDMAP_DATA_FILE.exists()
+
+    def signature(self) -> Optional[tuple]:
+        # data_version on the probe changes whenever any other connection commits
+        with self._probe_lock:
+            return (self._probe.execute('PRAGMA data_version').fetchone()[0],)
+
+    def load(self) -> Tuple[MindMapData, int]:
+        revision = self._stored_revision()
+        if revision is None:
+            return migrate_json_to_sqlite(self)
+        data = MindMapData()
+        for collection, model in COLLECTION_MODELS.items():
+            items = getattr(data, collection)
+            for (body,) in self._conn.execute(f'SELECT body FROM {collection} ORDER BY rowid'):
+                items.append(model.model_validate_json(body) if model else json.loads(body))
+        return data, revision
+
+    def write_snapshot(self, data: MindMapData, revision: int) -> None:
+        with self._transaction():
+            for collection in COLLECTION_MODELS:
+                self._conn.execute(f'DELETE FROM {collection}')
+            self._conn.execute('DELETE FROM linked_topics')
+            for collection in COLLECTION_MODELS:
+                for item in getattr(data, collection):
+                    self._upsert(collection, _entity_key(item), item)
+            self._set_revision(revision)
+
+    def write_changes(self, data: MindMapData, ops: List[list], revision: int) -> None:
+        with self._transaction():
+            for op, collection, key, entity in ops:
+                if op == 'del':
+                    self._conn.execute(f'DELETE FROM {collection} WHERE id = ?', (key,))
+                    self._conn.execute(
+                        'DELETE FROM linked_topics WHERE collection = ? AND entity_id = ?', (collection, key)
+                    )
+                else:
+                    self._upsert(collection, key, entity)
+            self._set_revision(revision)
+
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._conn.execute('COMMIT')
+
+    def _set_revision(self, revision: int) -> None:
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('revision', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (str(revision),),
+        )
+
+    def _upsert(self, collection: str, key: str, entity: Any) -> None:
+        if isinstance(entity, dict):
+            field = entity.get
         else:
-            # Create initial dummy data if file doesn't exist
-            dummy_data = create_initial_dummy_data()
-            save_mind_map_data(dummy_data)
-            return dummy_data
+            field = lambda name: getattr(entity, name, None)
+        columns = SQLITE_COLUMNS[collection]
+        row = [key] + [_sql_value(field(column)) for column in columns]
+        row.append(_encode_entity(entity))
+        names = ('id',) + columns + ('body',)
+        updates = ', '.join(f'{name} = excluded.{name}' for name in names[1:])
+        # Upsert rather than REPLACE so the row keeps its rowid (and list order)
+        self._conn.execute(
+            f"INSERT INTO {collection} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}",
+            row,
+        )
+        if collection in ('cases', 'literature'):
+            self._conn.execute(
+                'DELETE FROM linked_topics WHERE collection = ? AND entity_id = ?', (collection, key)
+            )
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO linked_topics (collection, entity_id, topic_id) VALUES (?, ?, ?)',
+                [(collection, key, topic_id) for topic_id in field('linked_topics') or []],
+            )
+
+def migrate_json_to_sqlite(backend: SQLiteBackend) -> Tuple[MindMapData, int]:
+    """One-shot import of the JSON snapshot (and any journal) into an empty database"""
+    if not MINDMAP_DATA_FILE.exists():
+        raise FileNotFoundError(MINDMAP_DATA_FILE)
+    data, revision = JsonFileBackend().load()
+    backend.write_snapshot(data, revision)
+    logger.info(f"Migrated {MINDMAP_DATA_FILE.name} into {backend.path.name}")
+    return data, revision
+
+def create_storage_backend() -> StorageBackend:
+    if STORAGE_BACKEND == 'sqlite':
+        return SQLiteBackend()
+    return JsonFileBackend()
+
+class InterProcessLock:
+    """
+    Exclusive lock on a lock file: flock on POSIX, msvcrt.locking on Windows.
+    Re-entrant, but only safe to use while holding a thread lock (the depth
+    counter is not synchronized itself).
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._depth = 0
+
+    @staticmethod
+    def available() -> bool:
+        return fcntl is not None or msvcrt is not None
+
+    def __enter__(self) -> 'InterProcessLock':
+        if self._depth == 0 and self.available():
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            else:
+                self._lock_windows()
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+
+    def _lock_windows(self) -> None:
+        # Locks the first byte (locking() works from the current offset). LK_LOCK
+        # gives up after about 10 seconds of retrying, so keep waiting like flock does
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                logger.warning(f"Still waiting for {self.path.name} held by another server process")
+
+class WritePrecondition(NamedTuple):
+    """Revision a writer based its change on; collection None means the whole map"""
+    collection: Optional[str]
+    revision: int
+
+class RevisionConflict(HTTPException):
+    """A write's precondition no longer holds: someone else committed first"""
+
+    def __init__(self, state: 'StoreState', expected: List[WritePrecondition]):
+        super().__init__(
+            status_code=409,
+            detail={"message": "Mind map was modified by another writer; reload and retry",
+                    "revision": state.revision, "expected": [list(condition) for condition in expected]},
+            headers={'ETag': f'"r{state.revision}"', 'X-Revision': str(state.revision)},
+        )
+        self.revision = state.revision
+
+class StoreState(NamedTuple):
+    """One consistent view of the map; never mutated once published"""
+    data: MindMapData
+    index: Dict[str, Dict[str, int]]
+    revision: int
+    collection_revisions: Dict[str, int]
+
+class MindMapStore:
+    """
+    Authoritative in-memory copy of the mind map shared by every endpoint.
+    The backend is read once and only re-read when its signature changes
+    (e.g. the file was edited by hand).
+
+    Writers are serialized by lock (plus a file lock shared with other worker
+    processes), optionally check a revision precondition, build the next state copy-on-write
+    (only the touched collections are copied) and publish it in a single
+    assignment. Readers never take the lock while a writer is busy: they keep
+    serving the last published state, so a large save never stalls a small GET.
+
+    With write-behind enabled, commits only queue their ops; a timer coalesces
+    them (last op per entity wins) into one backend write per interval.
+
+    Every committed change bumps a monotonically increasing revision, which is
+    persisted by the backend. The store also remembers which revision last
+    touched each entity (and tombstones for deletions) so clients can fetch
+    only what changed since a revision they already have.
+    """
+
+    def __init__(self, backend: StorageBackend, write_behind_ms: int = WRITE_BEHIND_MS):
+        self.backend = backend
+        self.write_behind_ms = write_behind_ms
+        self.lock = threading.RLock()
+        self.file_lock = InterProcessLock(MINDMAP_LOCK_FILE)
+        self._state: Optional[StoreState] = None
+        self._signature: Optional[tuple] = None
+        # Change tracking since the last (re)load from the backend (guarded by lock)
+        self._history_floor = 0
+        self._entity_revisions: Dict[tuple, int] = {}
+        self._tombstones: Dict[tuple, int] = {}
+        # Write-behind queue: (collection, id) -> unflushed ops for that entity, at most
+        # a delete followed by its re-add (guarded by lock)
+        self._pending: Dict[tuple, List[list]] = {}
+        self._flush_timer: Optional[threading.Timer] = None
+        self._last_flush = 0.0
+        self.flush_count = 0
+        # Called as listener(state, ops) after every publish; ops is None when the
+        # whole map was replaced or reloaded. Runs on the committing thread, under lock.
+        self.listeners: List[Any] = []
+
+    @property
+    def revision(self) -> int:
+        state = self._state
+        return state.revision if state is not None else 0
+
+    def state(self) -> StoreState:
+        """Current published state, reloading it if the backend changed underneath us"""
+        state = self._state
+        if state is not None:
+            # Unflushed writes make the in-memory state authoritative until the next flush
+            if self._pending or self.backend.signature() == self._signature:
+                return state
+            if not self.lock.acquire(blocking=False):
+                # A writer is mid-commit (its own write moved the signature); serve what is published
+                return state
+        else:
+            self.lock.acquire()
+        try:
+            signature = self.backend.signature()
+            if self._state is None or signature != self._signature:
+                reloaded = self._state is not None
+                # Under the file lock: another worker's write landing between the load
+                # and the signature below would otherwise count as already loaded
+                with self.file_lock:
+                    data, revision = self.backend.load()
+                    # Re-read: loading may itself write (e.g. the one-shot SQLite migration)
+                    self._signature = self.backend.signature()
+                revision = max(self.revision + 1, revision)
+                self._reset_tracking(revision)
+                self._state = StoreState(data, _build_index(data), revision,
+                                         {collection: revision for collection in COLLECTION_MODELS})
+                if reloaded:
+                    self._notify(self._state, None)
+            return self._state
+        finally:
+            self.lock.release()
+
+    def cached_state(self) -> Optional[StoreState]:
+        """The published state if it is still current, else None (a reload is due); never blocks on I/O"""
+        state = self._state
+        if state is not None and (self._pending or self.backend.signature() == self._signature):
+            return state
+        return None
+
+    def get(self) -> MindMapData:
+        """Return the cached model, reloading it if the backend changed underneath us"""
+        return self.state().data
+
+    @contextmanager
+    def exclusive(self):
+        """Writer section: the thread lock plus the cross-process file lock"""
+        with self.lock, self.file_lock:
+            yield
+
+    def put(self, data: MindMapData, expected: Optional[List[WritePrecondition]] = None) -> int:
+        """
+        Persist data and make it the new cached state. Returns the new revision.
+        Raises RevisionConflict if expected no longer matches.
+        """
+        with self.exclusive():
+            previous = self.state() if self.backend.exists() else None
+            if previous is not None:
+                self._check_precondition(previous, expected)
+            ops = None
+            if previous is None:
+                revision = self.revision + 1
+                self.backend.write_snapshot(data, revision)
+                self._reset_tracking(revision)
+                collection_revisions = {collection: revision for collection in COLLECTION_MODELS}
+            else:
+                ops = _diff_mind_map(previous.data, data)
+                if not ops:
+                    return previous.revision
+                revision, collection_revisions = self._persist(previous, data, ops)
+            self._publish(StoreState(data, _build_index(data), revision, collection_revisions), ops)
+            return revision
+
+    def commit(self, ops: List[list], expected: Optional[List[WritePrecondition]] = None) -> int:
+        """
+        Apply validated [op, collection, id, entity] changes to the cached model
+        and persist only those changes. Returns the new revision.
+        Raises RevisionConflict if expected no longer matches.
+        """
+        with self.exclusive():
+            previous = self.state()
+            self._check_precondition(previous, expected)
+            # Copy-on-write: readers holding the previous state never see a half-applied commit
+            touched = {collection for _, collection, _, _ in ops}
+            data = MindMapData.model_construct(
+                **{name: getattr(previous.data, name) for name in MindMapData.model_fields}
+            )
+            index = dict(previous.index)
+            for collection in touched:
+                setattr(data, collection, list(getattr(previous.data, collection)))
+                index[collection] = dict(previous.index[collection])
+            _apply_ops(data, ops, index)
+            revision, collection_revisions = self._persist(previous, data, ops)
+            self._publish(StoreState(data, index, revision, collection_revisions), ops)
+            return revision
+
+    def position(self, collection: str, key: str) -> Optional[int]:
+        """O(1) list position of an entity by id; None if absent"""
+        return self.state().index[collection].get(key)
+
+    def lookup(self, collection: str, key: str) -> Any:
+        """O(1) entity lookup by id; None if absent"""
+        state = self.state()
+        position = state.index[collection].get(key)
+        return None if position is None else getattr(state.data, collection)[position]
+
+    def flush(self) -> None:
+        """Write queued write-behind changes to the backend as one coalesced write"""
+        with self.exclusive():
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            ops = [op for queued in pending.values() for op in queued]
+            state = self._state
+            try:
+                self.backend.write_changes(state.data, ops, state.revision)
+            except Exception:
+                # Keep them queued (nothing newer can have arrived: we hold the lock)
+                self._pending = pending
+                raise
+            self._last_flush = time.monotonic()
+            self.flush_count += 1
+            self._signature = self.backend.signature()
+            self.backend.after_write(self)
+
+    @property
+    def pending_writes(self) -> int:
+        return len(self._pending)
+
+    def invalidate(self) -> None:
+        """Drop the cached model so the next read goes back to the backend"""
+        self.flush()
+        with self.lock:
+            self._state = None
+            self._signature = None
+
+    def refresh_signature(self) -> None:
+        """Record the backend's current state as our own (after writing it ourselves)"""
+        with self.lock:
+            self._signature = self.backend.signature()
+
+    def check_precondition(self, expected: Optional[List[WritePrecondition]]) -> StoreState:
+        """Fail fast (before validating a write) if expected is already stale"""
+        state = self.state()
+        self._check_precondition(state, expected)
+        return state
+
+    @staticmethod
+    def _check_precondition(state: StoreState, expected: Optional[List[WritePrecondition]]) -> None:
+        # Any one matching validator is enough, as with If-Match
+        if expected is None:
+            return
+        for condition in expected:
+            if condition.collection is None:
+                current = state.revision
+            else:
+                current = state.collection_revisions.get(condition.collection, state.revision)
+            if current == condition.revision:
+                return
+        raise RevisionConflict(state, expected)
+
+    def _persist(self, previous: StoreState, data: MindMapData, ops: List[list]) -> Tuple[int, Dict[str, int]]:
+        revision = previous.revision + 1
+        if self.write_behind_ms > 0:
+            self._queue(ops)
+        else:
+            self.backend.write_changes(data, ops, revision)
+        collection_revisions = dict(previous.collection_revisions)
+        for op, collection, key, _ in ops:
+            if op == 'del':
+                self._entity_revisions.pop((collection, key), None)
+                self._tombstones[(collection, key)] = revision
+            else:
+                self._entity_revisions[(collection, key)] = revision
+                self._tombstones.pop((collection, key), None)
+            collection_revisions[collection] = revision
+        return revision, collection_revisions
+
+    def _publish(self, state: StoreState, ops: Optional[List[list]]) -> None:
+        self._state = state
+        if self._pending:
+            self._schedule_flush()
+        else:
+            self._signature = self.backend.signature()
+            self.backend.after_write(self)
+        self._notify(state, ops)
+
+    def _notify(self, state: StoreState, ops: Optional[List[list]]) -> None:
+        for listener in self.listeners:
+            try:
+                listener(state, ops)
+            except Exception as e:
+                logger.error(f"Error in mind map change listener: {e}")
+
+    def _queue(self, ops: List[list]) -> None:
+        for op in ops:
+            key = (op[1], op[2])
+            queued = self._pending.get(key)
+            if queued is None or op[0] == 'del':
+                self._pending[key] = [op]
+            elif queued[-1][0] == 'del':
+                # Re-added after a delete: it now sits at the end of its list, so replay it
+                # last, and keep the delete, since the backend may still hold it in its old slot
+                del self._pending[key]
+                self._pending[key] = [queued[-1], ['put', *op[1:]]]
+            else:
+                if op[0] == 'pos' and queued[-1][0] != 'pos':
+                    # A move after an unflushed put/add still has to write the whole entity
+                    op = ['put', *op[1:]]
+                queued[-1] = op
+
+    def _schedule_flush(self) -> None:
+        if self._flush_timer is not None:
+            return
+        delay = max(0.0, self._last_flush + self.write_behind_ms / 1000 - time.monotonic())
+        self._flush_timer = threading.Timer(delay, self._flush_in_background)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def _flush_in_background(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing queued mind map writes: {e}")
+            with self.lock:
+                self._flush_timer = None
+                self._schedule_flush()
+
+    def _reset_tracking(self, revision: int) -> None:
+        self._history_floor = revision
+        self._entity_revisions = {}
+        self._tombstones = {}
+
+    def etag(self, collection: Optional[str] = None, state: Optional[StoreState] = None) -> str:
+        """Strong validator for the whole map or a single collection"""
+        state = state or self.state()
+        if collection is None:
+            return f'"r{state.revision}"'
+        return f'"{collection}-r{state.collection_revisions.get(collection, state.revision)}"'
+
+    def changes_since(self, collection: str, since: int,
+                      state: Optional[StoreState] = None) -> Optional[Tuple[list, List[str]]]:
+        """
+        Entities of a collection changed after revision since, plus ids deleted
+        after it. Returns None when since predates the tracked history (the
+        caller must send everything).
+        """
+        state = state or self.state()
+        with self.lock:
+            if since < self._history_floor or since > state.revision:
+                return None
+            changed = [
+                item for item in getattr(state.data, collection)
+                if self._entity_revisions.get((collection, _entity_key(item)), 0) > since
+            ]
+            deleted = [
+                key for (tomb_collection, key), revision in self._tombstones.items()
+                if tomb_collection == collection and since < revision <= state.revision
+            ]
+            return changed, deleted
+
+mindmap_store = MindMapStore(create_storage_backend())
+# Last resort for write-behind; the app's shutdown handler normally flushes first
+atexit.register(mindmap_store.flush)
+
+def load_mind_map_state() -> StoreState:
+    """Current store state (data, index, revision), creating the dummy data on first run"""
+    if not mindmap_store.backend.exists():
+        # Create initial dummy data if file doesn't exist
+        save_mind_map_data(create_initial_dummy_data())
+    return mindmap_store.state()
+
+def load_mind_map_data() -> MindMapData:
+    """Load mind map data (served from the in-memory store after the first read)"""
+    try:
+        return load_mind_map_state().data
     except Exception as e:
         logger.error(f"Error loading mind map data: {e}")
         # Return empty data structure on error
         return MindMapData()
 
-def save_mind_map_data(data: MindMapData) -> None:
-    """Save mind map data to JSON file"""
+# Blocking work (disk I/O, parsing, commits) runs on a bounded thread pool so the
+# event loop keeps serving other clients meanwhile. CPU-heavy work on whole maps
+# (encoding responses, layouts) gets a pool of its own: queued on io_executor, a
+# few full-map GETs would hold up every small read and write behind them.
+IO_WORKERS = int(os.environ.get('MINDMAP_IO_WORKERS', 4))
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix='mindmap-io')
+ENCODE_WORKERS = int(os.environ.get('MINDMAP_ENCODE_WORKERS', 2))
+encode_executor = ThreadPoolExecutor(max_workers=ENCODE_WORKERS, thread_name_prefix='mindmap-encode')
+_in_flight = {'io': 0, 'encode': 0}
+
+async def _run_in(executor: ThreadPoolExecutor, name: str, func, *args, **kwargs) -> Any:
+    _in_flight[name] += 1
     try:
-        # Convert to dict and handle datetime serialization
-        data_dict = data.dict()
-        
-        # Convert datetime objects to ISO strings
-        for topic in data_dict.get('topics', []):
-            if 'created_at' in topic and topic['created_at']:
-                topic['created_at'] = topic['created_at'].isoformat()
-            if 'updated_at' in topic and topic['updated_at']:
-                topic['updated_at'] = topic['updated_at'].isoformat()
-            if 'last_updated' in topic and topic['last_updated']:
-                topic['last_updated'] = topic['last_updated'].isoformat()
-        
-        for case in data_dict.get('cases', []):
-            if 'created_at' in case and case['created_at']:
-                case['created_at'] = case['created_at'].isoformat()
-            if 'updated_at' in case and case['updated_at']:
-                case['updated_at'] = case['updated_at'].isoformat()
-            if 'encounter_date' in case and case['encounter_date']:
-                case['encounter_date'] = case['encounter_date'].isoformat()
-        
-        for task in data_dict.get('tasks', []):
-            if 'created_at' in task and task['created_at']:
-                task['created_at'] = task['created_at'].isoformat()
-            if 'updated_at' in task and task['updated_at']:
-                task['updated_at'] = task['updated_at'].isoformat()
-            if 'due_date' in task and task['due_date']:
-                task['due_date'] = task['due_date'].isoformat()
-        
-        for lit in data_dict.get('literature', []):
-            if 'created_at' in lit and lit['created_at']:
-                lit['created_at'] = lit['created_at'].isoformat()
-            if 'updated_at' in lit and lit['updated_at']:
-                lit['updated_at'] = lit['updated_at'].isoformat()
-        
-        with open(MINDMAP_DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data_dict, f, indent=2, ensure_ascii=False, default=str)
-        
+        return await asyncio.get_running_loop().run_in_executor(executor, partial(func, *args, **kwargs))
+    finally:
+        _in_flight[name] -= 1
+
+async def run_io(func, *args, **kwargs) -> Any:
+    """Run a blocking callable on io_executor and await its result"""
+    return await _run_in(io_executor, 'io', func, *args, **kwargs)
+
+async def run_encode(func, *args, **kwargs) -> Any:
+    """Run CPU-heavy work on a large payload on encode_executor and await its result"""
+    return await _run_in(encode_executor, 'encode', func, *args, **kwargs)
+
+async def current_mind_map_state() -> StoreState:
+    """
+    load_mind_map_state for handlers: the published state is read inline, and
+    only a (re)load goes to io_executor.
+    """
+    if mindmap_store.backend.exists():
+        state = mindmap_store.cached_state()
+        if state is not None:
+            return state
+    return await run_io(load_mind_map_state)
+
+class EventLoopLagMonitor:
+    """Samples how late the loop wakes up from a fixed sleep; lag means something blocked it"""
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.samples = 0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.avg_ms = 0.0  # exponentially weighted
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - started - self.interval) * 1000)
+            self.samples += 1
+            self.last_ms = lag_ms
+            self.max_ms = max(self.max_ms, lag_ms)
+            self.avg_ms = lag_ms if self.samples == 1 else self.avg_ms * 0.9 + lag_ms * 0.1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"samples": self.samples, "last_ms": round(self.last_ms, 3),
+                "avg_ms": round(self.avg_ms, 3), "max_ms": round(self.max_ms, 3)}
+
+loop_lag_monitor = EventLoopLagMonitor()
+
+# Change feed: every commit is pushed to Server-Sent Events subscribers as a delta
+FEED_QUEUE_SIZE = int(os.environ.get('MINDMAP_FEED_QUEUE_SIZE', 256))
+# Commits touching more entities than this (e.g. a full import) are sent as "resync" instead
+FEED_MAX_OPS = 500
+FEED_KEEPALIVE_SECONDS = 15
+
+def _sse_message(event: str, data: str, revision: Optional[int] = None) -> str:
+    id_line = f'id: {revision}\n' if revision is not None else ''
+    return f'{id_line}event: {event}\ndata: {data}\n\n'
+
+class ChangeFeed:
+    """
+    Fans committed changes out to event-stream subscribers. Each commit is
+    encoded once, on the committing thread, and the same message is queued for
+    every subscriber. A subscriber whose bounded queue fills up has its backlog
+    replaced by a single "resync" event: it refetches the map and then carries
+    on with the events that follow.
+    """
+
+    def __init__(self, queue_size: int = FEED_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: set = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.resyncs = 0
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def on_commit(self, state: StoreState, ops: Optional[List[list]]) -> None:
+        """MindMapStore listener"""
+        if not self._subscribers:
+            return
+        if ops is None or len(ops) > FEED_MAX_OPS:
+            message = _sse_message('resync', json.dumps({"revision": state.revision}), state.revision)
+        else:
+            message = _sse_message('change', f'{{"revision":{state.revision},"ops":[{_encode_ops(ops)}]}}',
+                                   state.revision)
+        self.publish(message)
+
+    def publish(self, message: str) -> None:
+        """Queue a preformatted message for every subscriber; safe to call from any thread"""
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        try:
+            loop.call_soon_threadsafe(self._fan_out, message)
+        except RuntimeError:
+            # The loop that served the subscribers has shut down
+            self._loop = None
+
+    def _fan_out(self, message: str) -> None:
+        self.published += 1
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                self.resyncs += 1
+                revision = mindmap_store.revision
+                queue.put_nowait(_sse_message('resync', json.dumps({"revision": revision}), revision))
+
+change_feed = ChangeFeed()
+mindmap_store.listeners.append(change_feed.on_commit)
+
+class DerivedIndex:
+    """
+    Secondary index kept in step with MindMapStore through its listener hook.
+    Built lazily on first use; each commit then applies only its own ops. A
+    reload or full replace marks it stale so the next use rebuilds it.
+    """
+
+    def __init__(self, store: MindMapStore):
+        self.store = store
+        self.lock = threading.Lock()
+        self.revision: Optional[int] = None  # None: not built (or stale)
+        store.listeners.append(self.on_commit)
+
+    def on_commit(self, state: StoreState, ops: Optional[List[list]]) -> None:
+        with self.lock:
+            if self.revision is None:
+                return
+            if ops is None:
+                self.revision = None
+                return
+            self._apply(ops)
+            self.revision = state.revision
+
+    def ensure_built(self) -> None:
+        if self.revision is not None:
+            return
+        # Under the store lock so no commit lands between reading the state and listening again
+        with self.store.lock:
+            state = self.store.state()
+            with self.lock:
+                if self.revision is None:
+                    self._rebuild(state)
+                    self.revision = state.revision
+
+    def _rebuild(self, state: StoreState) -> None:
+        raise NotImplementedError
+
+    def _apply(self, ops: List[list]) -> None:
+        raise NotImplementedError
+
+def save_mind_map_data(data: MindMapData, expected: Optional[List[WritePrecondition]] = None) -> int:
+    """Save mind map data to JSON file and refresh the in-memory store; returns the revision"""
+    try:
+        revision = mindmap_store.put(data, expected)
         logger.info("Mind map data saved successfully")
+        return revision
+    except RevisionConflict:
+        raise
     except Exception as e:
         logger.error(f"Error saving mind map data: {e}")
         raise HTTPException(status_code=500, detail="Failed to save data")
@@ -379,82 +1667,2709 @@ def create_initial_dummy_data() -> MindMapData:
 async def root():
     return {"message": "PGY-3 HQ API is running with local JSON storage"}
 
+# Conditional GET helpers: every response carries a strong ETag derived from the
+# store revision, and If-None-Match short-circuits to 304 without serializing.
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in header.split(',')]
+    return any(tag.removeprefix('W/') == etag for tag in candidates)
+
+# Optimistic concurrency: a write may carry If-Match with an ETag from an earlier
+# response ("r12" for the whole map, "topics-r9" for one collection) or ?revision=N.
+# If another writer committed in between, the write fails with 409 and the current revision.
+_REVISION_ETAG = re.compile(r'^(?:W/)?"(?:([a-z]+)-)?r(\d+)"$')
+# Serializes writers in this process so they queue here instead of on the store lock
+write_lock = asyncio.Lock()
+
+def write_precondition(request: Request, revision: Optional[int] = None) -> Optional[List[WritePrecondition]]:
+    """Dependency: the write's precondition, or None for an unconditional write"""
+    if revision is not None:
+        return [WritePrecondition(None, revision)]
+    header = request.headers.get('if-match', '').strip()
+    if header == '*':
+        return None
+    if not header:
+        if REQUIRE_WRITE_PRECONDITION:
+            raise HTTPException(status_code=428, detail="Writes require If-Match or ?revision=")
+        return None
+    conditions = []
+    for tag in header.split(','):
+        match = _REVISION_ETAG.match(tag.strip())
+        if match is None or (match.group(1) is not None and match.group(1) not in COLLECTION_MODELS):
+            raise HTTPException(status_code=400, detail=f"Unsupported If-Match validator: {tag.strip()}")
+        conditions.append(WritePrecondition(match.group(1), int(match.group(2))))
+    return conditions
+
+def _revision_headers(response: Response, revision: int) -> None:
+    response.headers['ETag'] = f'"r{revision}"'
+    response.headers['X-Revision'] = str(revision)
+
+# Content negotiation: Accept: application/msgpack selects a MessagePack body with
+# default-valued fields (empty lists, nulls, ...) left out; JSON stays the default.
+def _accept_quality(accept: str, media_type: str, wildcards: bool = True) -> float:
+    """q that an Accept header gives media_type (its most specific matching range wins); 0 if none matches"""
+    quality, specificity = 0.0, -1
+    for media_range in accept.split(','):
+        name, *params = [part.strip() for part in media_range.split(';')]
+        name = name.lower()
+        if name == media_type:
+            rank = 2
+        elif wildcards and name == media_type.split('/')[0] + '/*':
+            rank = 1
+        elif wildcards and name == '*/*':
+            rank = 0
+        else:
+            continue
+        if rank <= specificity:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    pass
+        quality, specificity = q, rank
+    return quality
+
+def _wants_msgpack(request: Request) -> bool:
+    """MessagePack only when asked for by name, with a positive q no lower than JSON's"""
+    if msgpack is None:
+        return False
+    accept = request.headers.get('accept', '')
+    quality = max(_accept_quality(accept, media_type, wildcards=False) for media_type in MSGPACK_MEDIA_TYPES)
+    return quality > 0 and quality >= _accept_quality(accept, 'application/json')
+
+def _compact(value: Any) -> Any:
+    """JSON-ready copy of value with model fields that equal their defaults omitted"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode='json', exclude_defaults=True)
+    if isinstance(value, dict):
+        return {key: _compact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_compact(item) for item in value]
+    return jsonable_encoder(value)
+
+def _json_body(payload: Any) -> bytes:
+    """
+    JSON straight from pydantic-core's serializer, which also handles lists and
+    dicts holding models: far cheaper than jsonable_encoder's generic walk.
+    """
+    if isinstance(payload, BaseModel):
+        return payload.model_dump_json().encode('utf-8')
+    return to_json(payload)
+
+async def _conditional_json(request: Request, state: StoreState, etag: str, build_payload,
+                            headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    build_payload only runs on a cache miss (on the encode executor, together with
+    encoding); it may add response headers to headers.
+    """
+    use_msgpack = _wants_msgpack(request)
+    if use_msgpack:
+        # Each representation needs its own strong validator
+        etag = f'{etag[:-1]}-msgpack"'
+    headers = headers if headers is not None else {}
+    headers.update({'ETag': etag, 'Cache-Control': 'no-cache', 'X-Revision': str(state.revision),
+                    'Vary': 'Accept, Accept-Encoding'})
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    def render() -> Response:
+        payload = build_payload()
+        if use_msgpack:
+            return Response(msgpack.packb(_compact(payload)), media_type=MSGPACK_MEDIA_TYPE, headers=headers)
+        return Response(_json_body(payload), media_type='application/json', headers=headers)
+    return await run_encode(render)
+
+class CollectionQuery(BaseModel):
+    """Query parameters shared by the collection list endpoints"""
+    limit: Optional[int] = Field(None, ge=1, le=5000)
+    cursor: Optional[str] = None  # opaque; pass back the X-Next-Cursor header of the previous page
+    fields: Optional[str] = None  # comma-separated projection, e.g. "id,title,position"
+    status: Optional[str] = None
+    category: Optional[str] = None
+    priority: Optional[str] = None
+    linked_topic: Optional[str] = None
+    linked_case: Optional[str] = None
+    bbox: Optional[str] = None  # "min_x,min_y,max_x,max_y": only nodes positioned inside (connections touching them)
+
+# Which filters each collection understands
+COLLECTION_FILTERS = {
+    'topics': {'category'},
+    'cases': {'status', 'linked_topic'},
+    'tasks': {'status', 'priority', 'linked_topic', 'linked_case'},
+    'literature': {'linked_topic'},
+    'connections': set(),
+}
+
+def _item_filter(collection: str, query: CollectionQuery):
+    """Build a predicate for the filters in query, or None when there are none"""
+    active = {name for name in ('status', 'category', 'priority', 'linked_topic', 'linked_case')
+              if getattr(query, name) is not None}
+    unsupported = active - COLLECTION_FILTERS[collection]
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Unsupported filter(s) for {collection}: {', '.join(sorted(unsupported))}")
+    if not active:
+        return None
+
+    def matches(item: Any) -> bool:
+        if query.status is not None and item.status != query.status:
+            return False
+        if query.category is not None and item.category != query.category:
+            return False
+        if query.priority is not None and item.priority != query.priority:
+            return False
+        if query.linked_topic is not None:
+            if collection == 'tasks':
+                if item.linked_topic_id != query.linked_topic:
+                    return False
+            elif query.linked_topic not in item.linked_topics:
+                return False
+        if query.linked_case is not None and item.linked_case_id != query.linked_case:
+            return False
+        return True
+    return matches
+
+def _projection(collection: str, query: CollectionQuery) -> Optional[set]:
+    if not query.fields:
+        return None
+    fields = {name.strip() for name in query.fields.split(',') if name.strip()}
+    model = COLLECTION_MODELS[collection]
+    if model is not None:
+        unknown = fields - set(model.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown field(s) for {collection}: {', '.join(sorted(unknown))}")
+    return fields | {'id'}
+
+def _select_items(collection: str, items: list, query: CollectionQuery,
+                  positions: Optional[Dict[str, int]], headers: Dict[str, str]) -> list:
+    """
+    Apply cursor, filters, limit and projection; sets X-Next-Cursor when more
+    pages remain. positions is the id index when items is the whole collection.
+    """
+    start = 0
+    if query.cursor is not None:
+        if positions is not None:
+            position = positions.get(query.cursor)
+        else:
+            position = next((i for i, item in enumerate(items) if _entity_key(item) == query.cursor), None)
+        if position is None:
+            raise HTTPException(status_code=400, detail="Invalid or expired cursor")
+        start = position + 1
+
+    matches = _item_filter(collection, query)
+    fields = _projection(collection, query)
+    candidates = range(start, len(items))
+    inside = _bbox_keys(collection, _parse_bbox(query.bbox)) if query.bbox is not None else None
+    if inside is not None and positions is not None:
+        # Visit only what the spatial index found, in list order
+        candidates = sorted(position for position in (positions.get(key) for key in inside)
+                            if position is not None and position >= start)
+    selected = []
+    for position in candidates:
+        item = items[position]
+        if inside is not None and _entity_key(item) not in inside:
+            continue
+        if matches is not None and not matches(item):
+            continue
+        if query.limit is not None and len(selected) == query.limit:
+            headers['X-Next-Cursor'] = _entity_key(selected[-1])
+            break
+        selected.append(item)
+
+    if fields is None:
+        return selected
+    # Serialize only the requested fields instead of dumping whole entities
+    if COLLECTION_MODELS[collection] is None:
+        return [{name: item[name] for name in fields if name in item} for item in selected]
+    return [item.model_dump(mode='json', include=fields) for item in selected]
+
+def _collection_payload(state: StoreState, collection: str, since: Optional[int], query: CollectionQuery,
+                        headers: Dict[str, str]) -> Any:
+    """Plain list, or {revision, full, items, deleted} when since is given"""
+    items = getattr(state.data, collection)
+    positions = state.index[collection]
+    if since is None:
+        return _select_items(collection, items, query, positions, headers)
+    changes = mindmap_store.changes_since(collection, since, state)
+    if changes is None:
+        items = _select_items(collection, items, query, positions, headers)
+        return {"revision": state.revision, "full": True, "items": items, "deleted": []}
+    items, deleted = changes
+    items = _select_items(collection, items, query, None, headers)
+    return {"revision": state.revision, "full": False, "items": items, "deleted": deleted}
+
+async def _collection_response(request: Request, collection: str, since: Optional[int],
+                               query: CollectionQuery) -> Response:
+    state = await current_mind_map_state()
+    etag = mindmap_store.etag(collection, state)
+    if since is not None:
+        # Delta responses differ per since value, so they get their own validator
+        etag = f'{etag[:-1]}-since{since}"'
+    headers: Dict[str, str] = {}
+    return await _conditional_json(request, state, etag,
+                                   lambda: _collection_payload(state, collection, since, query, headers), headers)
+
 # NEW: Mind Map Data endpoints for local communication
 @api_router.get("/mindmap-data")
-async def get_mindmap_data():
-    """Get all mind map data from local JSON file"""
+async def get_mindmap_data(request: Request, since: Optional[int] = None, bbox: Optional[str] = None):
+    """
+    Get all mind map data from local JSON file. Answers 304 when If-None-Match
+    matches the current ETag; with ?since=<revision> only entities changed after
+    that revision are returned, plus the ids deleted since then. bbox=min_x,min_y,max_x,max_y
+    keeps only nodes positioned inside it (and connections touching them).
+    """
     try:
-        data = load_mind_map_data()
-        return data.dict()
+        region = _parse_bbox(bbox) if bbox is not None else None
+        state = await current_mind_map_state()
+        etag = mindmap_store.etag(state=state)
+        if since is None:
+            if region is not None:
+                return await _conditional_json(request, state, etag, lambda: _map_in_bbox(state, region))
+            return await _conditional_json(request, state, etag, lambda: state.data)
+
+        def build_delta():
+            delta: Dict[str, Any] = {"revision": state.revision, "full": False, "deleted": {}}
+            for collection in COLLECTION_MODELS:
+                changes = mindmap_store.changes_since(collection, since, state)
+                if changes is None:
+                    data = state.data if region is None else _map_in_bbox(state, region)
+                    return {"revision": state.revision, "full": True, "deleted": {}, **data.model_dump()}
+                delta[collection], delta["deleted"][collection] = changes
+                if region is not None:
+                    inside = _bbox_keys(collection, region)
+                    delta[collection] = [item for item in delta[collection] if _entity_key(item) in inside]
+            return delta
+
+        return await _conditional_json(request, state, f'{etag[:-1]}-since{since}"', build_delta)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting mind map data: {e}")
         raise HTTPException(status_code=500, detail="Failed to load mind map data")
 
-@api_router.put("/mindmap-data")
-async def save_mindmap_data(data: MindMapData):
-    """Save complete mind map data to local JSON file"""
+# Entities per chunk handed to the server by the NDJSON stream
+STREAM_BATCH_SIZE = 200
+
+def _ndjson_lines(data: MindMapData, revision: int):
+    """
+    Yield the map as NDJSON: a meta line, one line per entity tagged with its
+    collection, then an end line. Each entity is encoded on its own, so memory
+    stays proportional to one batch rather than the whole map.
+    """
+    # Shallow copies pin the current entities; writers replace entities rather than mutate them
+    collections = {collection: list(getattr(data, collection)) for collection in COLLECTION_MODELS}
+    meta = {"kind": "meta", "revision": revision,
+            "counts": {collection: len(items) for collection, items in collections.items()}}
+    yield json.dumps(meta) + '\n'
+    for collection, items in collections.items():
+        prefix = f'{{"kind":"{collection}","data":'
+        for start in range(0, len(items), STREAM_BATCH_SIZE):
+            chunk = []
+            for item in items[start:start + STREAM_BATCH_SIZE]:
+                chunk.append(f'{prefix}{_encode_entity(item)}}}\n')
+            yield ''.join(chunk)
+    yield json.dumps({"kind": "end", "revision": revision}) + '\n'
+
+def _catch_up_message(state: StoreState, since: int) -> str:
+    """One "change" event with everything after since, or "resync" when history does not reach back"""
+    ops = []
+    for collection in COLLECTION_MODELS:
+        changes = mindmap_store.changes_since(collection, since, state)
+        if changes is None:
+            return _sse_message('resync', json.dumps({"revision": state.revision}), state.revision)
+        items, deleted = changes
+        ops.extend(['put', collection, _entity_key(item), item] for item in items)
+        ops.extend(['del', collection, key, None] for key in deleted)
+    if not ops:
+        return ''
+    return _sse_message('change', f'{{"revision":{state.revision},"ops":[{_encode_ops(ops)}]}}', state.revision)
+
+@api_router.get("/mindmap-data/events")
+async def mindmap_events(request: Request, since: Optional[int] = None):
+    """
+    Server-Sent Events feed of committed changes. Events: "ready" (current
+    revision), "change" ({revision, ops: [[op, collection, id, value], ...]}, the
+    journal op format), "resync" (refetch the map) and "upload". since, or the
+    Last-Event-ID header on reconnect, first replays what the client missed.
+    """
+    last_event_id = request.headers.get('last-event-id', '')
+    if since is None and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    async def events():
+        # Subscribed in here, not in the handler: a client that disconnects before
+        # the first event means the generator never starts, and its finally never runs.
+        # Subscribe before reading the state so no commit falls in between; clients
+        # skip events at or below a revision they already have
+        queue = change_feed.subscribe()
+        try:
+            state = await current_mind_map_state()
+            catch_up = await run_io(_catch_up_message, state, since) if since is not None else ''
+            yield 'retry: 3000\n\n' + catch_up
+            yield _sse_message('ready', json.dumps({"revision": state.revision}), state.revision)
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), FEED_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield message
+        finally:
+            change_feed.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api_router.get("/mindmap-data/stream")
+async def stream_mindmap_data(request: Request):
+    """Stream the whole map as NDJSON so clients can render before the last node arrives"""
+    state = await current_mind_map_state()
+    etag = f'{mindmap_store.etag(state=state)[:-1]}-ndjson"'
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'X-Revision': str(state.revision)}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return StreamingResponse(_ndjson_lines(state.data, state.revision),
+                             media_type='application/x-ndjson', headers=headers)
+
+def _decode_body(body: bytes, content_type: str, model: type = MindMapData) -> Any:
+    try:
+        if any(media_type in content_type for media_type in MSGPACK_MEDIA_TYPES):
+            if msgpack is None:
+                raise HTTPException(status_code=415, detail="MessagePack support is not installed")
+            return model.model_validate(msgpack.unpackb(body))
+        return model.model_validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False, include_input=False))
+    except ValueError:
+        # msgpack's FormatError/ExtraData/StackError all derive from ValueError
+        raise HTTPException(status_code=400, detail="Malformed request body")
+
+async def _read_body(request: Request, model: type = MindMapData) -> Any:
+    """Parse a JSON or MessagePack (Content-Type: application/msgpack) request body into model"""
+    body = await request.body()
+    return await run_io(_decode_body, body, request.headers.get('content-type', ''), model)
+
+@api_router.put("/mindmap-data", openapi_extra={"requestBody": {"required": True, "content": {
+    "application/json": {"schema": {"$ref": "#/components/schemas/MindMapData"}},
+    MSGPACK_MEDIA_TYPE: {},
+}}})
+async def save_mindmap_data(request: Request, response: Response,
+                            expected: Optional[List[WritePrecondition]] = Depends(write_precondition)):
+    """Save complete mind map data (JSON, or MessagePack via Content-Type)"""
+    data = await _read_body(request)
     try:
-        save_mind_map_data(data)
-        return {"message": "Mind map data saved successfully"}
+        async with write_lock:
+            revision = await run_io(save_mind_map_data, data, expected)
+        _revision_headers(response, revision)
+        return {"message": "Mind map data saved successfully", "revision": revision}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error saving mind map data: {e}")
         raise HTTPException(status_code=500, detail="Failed to save mind map data")
 
+def build_patch_ops(operations: List[MindMapOperation]) -> List[list]:
+    """
+    Validate delta operations against the current state and turn them into
+    store ops. Only the touched entities are validated; later operations see
+    the results of earlier ones in the same request.
+    """
+    pending: Dict[tuple, Any] = {}  # (collection, id) -> entity, or None once removed
+    ops = []
+
+    def current(collection: str, key: str) -> Any:
+        if (collection, key) in pending:
+            return pending[(collection, key)]
+        return mindmap_store.lookup(collection, key)
+
+    for number, operation in enumerate(operations):
+        collection = operation.collection.value
+        model = COLLECTION_MODELS[collection]
+        value = dict(operation.value or {})
+
+        if operation.op == PatchOp.REMOVE or operation.op == PatchOp.REPLACE:
+            if not operation.id:
+                raise HTTPException(status_code=400, detail=f"Operation {number}: id is required for {operation.op.value}")
+            existing = current(collection, operation.id)
+            if existing is None:
+                raise HTTPException(status_code=404, detail=f"Operation {number}: {collection} '{operation.id}' not found")
+
+        if operation.op == PatchOp.REMOVE:
+            pending[(collection, operation.id)] = None
+            ops.append(['del', collection, operation.id, None])
+            continue
+
+        if operation.op == PatchOp.ADD:
+            if operation.id:
+                value['id'] = operation.id
+            elif model is None and not value.get('id'):
+                value['id'] = f"conn-{uuid.uuid4()}"
+        else:
+            base = existing if isinstance(existing, dict) else existing.model_dump()
+            value = {**base, **value, 'id': operation.id}
+            if model is not None and 'updated_at' not in (operation.value or {}):
+                value['updated_at'] = datetime.utcnow()
+
+        try:
+            # Connections are stored as plain dicts, but get the same checks as POST /api/connections
+            entity = model(**value) if model else ConnectionCreate(**value).model_dump(exclude_none=True)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail={"operation": number, "errors": e.errors(include_url=False)})
+        if model is None:
+            # Only the ends this operation sets: a replace may leave an old dangling end alone
+            ends = [entity[end] for end in ('source', 'target')
+                    if operation.op == PatchOp.ADD or end in (operation.value or {})]
+            missing = [node for node in ends
+                       if (parsed := _parse_node_id(node)) is None or current(*parsed) is None]
+            if missing:
+                raise HTTPException(status_code=422,
+                                    detail=f"Operation {number}: nodes not found: {', '.join(missing)}")
+
+        key = _entity_key(entity)
+        if operation.op == PatchOp.ADD and current(collection, key) is not None:
+            raise HTTPException(status_code=409, detail=f"Operation {number}: {collection} '{key}' already exists")
+        pending[(collection, key)] = entity
+        ops.append(['put', collection, key, entity])
+    return ops
+
+@api_router.patch("/mindmap-data")
+async def patch_mindmap_data(patch: MindMapPatch, response: Response,
+                             expected: Optional[List[WritePrecondition]] = Depends(write_precondition)):
+    """Apply add/replace/remove operations keyed by entity id and persist only the change"""
+    try:
+        async with write_lock:
+            await current_mind_map_state()
+            revision = mindmap_store.check_precondition(expected).revision
+            ops = build_patch_ops(patch.operations)
+            if ops:
+                revision = await run_io(mindmap_store.commit, ops, expected)
+        _revision_headers(response, revision)
+        return {"message": "Mind map data patched successfully", "revision": revision, "applied": len(ops)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error patching mind map data: {e}")
+        raise HTTPException(status_code=500, detail="Failed to patch mind map data")
+
+# Bulk moves: the frontend's most frequent write. Only positions are sent and only
+# positions are journaled ("pos" ops), so dragging a selection stays one small write.
+def _position_entries(collection: str, entries: Union[list, PackedPositions]) -> List[Tuple[str, float, float]]:
+    if isinstance(entries, PackedPositions):
+        try:
+            raw = entries.xy if isinstance(entries.xy, bytes) else base64.b64decode(entries.xy, validate=True)
+        except ValueError:
+            raise HTTPException(status_code=422, detail=f"{collection}: xy is not valid base64")
+        if len(raw) != 16 * len(entries.ids):
+            raise HTTPException(status_code=422, detail=f"{collection}: xy must hold one float64 x, y pair per id")
+        entries = [(key, x, y) for key, (x, y) in zip(entries.ids, struct.iter_unpack('<dd', raw))]
+    for key, x, y in entries:
+        if not (math.isfinite(x) and math.isfinite(y)):
+            raise HTTPException(status_code=422, detail=f"{collection} '{key}': position must be finite")
+    return entries
+
+def build_position_ops(batch: PositionBatch) -> Tuple[List[list], Dict[str, List[str]]]:
+    """'pos' ops moving each listed entity, plus the ids that were not found"""
+    state = mindmap_store.state()
+    ops: List[list] = []
+    missing: Dict[str, List[str]] = {}
+    for collection in PositionBatch.model_fields:
+        entries = getattr(batch, collection)
+        if entries is None:
+            continue
+        items = getattr(state.data, collection)
+        positions = state.index[collection]
+        for key, x, y in _position_entries(collection, entries):
+            position = positions.get(key)
+            if position is None:
+                missing.setdefault(collection, []).append(key)
+                continue
+            # Positions are layout, not content: updated_at is left alone
+            moved = items[position].model_copy(update={'position': {'x': x, 'y': y}})
+            ops.append(['pos', collection, key, moved])
+    return ops, missing
+
+@api_router.patch("/positions", openapi_extra={"requestBody": {"required": True, "content": {
+    "application/json": {"schema": {"$ref": "#/components/schemas/PositionBatch"}},
+    MSGPACK_MEDIA_TYPE: {},
+}}})
+async def update_positions(request: Request, response: Response,
+                           expected: Optional[List[WritePrecondition]] = Depends(write_precondition)):
+    """Move many nodes at once: {"topics": [[id, x, y], ...]} or {"topics": {"ids": [...], "xy": packed}}"""
+    batch = await _read_body(request, PositionBatch)
+    async with write_lock:
+        await current_mind_map_state()
+        revision = mindmap_store.check_precondition(expected).revision
+        ops, missing = build_position_ops(batch)
+        if ops:
+            revision = await run_io(mindmap_store.commit, ops, expected)
+    _revision_headers(response, revision)
+    return {"revision": revision, "moved": len(ops), "missing": missing}
+
 # Individual CRUD endpoints (kept for compatibility)
 @api_router.get("/topics", response_model=List[PsychiatricTopic])
-async def get_topics():
-    data = load_mind_map_data()
-    return data.topics
+async def get_topics(request: Request, since: Optional[int] = None, query: CollectionQuery = Depends()):
+    return await _collection_response(request, "topics", since, query)
 
 @api_router.get("/cases", response_model=List[PatientCase])
-async def get_cases():
-    data = load_mind_map_data()
-    return data.cases
+async def get_cases(request: Request, since: Optional[int] = None, query: CollectionQuery = Depends()):
+    return await _collection_response(request, "cases", since, query)
 
 @api_router.get("/tasks", response_model=List[Task])
-async def get_tasks():
-    data = load_mind_map_data()
-    return data.tasks
+async def get_tasks(request: Request, since: Optional[int] = None, query: CollectionQuery = Depends()):
+    return await _collection_response(request, "tasks", since, query)
 
 @api_router.get("/literature", response_model=List[Literature])
-async def get_literature():
-    data = load_mind_map_data()
-    return data.literature
+async def get_literature(request: Request, since: Optional[int] = None, query: CollectionQuery = Depends()):
+    return await _collection_response(request, "literature", since, query)
+
+@api_router.get("/connections", response_model=List[Dict[str, Any]])
+async def get_connections(request: Request, since: Optional[int] = None, query: CollectionQuery = Depends()):
+    return await _collection_response(request, "connections", since, query)
+
+# Per-entity CRUD: GET/PATCH/DELETE /api/<collection>/<id> and POST /api/<collection>.
+# Lookups go through the store's id index, so none of these scan a collection.
+NODE_ID_PREFIXES = {
+    'topics': 'topic',
+    'cases': 'case',
+    'tasks': 'task',
+    'literature': 'literature',
+}
+
+def cascade_delete_ops(state: StoreState, collection: str, key: str) -> List[list]:
+    """
+    Ops that delete an entity and clean up every reference to it: linked_topics,
+    linked_case_id/linked_topic_id and connections touching its node. The graph
+    index supplies the referencing entities, so no collection is scanned.
+    """
+    ops = [['del', collection, key, None]]
+    if collection not in NODE_ID_PREFIXES:
+        return ops
+    node_id = _node_id(collection, key)
+    now = datetime.utcnow()
+    updated: Dict[tuple, Any] = {}
+    for edge in graph_index.incident(node_id):
+        owner_collection, owner_key = edge.owner
+        if edge.owner == (collection, key):
+            continue
+        if owner_collection == 'connections':
+            ops.append(['del', 'connections', owner_key, None])
+            continue
+        entity = updated.get(edge.owner)
+        if entity is None:
+            position = state.index[owner_collection].get(owner_key)
+            if position is None:
+                continue
+            entity = getattr(state.data, owner_collection)[position]
+        if owner_collection == 'tasks':
+            field = 'linked_topic_id' if collection == 'topics' else 'linked_case_id'
+            entity = entity.model_copy(update={field: None, 'updated_at': now})
+        else:
+            linked_topics = [topic_id for topic_id in entity.linked_topics if topic_id != key]
+            entity = entity.model_copy(update={'linked_topics': linked_topics, 'updated_at': now})
+        updated[edge.owner] = entity
+    ops.extend(['put', owner_collection, owner_key, entity] for (owner_collection, owner_key), entity in updated.items())
+    return ops
+
+def _register_entity_routes(collection: MindMapCollection, create_model: type) -> None:
+    name = collection.value
+    model = COLLECTION_MODELS[name]
+
+    async def get_or_404(entity_id: str, expected: Optional[List[WritePrecondition]] = None) -> Any:
+        await current_mind_map_state()
+        mindmap_store.check_precondition(expected)
+        entity = mindmap_store.lookup(name, entity_id)
+        if entity is None:
+            raise HTTPException(status_code=404, detail=f"{name} '{entity_id}' not found")
+        return entity
+
+    @api_router.get(f"/{name}/{{entity_id}}", name=f"get_{name}_entity")
+    async def get_entity(entity_id: str):
+        return await get_or_404(entity_id)
+
+    @api_router.post(f"/{name}", status_code=201, name=f"create_{name}_entity")
+    async def create_entity(payload: create_model,
+                            expected: Optional[List[WritePrecondition]] = Depends(write_precondition)):
+        value = payload.model_dump(exclude_none=model is None)
+        if model is None and not value.get('id'):
+            value['id'] = f"conn-{uuid.uuid4()}"
+        entity = model(**value) if model else value
+        key = _entity_key(entity)
+        async with write_lock:
+            await current_mind_map_state()
+            mindmap_store.check_precondition(expected)
+            if mindmap_store.lookup(name, key) is not None:
+                raise HTTPException(status_code=409, detail=f"{name} '{key}' already exists")
+            revision = await run_io(mindmap_store.commit, [['put', name, key, entity]], expected)
+        return JSONResponse(jsonable_encoder(entity), status_code=201,
+                            headers={'ETag': f'"r{revision}"', 'X-Revision': str(revision)})
+
+    @api_router.patch(f"/{name}/{{entity_id}}", name=f"update_{name}_entity")
+    async def update_entity(entity_id: str, changes: Dict[str, Any],
+                            expected: Optional[List[WritePrecondition]] = Depends(write_precondition)):
+        async with write_lock:
+            await get_or_404(entity_id, expected)
+            operation = MindMapOperation(op=PatchOp.REPLACE, collection=collection, id=entity_id, value=changes)
+            ops = build_patch_ops([operation])
+            revision = await run_io(mindmap_store.commit, ops, expected)
+        return JSONResponse(jsonable_encoder(ops[0][3]),
+                            headers={'ETag': f'"r{revision}"', 'X-Revision': str(revision)})
+
+    @api_router.delete(f"/{name}/{{entity_id}}", name=f"delete_{name}_entity")
+    async def delete_entity(entity_id: str, response: Response,
+                            expected: Optional[List[WritePrecondition]] = Depends(write_precondition)):
+        async with write_lock:
+            await get_or_404(entity_id, expected)
+            ops = await run_io(cascade_delete_ops, mindmap_store.state(), name, entity_id)
+            revision = await run_io(mindmap_store.commit, ops, expected)
+        _revision_headers(response, revision)
+        updated: Dict[str, List[str]] = {}
+        removed: Dict[str, List[str]] = {}
+        for op, op_collection, key, _ in ops:
+            (removed if op == 'del' else updated).setdefault(op_collection, []).append(key)
+        return {"message": f"Deleted {name} '{entity_id}'", "revision": revision,
+                "removed": removed, "updated": updated}
+
+_register_entity_routes(MindMapCollection.TOPICS, PsychiatricTopicCreate)
+_register_entity_routes(MindMapCollection.CASES, PatientCaseCreate)
+_register_entity_routes(MindMapCollection.TASKS, TaskCreate)
+_register_entity_routes(MindMapCollection.LITERATURE, LiteratureCreate)
+_register_entity_routes(MindMapCollection.CONNECTIONS, ConnectionCreate)
+
+# Full-text search: an inverted index over the text fields, so a write
+# re-tokenizes only the entities it touched.
+# Indexed fields per collection with their weight (BM25F-style: a title hit counts triple)
+SEARCH_FIELDS = {
+    'topics': {'title': 3.0, 'category': 1.5, 'tags': 1.5, 'description': 1.0, 'definition': 1.0,
+               'notes': 1.0, 'diagnostic_criteria': 1.0, 'comorbidities': 1.0, 'differential_diagnoses': 1.0},
+    'cases': {'case_id': 3.0, 'primary_diagnosis': 3.0, 'secondary_diagnoses': 1.5, 'chief_complaint': 1.5,
+              'initial_presentation': 1.0, 'current_presentation': 1.0, 'medication_history': 1.0,
+              'therapy_progress': 1.0, 'defense_patterns': 1.0, 'clinical_reflection': 1.0,
+              'history_present_illness': 1.0, 'medical_history': 1.0, 'mental_status_exam': 1.0,
+              'assessment_plan': 1.0, 'notes': 1.0},
+    'tasks': {'title': 3.0, 'description': 1.0, 'notes': 1.0},
+    'literature': {'title': 3.0, 'authors': 1.5, 'publication': 1.0, 'abstract': 1.0, 'notes': 1.0},
+}
+SEARCH_LABEL_FIELDS = {'topics': 'title', 'cases': 'case_id', 'tasks': 'title', 'literature': 'title'}
+# Set to keep the index in MINDMAP_SEARCH_INDEX_FILE across restarts instead of re-tokenizing on the first query
+SEARCH_INDEX_PERSIST = os.environ.get('MINDMAP_SEARCH_PERSIST', '0') == '1'
+MINDMAP_SEARCH_INDEX_FILE = ROOT_DIR / 'mindmap_search.json'
+# A query term shorter than this is matched exactly rather than as a prefix
+SEARCH_MIN_PREFIX = 2
+SEARCH_MAX_EXPANSIONS = 64
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def _document_terms(collection: str, entity: Any) -> Dict[str, float]:
+    """Weighted term frequencies of one entity's indexed fields"""
+    terms: Dict[str, float] = {}
+    for field, weight in SEARCH_FIELDS[collection].items():
+        value = getattr(entity, field, None)
+        if not value:
+            continue
+        for text in (value if isinstance(value, list) else [value]):
+            for token in search_tokens(str(text)):
+                terms[token] = terms.get(token, 0.0) + weight
+    return terms
+
+class SearchIndex(DerivedIndex):
+    """
+    Inverted index (term -> {(collection, id): weighted tf}) with BM25 ranking.
+    A sorted vocabulary makes prefix expansion a bisect.
+    """
+
+    def __init__(self, store: MindMapStore, path: Optional[Path] = None):
+        super().__init__(store)
+        self.path = path
+        self._postings: Dict[str, Dict[tuple, float]] = {}
+        self._documents: Dict[tuple, Dict[str, float]] = {}
+        self._lengths: Dict[tuple, float] = {}
+        self._total_length = 0.0
+        self._vocabulary: List[str] = []
+
+    def _apply(self, ops: List[list]) -> None:
+        for op, collection, key, entity in ops:
+            if collection not in SEARCH_FIELDS or op == 'pos':
+                continue
+            self._remove((collection, key))
+            if op == 'put':
+                self._add((collection, key), _document_terms(collection, entity))
+
+    def search(self, query: str, collections: Optional[List[str]] = None, limit: int = 20,
+               describe=None) -> Dict[str, Any]:
+        """
+        Entities matching every query term (the last ones as prefixes), best BM25
+        score first. describe(collection, entity) may add fields to each hit.
+        """
+        self.ensure_built()
+        tokens = search_tokens(query)
+        with self.lock:
+            scores: Optional[Dict[tuple, float]] = None
+            for token in dict.fromkeys(tokens):
+                token_scores = self._score_token(token)
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {doc: score + token_scores[doc] for doc, score in scores.items() if doc in token_scores}
+                if not scores:
+                    break
+            scores = scores or {}
+            if collections:
+                scores = {doc: score for doc, score in scores.items() if doc[0] in collections}
+            ranked = heapq.nlargest(limit, scores.items(), key=lambda hit: hit[1])
+            revision = self.revision
+        state = self.store.state()
+        hits = []
+        for (collection, key), score in ranked:
+            position = state.index[collection].get(key)
+            if position is None:
+                continue
+            entity = getattr(state.data, collection)[position]
+            hit = {"collection": collection, "id": key, "node_id": f"{NODE_ID_PREFIXES[collection]}-{key}",
+                   "label": getattr(entity, SEARCH_LABEL_FIELDS[collection]), "score": round(score, 4)}
+            if describe is not None:
+                hit.update(describe(collection, entity))
+            hits.append(hit)
+        return {"query": query, "revision": revision, "total": len(scores), "hits": hits}
+
+    def save(self) -> None:
+        """Write the index next to the data file (only when MINDMAP_SEARCH_PERSIST is set)"""
+        if self.path is None:
+            return
+        with self.lock:
+            if self.revision is None:
+                return
+            documents = [[collection, key, terms] for (collection, key), terms in self._documents.items()]
+            payload = json.dumps({"revision": self.revision, "documents": documents}, separators=(',', ':'))
+        _write_bytes_atomic(self.path, payload.encode('utf-8'))
+
+    def _rebuild(self, state: StoreState) -> None:
+        documents = self._load(state.revision)
+        if documents is None:
+            documents = {
+                (collection, _entity_key(entity)): _document_terms(collection, entity)
+                for collection in SEARCH_FIELDS for entity in getattr(state.data, collection)
+            }
+        self._reset()
+        for doc, terms in documents.items():
+            self._add(doc, terms, sort=False)
+        self._vocabulary.sort()
+
+    def _load(self, revision: int) -> Optional[Dict[tuple, Dict[str, float]]]:
+        if self.path is None or not self.path.exists():
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                saved = json.loads(f.read())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable search index {self.path.name}: {e}")
+            return None
+        if saved.get('revision') != revision:
+            return None
+        return {(collection, key): terms for collection, key, terms in saved['documents']}
+
+    def _reset(self) -> None:
+        self._postings = {}
+        self._documents = {}
+        self._lengths = {}
+        self._total_length = 0.0
+        self._vocabulary = []
+
+    def _add(self, doc: tuple, terms: Dict[str, float], sort: bool = True) -> None:
+        self._documents[doc] = terms
+        length = sum(terms.values())
+        self._lengths[doc] = length
+        self._total_length += length
+        for term, frequency in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                if sort:
+                    bisect.insort(self._vocabulary, term)
+                else:
+                    self._vocabulary.append(term)
+            postings[doc] = frequency
+
+    def _remove(self, doc: tuple) -> None:
+        terms = self._documents.pop(doc, None)
+        if terms is None:
+            return
+        self._total_length -= self._lengths.pop(doc)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc]
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, term)]
+
+    def _score_token(self, token: str) -> Dict[tuple, float]:
+        """BM25 contribution of one query token; prefix expansions score like the exact term"""
+        if len(token) < SEARCH_MIN_PREFIX:
+            terms = [token] if token in self._postings else []
+        else:
+            start = bisect.bisect_left(self._vocabulary, token)
+            end = bisect.bisect_left(self._vocabulary, token + '\U0010ffff', start)
+            terms = self._vocabulary[start:min(end, start + SEARCH_MAX_EXPANSIONS)]
+        count = len(self._documents)
+        average_length = self._total_length / count if count else 1.0
+        scores: Dict[tuple, float] = {}
+        for term in terms:
+            postings = self._postings[term]
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, frequency in postings.items():
+                norm = 1 - BM25_B + BM25_B * self._lengths[doc] / average_length
+                score = idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * norm)
+                # A document matching several expansions keeps its best one
+                if score > scores.get(doc, 0.0):
+                    scores[doc] = score
+        return scores
+
+search_index = SearchIndex(mindmap_store, MINDMAP_SEARCH_INDEX_FILE if SEARCH_INDEX_PERSIST else None)
+
+@api_router.get("/search")
+async def search(q: str, collection: Optional[List[MindMapCollection]] = Query(None),
+                 limit: int = Query(20, ge=1, le=200)):
+    """Ranked full-text search over topics, cases, tasks and literature (prefix matching on each term)"""
+    collections = [c.value for c in collection] if collection else None
+    if collections and any(c not in SEARCH_FIELDS for c in collections):
+        raise HTTPException(status_code=400, detail=f"Searchable collections: {', '.join(SEARCH_FIELDS)}")
+    await current_mind_map_state()
+    return await run_io(search_index.search, q, collections, limit)
+
+# Graph queries: one adjacency index over every kind of link (connections,
+# linked_topics on cases/literature, linked_case_id/linked_topic_id on tasks),
+# addressed by the frontend's node ids ("topic-<id>", "case-<id>", ...).
+COLLECTIONS_BY_NODE_PREFIX = {prefix: collection for collection, prefix in NODE_ID_PREFIXES.items()}
+
+class GraphEdge(NamedTuple):
+    id: str
+    source: str
+    target: str
+    kind: str           # "connection", "linked_topic" or "linked_case"
+    owner: tuple        # (collection, id) of the entity the link is stored on
+
+def _node_id(collection: str, key: str) -> str:
+    return f"{NODE_ID_PREFIXES[collection]}-{key}"
+
+def _parse_node_id(node_id: str) -> Optional[Tuple[str, str]]:
+    prefix, _, key = node_id.partition('-')
+    collection = COLLECTIONS_BY_NODE_PREFIX.get(prefix)
+    return (collection, key) if collection and key else None
+
+def _entity_edges(collection: str, key: str, entity: Any) -> List[GraphEdge]:
+    """Links stored on one entity"""
+    owner = (collection, key)
+    if collection == 'connections':
+        source, target = entity.get('source'), entity.get('target')
+        return [GraphEdge(key, source, target, 'connection', owner)] if source and target else []
+    node = _node_id(collection, key)
+    edges = []
+    for topic_id in getattr(entity, 'linked_topics', None) or []:
+        edges.append(GraphEdge(f"{node}>topic-{topic_id}", node, f"topic-{topic_id}", 'linked_topic', owner))
+    if collection == 'tasks':
+        if entity.linked_topic_id:
+            target = f"topic-{entity.linked_topic_id}"
+            edges.append(GraphEdge(f"{node}>{target}", node, target, 'linked_topic', owner))
+        if entity.linked_case_id:
+            target = f"case-{entity.linked_case_id}"
+            edges.append(GraphEdge(f"{node}>{target}", node, target, 'linked_case', owner))
+    return edges
+
+class GraphIndex(DerivedIndex):
+    """
+    Undirected adjacency (node id -> {edge id: GraphEdge}) plus the edges each
+    entity owns, so replacing or deleting an entity touches only its own links.
+    Edges may point at nodes that no longer exist; queries skip those.
+    """
+
+    def __init__(self, store: MindMapStore):
+        super().__init__(store)
+        self._incident: Dict[str, Dict[str, GraphEdge]] = {}
+        self._owned: Dict[tuple, List[GraphEdge]] = {}
+
+    def _rebuild(self, state: StoreState) -> None:
+        self._incident = {}
+        self._owned = {}
+        for collection in COLLECTION_MODELS:
+            for entity in getattr(state.data, collection):
+                self._add(collection, _entity_key(entity), entity)
+
+    def _apply(self, ops: List[list]) -> None:
+        for op, collection, key, entity in ops:
+            if op == 'pos':
+                continue
+            self._remove((collection, key))
+            if op == 'put':
+                self._add(collection, key, entity)
+
+    def _add(self, collection: str, key: str, entity: Any) -> None:
+        edges = _entity_edges(collection, key, entity)
+        if edges:
+            self._owned[(collection, key)] = edges
+        for edge in edges:
+            self._incident.setdefault(edge.source, {})[edge.id] = edge
+            self._incident.setdefault(edge.target, {})[edge.id] = edge
+
+    def _remove(self, owner: tuple) -> None:
+        for edge in self._owned.pop(owner, []):
+            for node in (edge.source, edge.target):
+                incident = self._incident.get(node)
+                if incident is not None:
+                    incident.pop(edge.id, None)
+                    if not incident:
+                        del self._incident[node]
+
+    def incident(self, node_id: str) -> List[GraphEdge]:
+        self.ensure_built()
+        with self.lock:
+            return list(self._incident.get(node_id, {}).values())
+
+    def _neighbors(self, node_id: str, exists) -> List[str]:
+        # Caller holds self.lock
+        seen = []
+        for edge in self._incident.get(node_id, {}).values():
+            other = edge.target if edge.source == node_id else edge.source
+            if other != node_id and exists(other) and other not in seen:
+                seen.append(other)
+        return seen
+
+    def neighborhood(self, seeds: List[str], depth: int, max_nodes: int, exists) -> Tuple[Dict[str, int], bool]:
+        """BFS from seeds up to depth hops: {node id: hops}, and whether max_nodes cut it short"""
+        self.ensure_built()
+        hops = {seed: 0 for seed in seeds if exists(seed)}
+        frontier = list(hops)
+        with self.lock:
+            for distance in range(1, depth + 1):
+                next_frontier = []
+                for node in frontier:
+                    for other in self._neighbors(node, exists):
+                        if other in hops:
+                            continue
+                        if len(hops) >= max_nodes:
+                            return hops, True
+                        hops[other] = distance
+                        next_frontier.append(other)
+                frontier = next_frontier
+        return hops, False
+
+    def shortest_path(self, source: str, target: str, exists) -> Optional[List[str]]:
+        """Fewest-hops path (bidirectional BFS); None when the nodes are not connected"""
+        self.ensure_built()
+        if not (exists(source) and exists(target)):
+            return None
+        if source == target:
+            return [source]
+        parents = {source: None}
+        children = {target: None}
+        source_frontier, target_frontier = [source], [target]
+        with self.lock:
+            while source_frontier and target_frontier:
+                # Expand the smaller side
+                if len(source_frontier) <= len(target_frontier):
+                    source_frontier, meeting = self._expand(source_frontier, parents, children, exists)
+                else:
+                    target_frontier, meeting = self._expand(target_frontier, children, parents, exists)
+                if meeting is not None:
+                    path = []
+                    node = meeting
+                    while node is not None:
+                        path.append(node)
+                        node = parents[node]
+                    path.reverse()
+                    node = children[meeting]
+                    while node is not None:
+                        path.append(node)
+                        node = children[node]
+                    return path
+        return None
+
+    def _expand(self, frontier: List[str], visited: Dict[str, Optional[str]], other_side: Dict[str, Optional[str]],
+                exists) -> Tuple[List[str], Optional[str]]:
+        next_frontier = []
+        for node in frontier:
+            for other in self._neighbors(node, exists):
+                if other in visited:
+                    continue
+                visited[other] = node
+                if other in other_side:
+                    return next_frontier, other
+                next_frontier.append(other)
+        return next_frontier, None
+
+    def components(self, nodes: List[str], exists) -> List[List[str]]:
+        """Connected components over the given (existing) nodes, largest first"""
+        self.ensure_built()
+        seen = set()
+        components = []
+        with self.lock:
+            for start in nodes:
+                if start in seen:
+                    continue
+                seen.add(start)
+                component, stack = [], [start]
+                while stack:
+                    node = stack.pop()
+                    component.append(node)
+                    for other in self._neighbors(node, exists):
+                        if other not in seen:
+                            seen.add(other)
+                            stack.append(other)
+                components.append(component)
+        components.sort(key=len, reverse=True)
+        return components
+
+graph_index = GraphIndex(mindmap_store)
+
+def _node_lookup(state: StoreState):
+    """exists(node id) and entity(node id) against one state"""
+    def entity(node_id: str) -> Any:
+        parsed = _parse_node_id(node_id)
+        if parsed is None:
+            return None
+        collection, key = parsed
+        position = state.index[collection].get(key)
+        return None if position is None else getattr(state.data, collection)[position]
+    return (lambda node_id: entity(node_id) is not None), entity
+
+def _edge_payload(edge: GraphEdge) -> Dict[str, str]:
+    return {"id": edge.id, "source": edge.source, "target": edge.target, "kind": edge.kind}
+
+def _subgraph_payload(state: StoreState, nodes: List[str], entity) -> Dict[str, Any]:
+    """Map-shaped subset: the nodes' entities, connections among them, and every link among them"""
+    included = set(nodes)
+    payload: Dict[str, Any] = {collection: [] for collection in COLLECTION_MODELS}
+    for node in nodes:
+        collection, _ = _parse_node_id(node)
+        payload[collection].append(entity(node))
+    edges = {}
+    for node in nodes:
+        for edge in graph_index.incident(node):
+            if edge.source in included and edge.target in included:
+                edges[edge.id] = edge
+    connections = state.index['connections']
+    for edge in edges.values():
+        if edge.kind == 'connection' and edge.id in connections:
+            payload['connections'].append(state.data.connections[connections[edge.id]])
+    payload['edges'] = [_edge_payload(edge) for edge in edges.values()]
+    payload['revision'] = state.revision
+    return payload
+
+@api_router.get("/graph/neighbors/{node_id}")
+async def graph_neighbors(node_id: str):
+    """Nodes one link away from node_id, with the links between them"""
+    state = await current_mind_map_state()
+    exists, entity = _node_lookup(state)
+    if not exists(node_id):
+        raise HTTPException(status_code=404, detail=f"Node '{node_id}' not found")
+    edges = await run_io(graph_index.incident, node_id)
+    neighbors: Dict[str, List[Dict[str, str]]] = {}
+    for edge in edges:
+        other = edge.target if edge.source == node_id else edge.source
+        if other != node_id and exists(other):
+            neighbors.setdefault(other, []).append(_edge_payload(edge))
+    return {"node_id": node_id, "revision": state.revision,
+            "neighbors": [{"node_id": other, "edges": links} for other, links in neighbors.items()]}
+
+@api_router.get("/graph/subgraph")
+async def graph_subgraph(node: List[str] = Query(...), depth: int = Query(1, ge=0, le=10),
+                         max_nodes: int = Query(500, ge=1, le=10000)):
+    """
+    Everything within depth links of the given node(s), shaped like
+    /api/mindmap-data plus "edges" and "hops", for focus-mode views
+    """
+    state = await current_mind_map_state()
+    exists, entity = _node_lookup(state)
+    missing = [seed for seed in node if not exists(seed)]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Nodes not found: {', '.join(missing)}")
+    hops, truncated = await run_io(graph_index.neighborhood, node, depth, max_nodes, exists)
+    payload = await run_encode(_subgraph_payload, state, list(hops), entity)
+    payload.update(hops=hops, truncated=truncated)
+    return payload
+
+@api_router.get("/graph/path")
+async def graph_path(source: str, target: str):
+    """Shortest path (fewest links) between two nodes"""
+    state = await current_mind_map_state()
+    exists, _ = _node_lookup(state)
+    for node_id in (source, target):
+        if not exists(node_id):
+            raise HTTPException(status_code=404, detail=f"Node '{node_id}' not found")
+    path = await run_io(graph_index.shortest_path, source, target, exists)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No path between '{source}' and '{target}'")
+    edges = []
+    for here, there in zip(path, path[1:]):
+        edge = next(edge for edge in graph_index.incident(here) if there in (edge.source, edge.target))
+        edges.append(_edge_payload(edge))
+    return {"revision": state.revision, "length": len(path) - 1, "path": path, "edges": edges}
+
+@api_router.get("/graph/components")
+async def graph_components(min_size: int = Query(1, ge=1), limit: int = Query(100, ge=1, le=10000)):
+    """Connected components, largest first"""
+    state = await current_mind_map_state()
+    exists, _ = _node_lookup(state)
+    nodes = [_node_id(collection, key) for collection in NODE_ID_PREFIXES for key in state.index[collection]]
+    components = await run_io(graph_index.components, nodes, exists)
+    components = [component for component in components if len(component) >= min_size]
+    return {"revision": state.revision, "count": len(components),
+            "components": [{"size": len(component), "nodes": component} for component in components[:limit]]}
+
+# Spatial queries: viewport (bbox) filtering and nearest-node lookup over node positions
+SPATIAL_COLLECTIONS = tuple(NODE_ID_PREFIXES)
+
+class SpatialIndex(DerivedIndex):
+    """
+    Node positions in NumPy arrays, one slot per node (freed slots are reused).
+    A viewport or nearest-node query is one vectorized pass over contiguous
+    arrays instead of a Python loop over entities; a move rewrites one slot.
+    """
+
+    def __init__(self, store: MindMapStore):
+        super().__init__(store)
+        self._xy = np.zeros((0, 2))
+        self._codes = np.zeros(0, dtype=np.int8)  # index into SPATIAL_COLLECTIONS, -1 for a free slot
+        self._keys: List[Optional[tuple]] = []
+        self._slots: Dict[tuple, int] = {}
+        self._free: List[int] = []
+
+    def _rebuild(self, state: StoreState) -> None:
+        keys, xy, codes = [], [], []
+        for code, collection in enumerate(SPATIAL_COLLECTIONS):
+            for entity in getattr(state.data, collection):
+                keys.append((collection, _entity_key(entity)))
+                xy.append((entity.position.get('x', 0.0), entity.position.get('y', 0.0)))
+                codes.append(code)
+        self._xy = np.array(xy, dtype=np.float64).reshape(-1, 2)
+        self._codes = np.array(codes, dtype=np.int8)
+        self._keys = keys
+        self._slots = {key: slot for slot, key in enumerate(keys)}
+        self._free = []
+
+    def _apply(self, ops: List[list]) -> None:
+        for op, collection, key, entity in ops:
+            if collection not in NODE_ID_PREFIXES:
+                continue
+            slot = self._slots.get((collection, key))
+            if op == 'del':
+                if slot is not None:
+                    del self._slots[(collection, key)]
+                    self._keys[slot] = None
+                    self._codes[slot] = -1
+                    self._free.append(slot)
+                continue
+            if slot is None:
+                slot = self._allocate((collection, key), SPATIAL_COLLECTIONS.index(collection))
+            self._xy[slot] = (entity.position.get('x', 0.0), entity.position.get('y', 0.0))
+
+    def _allocate(self, key: tuple, code: int) -> int:
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._keys)
+            if slot == len(self._xy):
+                # Grow geometrically so a run of inserts stays amortized O(1)
+                capacity = max(16, 2 * slot)
+                self._xy = np.resize(self._xy, (capacity, 2))
+                self._codes = np.concatenate([self._codes, np.full(capacity - slot, -1, dtype=np.int8)])
+            self._keys.append(None)
+        self._keys[slot] = key
+        self._slots[key] = slot
+        self._codes[slot] = code
+        return slot
+
+    def _live(self, collections: Optional[List[str]]) -> np.ndarray:
+        live = self._codes[:len(self._keys)]
+        if collections is None:
+            return live >= 0
+        return np.isin(live, [SPATIAL_COLLECTIONS.index(collection) for collection in collections])
+
+    def within(self, region: Tuple[float, float, float, float],
+               collections: Optional[List[str]] = None) -> List[tuple]:
+        """(collection, id) of every node whose position lies inside region (edges inclusive)"""
+        self.ensure_built()
+        min_x, min_y, max_x, max_y = region
+        with self.lock:
+            xy = self._xy[:len(self._keys)]
+            mask = self._live(collections)
+            mask &= (xy[:, 0] >= min_x) & (xy[:, 0] <= max_x) & (xy[:, 1] >= min_y) & (xy[:, 1] <= max_y)
+            return [self._keys[slot] for slot in np.flatnonzero(mask)]
+
+    def nearest(self, x: float, y: float, count: int = 1,
+                collections: Optional[List[str]] = None) -> List[Tuple[tuple, float, float, float]]:
+        """The count nodes closest to (x, y): ((collection, id), x, y, distance), closest first"""
+        self.ensure_built()
+        with self.lock:
+            xy = self._xy[:len(self._keys)]
+            slots = np.flatnonzero(self._live(collections))
+            if not len(slots):
+                return []
+            distances = np.hypot(xy[slots, 0] - x, xy[slots, 1] - y)
+            count = min(count, len(slots))
+            closest = np.argpartition(distances, count - 1)[:count]
+            closest = closest[np.argsort(distances[closest])]
+            return [(self._keys[slots[i]], float(xy[slots[i], 0]), float(xy[slots[i], 1]), float(distances[i]))
+                    for i in closest]
+
+spatial_index = SpatialIndex(mindmap_store)
+
+def _parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    """"min_x,min_y,max_x,max_y" (corners in either order)"""
+    try:
+        x1, y1, x2, y2 = (float(part) for part in value.split(','))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be four numbers: min_x,min_y,max_x,max_y")
+    if not all(math.isfinite(v) for v in (x1, y1, x2, y2)):
+        raise HTTPException(status_code=400, detail="bbox must be finite")
+    return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+
+def _bbox_keys(collection: str, region: Tuple[float, float, float, float]) -> set:
+    """Ids of a collection's entities inside region; a connection counts when either end is inside"""
+    if collection != 'connections':
+        return {key for _, key in spatial_index.within(region, [collection])}
+    keys = set()
+    for node_collection, key in spatial_index.within(region):
+        for edge in graph_index.incident(_node_id(node_collection, key)):
+            if edge.kind == 'connection':
+                keys.add(edge.id)
+    return keys
+
+def _map_in_bbox(state: StoreState, region: Tuple[float, float, float, float]) -> MindMapData:
+    selected = {}
+    for collection in COLLECTION_MODELS:
+        positions = state.index[collection]
+        items = getattr(state.data, collection)
+        inside = sorted(positions[key] for key in _bbox_keys(collection, region) if key in positions)
+        selected[collection] = [items[position] for position in inside]
+    return MindMapData.model_construct(**selected)
+
+@api_router.get("/spatial/nearest")
+async def spatial_nearest(x: float, y: float, k: int = Query(1, ge=1, le=1000),
+                          collection: Optional[List[MindMapCollection]] = Query(None)):
+    """The k nodes nearest to (x, y), closest first"""
+    collections = [c.value for c in collection] if collection else None
+    if collections and any(c not in NODE_ID_PREFIXES for c in collections):
+        raise HTTPException(status_code=400, detail=f"Positioned collections: {', '.join(NODE_ID_PREFIXES)}")
+    await current_mind_map_state()
+    nearest = await run_io(spatial_index.nearest, x, y, k, collections)
+    return {"revision": spatial_index.revision, "nodes": [
+        {"node_id": _node_id(node_collection, key), "collection": node_collection, "id": key,
+         "x": node_x, "y": node_y, "distance": distance}
+        for (node_collection, key), node_x, node_y, distance in nearest
+    ]}
+
+# Auto-layout: force-directed (Fruchterman-Reingold) over the graph index's links,
+# vectorized with NumPy. Repulsion is exact between nodes sharing a grid cell and
+# approximated by cell centroids (mass-weighted) for the eight surrounding cells,
+# so an iteration costs O(n) rather than O(n^2). A dense cell (a cluster packed
+# far tighter than the spacing) would still be quadratic, so past LAYOUT_CELL_EXACT
+# members each node is pushed by a random sample of that many cell-mates instead,
+# scaled up to stand for the whole cell.
+_GRID_STRIDE = 1 << 31
+LAYOUT_CELL_EXACT = 64
+
+def _grid_repulsion(xy: np.ndarray, cell_size: float, k2: float, rng: np.random.Generator) -> np.ndarray:
+    count = len(xy)
+    cells = np.floor(xy / cell_size).astype(np.int64)
+    keys = cells[:, 0] * _GRID_STRIDE + cells[:, 1]
+    unique, cell_of = np.unique(keys, return_inverse=True)
+    cell_of = cell_of.reshape(-1)
+    cell_count = len(unique)
+    members = np.bincount(cell_of, minlength=cell_count)
+    mass = members.astype(np.float64)
+    centre_x = np.bincount(cell_of, xy[:, 0], cell_count) / mass
+    centre_y = np.bincount(cell_of, xy[:, 1], cell_count) / mass
+    force = np.zeros_like(xy)
+
+    # Own cell: every pair, enumerated block by block over the cell-sorted order
+    order = np.argsort(cell_of, kind='stable')
+    starts = np.cumsum(members) - members
+    dense = members > LAYOUT_CELL_EXACT
+    sizes = np.where(dense, 0, members * members)
+    block = np.repeat(np.arange(cell_count), sizes)
+    local = np.arange(int(sizes.sum())) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    width = members[block]
+    i = order[starts[block] + local // width]
+    j = order[starts[block] + local % width]
+    pair = i < j
+    i, j = i[pair], j[pair]
+    dx = xy[i, 0] - xy[j, 0]
+    dy = xy[i, 1] - xy[j, 1]
+    scale = k2 / np.maximum(dx * dx + dy * dy, 1e-2 * k2)
+    force[:, 0] += np.bincount(i, dx * scale, count) - np.bincount(j, dx * scale, count)
+    force[:, 1] += np.bincount(i, dy * scale, count) - np.bincount(j, dy * scale, count)
+
+    if dense.any():
+        # Dense cells: sampled partners (a node drawing itself adds nothing, as dx = dy = 0)
+        i = np.flatnonzero(dense[cell_of])
+        cell = cell_of[i]
+        j = order[starts[cell][:, None]
+                  + rng.integers(0, members[cell][:, None], (len(i), LAYOUT_CELL_EXACT))]
+        dx = xy[i, 0][:, None] - xy[j, 0]
+        dy = xy[i, 1][:, None] - xy[j, 1]
+        scale = k2 / np.maximum(dx * dx + dy * dy, 1e-2 * k2)
+        weight = (members[cell] - 1) / LAYOUT_CELL_EXACT
+        force[i, 0] += (dx * scale).sum(axis=1) * weight
+        force[i, 1] += (dy * scale).sum(axis=1) * weight
+
+    # Surrounding cells: each as one body at its centroid
+    for step_x in (-1, 0, 1):
+        for step_y in (-1, 0, 1):
+            if step_x == 0 and step_y == 0:
+                continue
+            wanted = unique + step_x * _GRID_STRIDE + step_y
+            neighbour = np.minimum(np.searchsorted(unique, wanted), cell_count - 1)
+            weight = np.where(unique[neighbour] == wanted, mass[neighbour], 0.0)[cell_of]
+            neighbour = neighbour[cell_of]
+            dx = xy[:, 0] - centre_x[neighbour]
+            dy = xy[:, 1] - centre_y[neighbour]
+            scale = weight * k2 / np.maximum(dx * dx + dy * dy, 1e-2 * k2)
+            force[:, 0] += dx * scale
+            force[:, 1] += dy * scale
+    return force
+
+def force_directed_layout(xy: np.ndarray, edges: np.ndarray, pinned: np.ndarray, spacing: float,
+                          iterations: int, time_budget: float,
+                          rng: Optional[np.random.Generator] = None) -> Tuple[np.ndarray, int]:
+    """
+    Move the unpinned rows of xy (n x 2) so linked nodes sit about spacing apart.
+    Stops after iterations or time_budget seconds; returns (xy, iterations run).
+    """
+    rng = rng if rng is not None else np.random.default_rng(0)
+    xy = np.array(xy, dtype=np.float64)
+    count = len(xy)
+    free = ~pinned
+    if not free.any():
+        return xy, 0
+    k2 = spacing * spacing
+    started = time.perf_counter()
+    # Large moves first, cooling geometrically to fine adjustments by the last iteration
+    temperature = spacing * max(1.0, math.sqrt(count)) / 4
+    cooling = (0.05 * spacing / temperature) ** (1 / iterations)
+    source, target = edges[:, 0], edges[:, 1]
+    done = 0
+    while done < iterations and time.perf_counter() - started < time_budget:
+        force = _grid_repulsion(xy, spacing, k2, rng)
+        if len(edges):
+            delta = xy[source] - xy[target]
+            pull = delta * (np.sqrt((delta * delta).sum(axis=1)) / spacing)[:, None]
+            for axis in (0, 1):
+                force[:, axis] += np.bincount(target, pull[:, axis], count) - np.bincount(source, pull[:, axis], count)
+        # A weak pull to the centre keeps disconnected pieces from drifting off
+        force -= (xy - xy[free].mean(axis=0)) / math.sqrt(count)
+        length = np.sqrt((force * force).sum(axis=1))
+        step = np.minimum(length, temperature) / np.maximum(length, 1e-9)
+        xy[free] += force[free] * step[free, None]
+        temperature *= cooling
+        done += 1
+    return xy, done
+
+def _layout_positions(state: StoreState, request: 'LayoutRequest') -> Dict[str, Any]:
+    """Run the layout for a request; returns new positions of the moved nodes"""
+    exists, entity = _node_lookup(state)
+    if request.nodes:
+        node_count = sum(len(state.index[collection]) for collection in NODE_ID_PREFIXES)
+        selected = list(graph_index.neighborhood(request.nodes, request.depth, node_count, exists)[0])
+    else:
+        selected = [_node_id(collection, key) for collection in NODE_ID_PREFIXES for key in state.index[collection]]
+    # Linked nodes outside the selection take part as fixed anchors, so a laid-out
+    # subgraph stays attached to the rest of the map
+    participants = {node: position for position, node in enumerate(selected)}
+    for node in selected:
+        for edge in graph_index.incident(node):
+            for end in (edge.source, edge.target):
+                if end not in participants and exists(end):
+                    participants[end] = len(participants)
+    nodes = list(participants)
+    xy = np.array([(entity(node).position.get('x', 0.0), entity(node).position.get('y', 0.0)) for node in nodes],
+                  dtype=np.float64).reshape(-1, 2)
+    pinned = np.array([position >= len(selected) or node in request.pinned
+                       for node, position in participants.items()], dtype=bool)
+
+    # Nodes stacked on one spot (defaults, fresh imports) start scattered around their
+    # placed neighbours, or around the centre when they have none
+    _, first, stacked_count = np.unique(xy, axis=0, return_inverse=True, return_counts=True)
+    stacked = (stacked_count[first.reshape(-1)] > 1) & ~pinned
+    if request.unplaced_only:
+        pinned |= ~stacked
+    pairs = set()
+    for node in nodes:
+        for edge in graph_index.incident(node):
+            a, b = participants.get(edge.source), participants.get(edge.target)
+            if a is not None and b is not None and a != b:
+                pairs.add((min(a, b), max(a, b)))
+    edges = np.array(sorted(pairs), dtype=np.int64).reshape(-1, 2)
+    rng = np.random.default_rng(request.seed)
+    if stacked.any():
+        placed = ~stacked
+        anchor_sum = np.zeros_like(xy)
+        anchor_count = np.zeros(len(xy))
+        for a, b in ((edges[:, 0], edges[:, 1]), (edges[:, 1], edges[:, 0])):
+            use = placed[b]
+            np.add.at(anchor_sum, a[use], xy[b[use]])
+            np.add.at(anchor_count, a[use], 1)
+        centre = xy[placed].mean(axis=0) if placed.any() else np.zeros(2)
+        has_anchor = anchor_count > 0
+        base = np.where(has_anchor[:, None], anchor_sum / np.maximum(anchor_count, 1)[:, None], centre)
+        radius = np.where(has_anchor, request.spacing, request.spacing * math.sqrt(stacked.sum()))
+        angle = rng.uniform(0, 2 * math.pi, len(xy))
+        distance = radius * np.sqrt(rng.uniform(0, 1, len(xy)))
+        scatter = base + np.stack([np.cos(angle), np.sin(angle)], axis=1) * distance[:, None]
+        xy[stacked] = scatter[stacked]
+
+    started = time.perf_counter()
+    result, iterations = force_directed_layout(xy, edges, pinned, request.spacing, request.iterations,
+                                               request.time_budget_ms / 1000, rng)
+    moved: Dict[str, List[Tuple[str, float, float]]] = {}
+    for position in np.flatnonzero(~pinned):
+        collection, key = _parse_node_id(nodes[position])
+        moved.setdefault(collection, []).append((key, float(result[position, 0]), float(result[position, 1])))
+    return {"moved": moved, "iterations": iterations, "nodes": int((~pinned).sum()), "edges": len(edges),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+@api_router.post("/layout")
+async def auto_layout(layout: LayoutRequest, response: Response,
+                      expected: Optional[List[WritePrecondition]] = Depends(write_precondition)):
+    """
+    Force-directed layout of the whole map, or of layout.nodes (plus depth links
+    around them). New positions are saved like /api/positions unless dry_run.
+    """
+    state = await current_mind_map_state()
+    exists, _ = _node_lookup(state)
+    missing = [node for node in (layout.nodes or []) if not exists(node)]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Nodes not found: {', '.join(missing)}")
+    result = await run_encode(_layout_positions, state, layout)
+    batch = PositionBatch(**result["moved"])
+    revision = state.revision
+    if not layout.dry_run:
+        async with write_lock:
+            await current_mind_map_state()
+            revision = mindmap_store.check_precondition(expected).revision
+            # Nodes deleted while the layout ran are simply skipped
+            ops, _ = build_position_ops(batch)
+            if ops:
+                revision = await run_io(mindmap_store.commit, ops, expected)
+        _revision_headers(response, revision)
+    positions = {
+        _node_id(collection, key): {"x": x, "y": y}
+        for collection, entries in result.pop("moved").items() for key, x, y in entries
+    }
+    return {"revision": revision, "saved": not layout.dry_run, **result, "positions": positions}
+
+# Spreadsheet import: POST /api/import-spreadsheet turns CSV/XLSX rows into patient
+# cases. The file is read in chunks of IMPORT_CHUNK_ROWS, each validated column-wise
+# with pandas, and every accepted row lands in one commit.
+IMPORT_MAX_BYTES = int(os.environ.get('MINDMAP_IMPORT_MAX_BYTES', 50 * 1024 * 1024))
+IMPORT_CHUNK_ROWS = int(os.environ.get('MINDMAP_IMPORT_CHUNK_ROWS', 5000))
+# Per-row errors / incomplete rows listed in a response; the counts cover every row
+IMPORT_MAX_REPORTED = 1000
+# Grid for imported nodes, matching the frontend's import placement
+IMPORT_GRID_SPACING = 280
+IMPORT_GRID_OFFSET = (400, 150)
+
+# Headers are matched case-insensitively, with underscores and repeated spaces folded to one space
+SPREADSHEET_HEADERS = {
+    'first name': 'first_name', 'firstname': 'first_name', 'given name': 'first_name',
+    'givenname': 'first_name', 'patient first name': 'first_name', 'pt first name': 'first_name',
+    'fname': 'first_name',
+    'last name': 'last_name', 'lastname': 'last_name', 'surname': 'last_name', 'family name': 'last_name',
+    'familyname': 'last_name', 'patient last name': 'last_name', 'pt last name': 'last_name',
+    'lname': 'last_name',
+    'chief complaint': 'chief_complaint', 'chiefcomplaint': 'chief_complaint', 'complaint': 'chief_complaint',
+    'initial presentation': 'initial_presentation', 'initialpresentation': 'initial_presentation',
+    'presentation': 'initial_presentation',
+    'narrative': 'narrative_summary', 'narrative summary': 'narrative_summary',
+    'status': 'status',
+    'case id': 'case_id', 'caseid': 'case_id',
+    'primary diagnosis': 'primary_diagnosis', 'diagnosis': 'primary_diagnosis',
+    'age': 'age',
+    'gender': 'gender', 'sex': 'gender',
+    'encounter date': 'encounter_date', 'date': 'encounter_date', 'visit date': 'encounter_date',
+}
+SPREADSHEET_FIELDS = tuple(dict.fromkeys(SPREADSHEET_HEADERS.values()))
+SPREADSHEET_REQUIRED = ('first_name', 'last_name', 'chief_complaint')
+SPREADSHEET_STATUSES = {'completed': 'archived', 'followup': 'follow_up'}
+
+def _normalise_header(name: Any) -> str:
+    return ' '.join(str(name).replace('_', ' ').split()).lower()
+
+def _spreadsheet_chunks(file, filename: str):
+    """Yield the first sheet of a CSV/XLSX file as DataFrames of strings, header row excluded"""
+    suffix = Path(filename).suffix.lower()
+    if suffix in ('.csv', '.txt'):
+        yield from pd.read_csv(file, dtype=str, keep_default_na=False, encoding='utf-8-sig', index_col=False,
+                               chunksize=IMPORT_CHUNK_ROWS)
+    elif suffix in ('.xlsx', '.xlsm'):
+        # read_excel would load the whole sheet; openpyxl's read-only mode streams rows
+        from openpyxl import load_workbook
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None) or ()
+            columns = [f'column {n}' if name is None else str(name) for n, name in enumerate(header, 1)]
+            while True:
+                batch = [row[:len(columns)] for row in itertools.islice(rows, IMPORT_CHUNK_ROWS)]
+                if not batch:
+                    break
+                yield pd.DataFrame(batch, columns=columns, dtype=object).fillna('').astype(str)
+        finally:
+            workbook.close()
+    elif suffix == '.xls':
+        # Legacy workbooks top out at 65k rows, so reading one whole is bounded
+        yield pd.read_excel(file, dtype=str, keep_default_na=False)
+    else:
+        raise HTTPException(status_code=415, detail="Only .csv, .xlsx and .xls files can be imported")
+
+class SpreadsheetImport:
+    """Validation and case building for one import, fed chunk by chunk"""
+
+    def __init__(self, existing_cases: int):
+        self.existing_cases = existing_cases
+        self.mapping: Optional[Dict[str, str]] = None
+        self.ignored_columns: List[str] = []
+        self.cases: List[PatientCase] = []
+        self.rows = 0
+        self.blank_rows = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.error_count = 0
+        self.incomplete: List[Dict[str, Any]] = []
+        self.incomplete_count = 0
+        self.imported_at = datetime.utcnow()
+
+    def _map_columns(self, columns) -> None:
+        self.mapping = {}
+        for column in columns:
+            field = SPREADSHEET_HEADERS.get(_normalise_header(column))
+            if field is None or field in self.mapping.values():
+                self.ignored_columns.append(str(column))
+            else:
+                self.mapping[column] = field
+        if not self.mapping:
+            raise HTTPException(status_code=400, detail="No recognised columns; expected headers such as "
+                                                        "'First Name', 'Last Name', 'Chief Complaint'")
+
+    def add_chunk(self, frame: pd.DataFrame) -> None:
+        if self.mapping is None:
+            self._map_columns(frame.columns)
+        # Spreadsheet row numbers: the header is row 1
+        first_row = self.rows + self.blank_rows + 2
+        values = frame[list(self.mapping)].rename(columns=self.mapping)
+        values = values.reindex(columns=list(SPREADSHEET_FIELDS), fill_value='').apply(lambda column: column.str.strip())
+        blank = (values == '').all(axis=1).to_numpy()
+        row_numbers = np.arange(first_row, first_row + len(values))
+
+        age_text = values['age']
+        age = pd.to_numeric(age_text, errors='coerce')
+        status = values['status'].str.lower().str.replace(r'[\s-]+', '_', regex=True)
+        status = status.replace(SPREADSHEET_STATUSES).mask(status == '', CaseStatus.ACTIVE.value)
+        date_text = values['encounter_date']
+        dates = pd.to_datetime(date_text.mask(date_text == ''), errors='coerce', format='mixed', utc=True)
+        checks = {
+            'age': (age_text != '') & ~(age.notna() & (age % 1 == 0) & age.between(0, 150)),
+            'status': ~status.isin([member.value for member in CaseStatus]),
+            'encounter_date': (date_text != '') & dates.isna(),
+        }
+        invalid = np.zeros(len(values), dtype=bool)
+        for mask in checks.values():
+            invalid |= mask.to_numpy()
+        invalid &= ~blank
+        for position in np.flatnonzero(invalid):
+            self.error_count += 1
+            if len(self.errors) < IMPORT_MAX_REPORTED:
+                self.errors.append({"row": int(row_numbers[position]), "errors": [
+                    f"{field}: invalid value {values[field].iat[position]!r}"
+                    for field, mask in checks.items() if mask.iat[position]
+                ]})
+
+        keep = ~blank & ~invalid
+        missing = {field: (values[field] == '').to_numpy() & keep for field in SPREADSHEET_REQUIRED}
+        incomplete = np.zeros(len(values), dtype=bool)
+        for mask in missing.values():
+            incomplete |= mask
+        columns = {field: values[field].to_numpy() for field in SPREADSHEET_FIELDS}
+        ages = age.to_numpy()
+        statuses = status.to_numpy()
+        encounter_dates = np.asarray(dates.dt.tz_convert(None).fillna(pd.Timestamp(self.imported_at))
+                                     .dt.to_pydatetime())
+        for position in np.flatnonzero(keep):
+            first, last = columns['first_name'][position], columns['last_name'][position]
+            initials = f"{first[:1].upper() or '?'}{last[:1].upper() or '?'}"
+            case = PatientCase(
+                case_id=columns['case_id'][position] or
+                f"{initials}-{self.existing_cases + len(self.cases) + 1:04d}",
+                encounter_date=encounter_dates[position],
+                primary_diagnosis=columns['primary_diagnosis'][position],
+                age=None if math.isnan(ages[position]) else int(ages[position]),
+                gender=columns['gender'][position] or None,
+                chief_complaint=columns['chief_complaint'][position],
+                initial_presentation=columns['initial_presentation'][position] or None,
+                notes=columns['narrative_summary'][position] or None,
+                status=statuses[position],
+            )
+            self.cases.append(case)
+            if incomplete[position]:
+                self.incomplete_count += 1
+                if len(self.incomplete) < IMPORT_MAX_REPORTED:
+                    self.incomplete.append({"row": int(row_numbers[position]), "id": case.id,
+                                            "missing": [field for field, mask in missing.items() if mask[position]]})
+        self.blank_rows += int(blank.sum())
+        self.rows += len(values) - int(blank.sum())
+
+    def place(self, occupied: int) -> None:
+        """Lay the new cases out on a grid after the occupied slots"""
+        total = occupied + len(self.cases)
+        columns = max(1, math.ceil(math.sqrt(total)))
+        slots = np.arange(occupied, total)
+        xs = (slots % columns) * IMPORT_GRID_SPACING + IMPORT_GRID_OFFSET[0]
+        ys = (slots // columns) * IMPORT_GRID_SPACING + IMPORT_GRID_OFFSET[1]
+        for case, x, y in zip(self.cases, xs.tolist(), ys.tolist()):
+            case.position = {"x": float(x), "y": float(y)}
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows, "imported": len(self.cases), "blank_rows": self.blank_rows,
+            "error_count": self.error_count, "errors": self.errors,
+            "incomplete_count": self.incomplete_count, "incomplete": self.incomplete,
+            "ignored_columns": self.ignored_columns,
+        }
+
+# Running streamed imports; the event loop keeps only weak references to tasks
+_import_tasks = set()
+
+async def _run_spreadsheet_import(file, filename: str, expected: Optional[List[WritePrecondition]],
+                                  dry_run: bool, progress=None) -> Dict[str, Any]:
+    state = await current_mind_map_state()
+    job = SpreadsheetImport(len(state.data.cases))
+    chunks = _spreadsheet_chunks(file, filename)
+    try:
+        while True:
+            frame = await run_io(next, chunks, None)
+            if frame is None:
+                break
+            await run_io(job.add_chunk, frame)
+            if progress is not None:
+                await progress({"event": "progress", "rows": job.rows, "imported": len(job.cases),
+                                "error_count": job.error_count})
+    except (ValueError, KeyError, OSError, zipfile.BadZipFile) as e:
+        # Malformed CSV (pandas.errors.ParserError is a ValueError) or an unreadable workbook
+        # (an .xlsx is a zip archive)
+        raise HTTPException(status_code=400, detail=f"Could not read spreadsheet: {e}")
+    finally:
+        chunks.close()
+    revision = state.revision
+    if job.cases and not dry_run:
+        async with write_lock:
+            state = await current_mind_map_state()
+            revision = mindmap_store.check_precondition(expected).revision
+            job.place(sum(len(getattr(state.data, collection)) for collection in NODE_ID_PREFIXES))
+            ops = [['put', 'cases', case.id, case] for case in job.cases]
+            revision = await run_io(mindmap_store.commit, ops, expected)
+    return {"revision": revision, "dry_run": dry_run, **job.summary()}
+
+@api_router.post("/import-spreadsheet")
+async def import_spreadsheet(request: Request, response: Response, file: UploadFile = File(...),
+                             dry_run: bool = False,
+                             expected: Optional[List[WritePrecondition]] = Depends(write_precondition)):
+    """
+    Import patient cases from a CSV/XLSX upload (header aliases as in the spreadsheet
+    import docs). Rows missing a name or chief complaint are imported and listed
+    under "incomplete"; rows with invalid values are skipped and listed under
+    "errors". With Accept: application/x-ndjson the response streams a progress
+    line per chunk, then the summary ({"event": "done", ...}) or an error line.
+    """
+    size = await run_io(file.file.seek, 0, os.SEEK_END)
+    await run_io(file.file.seek, 0)
+    if size > IMPORT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Spreadsheet exceeds {IMPORT_MAX_BYTES} bytes")
+    if 'application/x-ndjson' not in request.headers.get('accept', ''):
+        result = await _run_spreadsheet_import(file.file, file.filename or '', expected, dry_run)
+        _revision_headers(response, result["revision"])
+        return result
+
+    # The upload is closed once this handler returns, before the stream is read
+    spool = await run_io(tempfile.TemporaryFile)
+    await run_io(shutil.copyfileobj, file.file, spool)
+    await run_io(spool.seek, 0)
+    lines: asyncio.Queue = asyncio.Queue()
+
+    async def run():
+        try:
+            result = await _run_spreadsheet_import(spool, file.filename or '', expected, dry_run, lines.put)
+            await lines.put({"event": "done", **result})
+        except HTTPException as e:
+            await lines.put({"event": "error", "status": e.status_code, "detail": e.detail})
+        except Exception as e:
+            logger.error(f"Spreadsheet import failed: {e}")
+            await lines.put({"event": "error", "status": 500, "detail": "Spreadsheet import failed"})
+        finally:
+            spool.close()
+            await lines.put(None)
+
+    async def stream():
+        # The import runs as its own task so a client that stops reading cannot
+        # leave it half done
+        task = asyncio.create_task(run())
+        _import_tasks.add(task)
+        task.add_done_callback(_import_tasks.discard)
+        while (line := await lines.get()) is not None:
+            yield json.dumps(jsonable_encoder(line)) + '\n'
+        await task
+
+    return StreamingResponse(stream(), media_type='application/x-ndjson', headers={'Cache-Control': 'no-cache'})
+
+# PDF uploads are stored by content: uploads/blobs/<aa>/<sha256>.pdf, hashed while
+# they are written, so the same paper uploaded twice is kept once. Large files can
+# go through a resumable session instead: POST /api/uploads, then PATCH chunks.
+UPLOAD_MAX_BYTES = int(os.environ.get('MINDMAP_UPLOAD_MAX_BYTES', 200 * 1024 * 1024))
+# Writes are batched to this size before going to the I/O executor
+UPLOAD_BUFFER_BYTES = 1024 * 1024
+# Chunk size suggested to clients of resumable sessions
+UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+# Resumable sessions untouched for this long are discarded
+UPLOAD_SESSION_TTL = int(os.environ.get('MINDMAP_UPLOAD_SESSION_TTL', 24 * 3600))
+BLOBS_DIR = UPLOADS_DIR / 'blobs'
+# Outside UPLOADS_DIR so half-uploaded files are never served
+PARTIAL_UPLOADS_DIR = ROOT_DIR / 'uploads_partial'
+PARTIAL_UPLOADS_DIR.mkdir(exist_ok=True)
+PDF_MAGIC = b'%PDF-'
+
+def _blob_path(digest: str) -> Path:
+    return BLOBS_DIR / digest[:2] / f'{digest}.pdf'
+
+def _blob_url(digest: str) -> str:
+    return f"/uploads/blobs/{digest[:2]}/{digest}.pdf"
+
+class BlobWriter:
+    """Appends to a file while hashing it, refusing to grow past limit bytes"""
+
+    def __init__(self, path: Path, limit: int, size: int = 0, hasher=None):
+        self.path = path
+        self.limit = limit
+        self.size = size
+        self.hasher = hasher or hashlib.sha256()
+        self.handle = open(path, 'ab' if size else 'wb')
+
+    def write(self, data: bytes) -> None:
+        if self.size + len(data) > self.limit:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds {self.limit} bytes")
+        # The signature may arrive split across several writes (or requests)
+        expected = PDF_MAGIC[self.size:self.size + len(data)]
+        if expected and not data.startswith(expected):
+            raise HTTPException(status_code=400, detail="Only PDF files are allowed.")
+        self.handle.write(data)
+        self.hasher.update(data)
+        self.size += len(data)
+
+    def close(self) -> None:
+        self.handle.close()
+
+def _check_pdf_header(path: Path) -> None:
+    """Reject a finished upload that does not start with the PDF signature"""
+    with open(path, 'rb') as f:
+        if f.read(len(PDF_MAGIC)) != PDF_MAGIC:
+            raise HTTPException(status_code=400, detail="Only PDF files are allowed.")
+
+async def _write_stream(chunks, writer: BlobWriter) -> None:
+    """Feed an async byte stream to writer off the event loop, in UPLOAD_BUFFER_BYTES batches"""
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= UPLOAD_BUFFER_BYTES:
+            await run_io(writer.write, bytes(buffer))
+            buffer.clear()
+    if buffer:
+        await run_io(writer.write, bytes(buffer))
+
+async def _upload_file_chunks(upload: UploadFile):
+    while chunk := await upload.read(UPLOAD_BUFFER_BYTES):
+        yield chunk
+
+def _store_blob(source: Path, digest: str) -> bool:
+    """Move a finished upload into the blob store; False when that content was already stored"""
+    target = _blob_path(digest)
+    if target.exists():
+        source.unlink()
+        return False
+    target.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(source, target)
+    return True
+
+async def _finish_upload(digest: str, size: int, filename: str, created: bool) -> Dict[str, Any]:
+    url_file_path = _blob_url(digest)
+    change_feed.publish(_sse_message('upload', json.dumps({"filePath": url_file_path, "filename": filename})))
+    # A deduplicated upload reuses the text already extracted from its blob
+    job = await pdf_jobs.enqueue(url_file_path)
+    return {"message": "File uploaded successfully.", "filePath": url_file_path, "filename": filename,
+            "sha256": digest, "size": size, "deduplicated": not created,
+            "extraction": {"job_id": job["id"], "status": job["status"]}}
 
-# NEW: PDF Upload endpoint
 @api_router.post("/upload-pdf")
 async def upload_pdf(
     pdf: UploadFile = File(...)
 ):
     """
-    Handle PDF uploads. Saves the file and returns its public path.
+    Handle PDF uploads. Saves the file under its SHA-256 and returns its public path;
+    uploading the same PDF again returns the stored copy's path.
     This endpoint is now decoupled from the data file to prevent race conditions.
     The frontend is responsible for associating the returned path with a node.
     """
     if not pdf.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed.")
+    if pdf.size is not None and pdf.size > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {UPLOAD_MAX_BYTES} bytes")
 
-    # Create a unique filename to avoid overwrites
-    unique_filename = f"{uuid.uuid4()}-{pdf.filename}"
-    file_location = UPLOADS_DIR / unique_filename
-
+    temp = PARTIAL_UPLOADS_DIR / f"{uuid.uuid4()}.part"
+    writer = await run_io(BlobWriter, temp, UPLOAD_MAX_BYTES)
     try:
-        # Save the uploaded file
-        with open(file_location, "wb+") as file_object:
-            shutil.copyfileobj(pdf.file, file_object)
-
-        # The path to be stored and used in the URL
-        url_file_path = f"/uploads/{unique_filename}"
-
-        return {"message": "File uploaded successfully.", "filePath": url_file_path}
-
+        try:
+            await _write_stream(_upload_file_chunks(pdf), writer)
+        finally:
+            await run_io(writer.close)
+        if writer.size == 0:
+            raise HTTPException(status_code=400, detail="Empty upload")
+        await run_io(_check_pdf_header, temp)
+        digest = writer.hasher.hexdigest()
+        created = await run_io(_store_blob, temp, digest)
+        return await _finish_upload(digest, writer.size, pdf.filename, created)
+    except HTTPException:
+        temp.unlink(missing_ok=True)
+        raise
     except Exception as e:
         # Clean up the uploaded file if any error occurs
-        if file_location.exists():
-            file_location.unlink()
+        temp.unlink(missing_ok=True)
         logger.error(f"Error processing PDF upload: {e}")
         raise HTTPException(status_code=500, detail="Error processing upload.")
 
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int = Field(..., gt=0)
+    sha256: Optional[str] = Field(None, pattern='^[0-9a-f]{64}$')  # lets an already stored file skip the transfer
+
+class UploadSessions:
+    """
+    Resumable uploads: <id>.json (filename, size, expected hash) and <id>.part on
+    disk, so a session survives restarts. The running hash is kept in memory and
+    rebuilt from the .part file when it is missing (e.g. after a restart).
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.hashers: Dict[str, Tuple[int, Any]] = {}
+        self.locks: Dict[str, asyncio.Lock] = {}
+
+    def _paths(self, upload_id: str) -> Tuple[Path, Path]:
+        if not re.fullmatch(r'[0-9a-f]{32}', upload_id):
+            raise HTTPException(status_code=404, detail="Upload not found")
+        return self.directory / f'{upload_id}.json', self.directory / f'{upload_id}.part'
+
+    def create(self, request: UploadSessionCreate) -> str:
+        self.expire()
+        upload_id = uuid.uuid4().hex
+        meta_path, part_path = self._paths(upload_id)
+        part_path.touch()
+        meta_path.write_text(json.dumps({"filename": request.filename, "size": request.size,
+                                         "sha256": request.sha256}))
+        return upload_id
+
+    def info(self, upload_id: str) -> Dict[str, Any]:
+        meta_path, part_path = self._paths(upload_id)
+        try:
+            meta = json.loads(meta_path.read_text())
+            offset = part_path.stat().st_size
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        return {"upload_id": upload_id, "offset": offset, **meta}
+
+    def writer(self, upload_id: str, info: Dict[str, Any]) -> BlobWriter:
+        _, part_path = self._paths(upload_id)
+        offset, hasher = self.hashers.pop(upload_id, (None, None))
+        if offset != info["offset"]:
+            hasher = hashlib.sha256()
+            with open(part_path, 'rb') as handle:
+                while chunk := handle.read(UPLOAD_BUFFER_BYTES):
+                    hasher.update(chunk)
+        return BlobWriter(part_path, info["size"], info["offset"], hasher)
+
+    def suspend(self, upload_id: str, writer: BlobWriter) -> None:
+        writer.close()
+        self.hashers[upload_id] = (writer.size, writer.hasher)
+
+    def complete(self, upload_id: str, digest: str) -> bool:
+        """Move the finished .part into the blob store and drop the session"""
+        _, part_path = self._paths(upload_id)
+        try:
+            _check_pdf_header(part_path)
+        except HTTPException:
+            self.discard(upload_id)
+            raise
+        created = _store_blob(part_path, digest)
+        self.discard(upload_id)
+        return created
+
+    def discard(self, upload_id: str) -> None:
+        self.hashers.pop(upload_id, None)
+        self.locks.pop(upload_id, None)
+        for path in self._paths(upload_id):
+            path.unlink(missing_ok=True)
+
+    def expire(self) -> None:
+        cutoff = time.time() - UPLOAD_SESSION_TTL
+        for meta_path in self.directory.glob('*.json'):
+            part_path = meta_path.with_suffix('.part')
+            touched = max((path.stat().st_mtime for path in (meta_path, part_path) if path.exists()), default=0)
+            if touched < cutoff:
+                self.discard(meta_path.stem)
+        # Stray .part files from interrupted /upload-pdf requests
+        for part_path in self.directory.glob('*.part'):
+            if not part_path.with_suffix('.json').exists() and part_path.stat().st_mtime < cutoff:
+                part_path.unlink(missing_ok=True)
+
+    def lock(self, upload_id: str) -> asyncio.Lock:
+        """Per-session lock; only ask for one after info() found the session (discard drops it)"""
+        return self.locks.setdefault(upload_id, asyncio.Lock())
+
+upload_sessions = UploadSessions(PARTIAL_UPLOADS_DIR)
+
+def _upload_status(info: Dict[str, Any], response: Response) -> Dict[str, Any]:
+    response.headers['Upload-Offset'] = str(info["offset"])
+    response.headers['Upload-Length'] = str(info["size"])
+    return {"upload_id": info["upload_id"], "offset": info["offset"], "size": info["size"],
+            "chunk_size": UPLOAD_CHUNK_BYTES, "complete": False}
+
+@api_router.post("/uploads", status_code=201)
+async def create_upload(session: UploadSessionCreate, response: Response):
+    """
+    Start a resumable PDF upload. When sha256 names a file that is already stored
+    the upload completes at once; otherwise send the bytes with PATCH.
+    """
+    if not session.filename.endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed.")
+    if session.size > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {UPLOAD_MAX_BYTES} bytes")
+    if session.sha256 and await run_io(_blob_path(session.sha256).exists):
+        response.status_code = 200
+        return {**await _finish_upload(session.sha256, session.size, session.filename, False), "complete": True}
+    upload_id = await run_io(upload_sessions.create, session)
+    response.headers['Location'] = f"/api/uploads/{upload_id}"
+    return _upload_status(await run_io(upload_sessions.info, upload_id), response)
+
+@api_router.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str, response: Response):
+    """Where to resume: the number of bytes received so far (also in Upload-Offset)"""
+    return _upload_status(await run_io(upload_sessions.info, upload_id), response)
+
+@api_router.patch("/uploads/{upload_id}")
+async def append_upload(upload_id: str, request: Request, response: Response):
+    """
+    Append the request body at the Upload-Offset header, which must equal the bytes
+    received so far (409 with the current offset otherwise). The request that
+    delivers the last byte stores the file and returns its path.
+    """
+    offset = request.headers.get('upload-offset', '')
+    if not offset.isdigit():
+        raise HTTPException(status_code=400, detail="Upload-Offset header required")
+    # 404 before a lock exists for the id, so made-up ids leave nothing behind
+    await run_io(upload_sessions.info, upload_id)
+    async with upload_sessions.lock(upload_id):
+        # Again under the lock: the offset may have moved, or the session gone, while we waited
+        try:
+            info = await run_io(upload_sessions.info, upload_id)
+        except HTTPException:
+            await run_io(upload_sessions.discard, upload_id)  # drops the lock we just made
+            raise
+        if int(offset) != info["offset"]:
+            raise HTTPException(status_code=409, detail={"message": "Upload-Offset does not match",
+                                                         "offset": info["offset"]},
+                                headers={'Upload-Offset': str(info["offset"])})
+        writer = await run_io(upload_sessions.writer, upload_id, info)
+        try:
+            await _write_stream(request.stream(), writer)
+        finally:
+            # A dropped connection keeps what arrived; the client resumes from there
+            await run_io(upload_sessions.suspend, upload_id, writer)
+        info["offset"] = writer.size
+        if writer.size < info["size"]:
+            return _upload_status(info, response)
+        digest = writer.hasher.hexdigest()
+        if info["sha256"] and digest != info["sha256"]:
+            await run_io(upload_sessions.discard, upload_id)
+            raise HTTPException(status_code=422, detail="Uploaded content does not match sha256; upload discarded")
+        created = await run_io(upload_sessions.complete, upload_id, digest)
+    return {**await _finish_upload(digest, writer.size, info["filename"], created), "complete": True}
+
+@api_router.delete("/uploads/{upload_id}", status_code=204)
+async def delete_upload(upload_id: str):
+    """Abandon a resumable upload"""
+    await run_io(upload_sessions.info, upload_id)
+    async with upload_sessions.lock(upload_id):
+        await run_io(upload_sessions.discard, upload_id)
+    return Response(status_code=204)
+
+# PDF text extraction: every uploaded (or linked) PDF gets a job that a process
+# pool runs off the request path. A job stores the page count, a short summary
+# and the PDF's term counts; pdf_text_index serves them by literature id.
+PDF_WORKERS = int(os.environ.get('MINDMAP_PDF_WORKERS', 2))
+PDF_JOBS_FILE = ROOT_DIR / 'pdf_jobs.json'
+# One <job id>.json per extracted PDF: {"pages", "summary", "chars", "terms"}
+PDF_TEXT_DIR = ROOT_DIR / 'pdf_text'
+PDF_TEXT_DIR.mkdir(exist_ok=True)
+PDF_MAX_PAGES = int(os.environ.get('MINDMAP_PDF_MAX_PAGES', 2000))
+# Failed jobs are retried on the next start until they have failed this often
+PDF_MAX_ATTEMPTS = 3
+
+def _upload_file(pdf_path: str) -> Optional[Path]:
+    """The file behind an /uploads/... path, or None when it points elsewhere"""
+    if not pdf_path.startswith('/uploads/'):
+        return None
+    path = (UPLOADS_DIR / pdf_path[len('/uploads/'):]).resolve()
+    return path if path.is_relative_to(UPLOADS_DIR.resolve()) else None
+
+class PdfJobs:
+    """
+    Persistent extraction queue keyed by pdf path. Job states: queued, running,
+    done, failed. The job list is rewritten to PDF_JOBS_FILE on every change, so
+    queued and interrupted (running) jobs resume after a restart.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.queue: Optional[asyncio.Queue] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.workers: List[asyncio.Task] = []
+        if path.exists():
+            try:
+                self.jobs = json.loads(path.read_text())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable PDF job list {path.name}: {e}")
+
+    @staticmethod
+    def job_id(pdf_path: str) -> str:
+        return hashlib.sha256(pdf_path.encode('utf-8')).hexdigest()[:32]
+
+    def _save(self) -> None:
+        # Caller holds self.lock
+        _write_bytes_atomic(self.path, json.dumps(self.jobs, separators=(',', ':')).encode('utf-8'))
+
+    def _update(self, pdf_path: str, **changes) -> Dict[str, Any]:
+        with self.lock:
+            job = self.jobs.setdefault(pdf_path, {"id": self.job_id(pdf_path), "path": pdf_path, "attempts": 0})
+            job.update(changes, updated_at=datetime.utcnow().isoformat())
+            self._save()
+            return dict(job)
+
+    def get(self, pdf_path: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            job = self.jobs.get(pdf_path)
+            return dict(job) if job else None
+
+    def by_id(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            return next((dict(job) for job in self.jobs.values() if job["id"] == job_id), None)
+
+    def listing(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [dict(job) for job in self.jobs.values() if status is None or job["status"] == status]
+
+    def counts(self) -> Dict[str, int]:
+        with self.lock:
+            counts: Dict[str, int] = {}
+            for job in self.jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return counts
+
+    def text(self, pdf_path: str) -> Optional[Dict[str, Any]]:
+        """Stored extraction result for a path, None until its job is done"""
+        job = self.get(pdf_path)
+        if job is None or job["status"] != 'done':
+            return None
+        try:
+            with open(PDF_TEXT_DIR / f'{job["id"]}.json', 'rb') as f:
+                return json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+    async def enqueue(self, pdf_path: str, force: bool = False) -> Dict[str, Any]:
+        """Queue extraction of pdf_path unless it is already queued, running or done"""
+        job = self.get(pdf_path)
+        if job is not None and not force and job["status"] != 'failed':
+            return job
+        job = await run_io(partial(self._update, pdf_path, status='queued', error=None))
+        if self.queue is not None:
+            self.queue.put_nowait(pdf_path)
+        return job
+
+    def enqueue_threadsafe(self, pdf_path: str) -> None:
+        """enqueue() from a thread other than the event loop's (store listeners)"""
+        if self.loop is not None:
+            asyncio.run_coroutine_threadsafe(self.enqueue(pdf_path), self.loop)
+
+    def start(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        with self.lock:
+            pending = [path for path, job in self.jobs.items()
+                       if job["status"] in ('queued', 'running')
+                       or (job["status"] == 'failed' and job["attempts"] < PDF_MAX_ATTEMPTS)]
+        for pdf_path in pending:
+            self._update(pdf_path, status='queued')
+            self.queue.put_nowait(pdf_path)
+        self.workers = [asyncio.create_task(self._work()) for _ in range(PDF_WORKERS)]
+
+    async def stop(self) -> None:
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        self.queue = None
+        self.loop = None
+        if self.pool is not None:
+            # Interrupted jobs stay "running" in the job file and are redone on the next start
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    async def _work(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            pdf_path = await self.queue.get()
+            job = self.get(pdf_path)
+            if job is None or job["status"] != 'queued':
+                continue
+            file = _upload_file(pdf_path)
+            if file is None or not await run_io(file.exists):
+                await run_io(partial(self._update, pdf_path, status='failed', error="File not found",
+                                     attempts=PDF_MAX_ATTEMPTS))
+                continue
+            await run_io(partial(self._update, pdf_path, status='running', attempts=job["attempts"] + 1))
+            if self.pool is None:
+                # spawn: the workers never inherit the server's threads or locks, and they only
+                # import pdf_worker, never this module with its store, directories and exit hooks
+                self.pool = ProcessPoolExecutor(PDF_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+            try:
+                result = await loop.run_in_executor(self.pool, extract_pdf_text, str(file), PDF_MAX_PAGES)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    # A crashed worker (e.g. out of memory on a huge PDF) poisons the pool; start a new one
+                    self.pool = None
+                logger.warning(f"PDF text extraction failed for {pdf_path}: {e}")
+                await run_io(partial(self._update, pdf_path, status='failed', error=str(e) or type(e).__name__))
+                continue
+            await run_io(self._finish, pdf_path, result)
+
+    def _finish(self, pdf_path: str, result: Dict[str, Any]) -> None:
+        _write_bytes_atomic(PDF_TEXT_DIR / f'{self.job_id(pdf_path)}.json',
+                            json.dumps(result, separators=(',', ':')).encode('utf-8'))
+        self._update(pdf_path, status='done', error=None, pages=result["pages"], summary=result["summary"],
+                     chars=result["chars"])
+        pdf_text_index.on_extracted(pdf_path)
+
+pdf_jobs = PdfJobs(PDF_JOBS_FILE)
+
+class PdfTextIndex(SearchIndex):
+    """BM25 index over extracted PDF text, one document per literature entry with a pdf_path"""
+
+    def _literature_terms(self, entity: Any) -> Optional[Dict[str, float]]:
+        if not entity.pdf_path:
+            return None
+        extracted = pdf_jobs.text(entity.pdf_path)
+        return None if extracted is None else {term: float(count) for term, count in extracted["terms"].items()}
+
+    def _rebuild(self, state: StoreState) -> None:
+        self._reset()
+        for entity in state.data.literature:
+            terms = self._literature_terms(entity)
+            if terms:
+                self._add(('literature', entity.id), terms, sort=False)
+        self._vocabulary.sort()
+
+    def _apply(self, ops: List[list]) -> None:
+        for op, collection, key, entity in ops:
+            if collection != 'literature' or op == 'pos':
+                continue
+            self._remove(('literature', key))
+            if op == 'put':
+                terms = self._literature_terms(entity)
+                if terms:
+                    self._add(('literature', key), terms)
+                elif entity.pdf_path:
+                    # A PDF linked without going through /upload-pdf
+                    pdf_jobs.enqueue_threadsafe(entity.pdf_path)
+
+    def on_extracted(self, pdf_path: str) -> None:
+        """Index a newly extracted PDF under every literature entry that links it"""
+        with self.store.lock:
+            state = self.store.state()
+            with self.lock:
+                if self.revision is None:
+                    return
+                for entity in state.data.literature:
+                    if entity.pdf_path == pdf_path:
+                        self._remove(('literature', entity.id))
+                        terms = self._literature_terms(entity)
+                        if terms:
+                            self._add(('literature', entity.id), terms)
+
+pdf_text_index = PdfTextIndex(mindmap_store)
+
+@api_router.get("/pdf-jobs")
+async def list_pdf_jobs(status: Optional[str] = None, path: Optional[str] = None):
+    """Extraction jobs with their status (queued, running, done, failed), optionally filtered"""
+    jobs = await run_io(pdf_jobs.listing, status)
+    if path is not None:
+        jobs = [job for job in jobs if job["path"] == path]
+    return {"counts": await run_io(pdf_jobs.counts), "jobs": jobs}
+
+@api_router.get("/pdf-jobs/{job_id}")
+async def get_pdf_job(job_id: str):
+    job = await run_io(pdf_jobs.by_id, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="PDF job not found")
+    return job
+
+@api_router.post("/pdf-jobs/{job_id}/retry", status_code=202)
+async def retry_pdf_job(job_id: str):
+    job = await run_io(pdf_jobs.by_id, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="PDF job not found")
+    return await pdf_jobs.enqueue(job["path"], force=job["status"] != 'running')
+
+@api_router.get("/search/pdfs")
+async def search_pdfs(q: str, limit: int = Query(20, ge=1, le=200)):
+    """Ranked search inside the text of literature PDFs (prefix matching on each term)"""
+    def describe(collection: str, entity: Any) -> Dict[str, Any]:
+        # The entity comes from the state the hits were resolved against, so it always exists
+        job = pdf_jobs.get(entity.pdf_path) or {}
+        return {"pdf_path": entity.pdf_path, "pages": job.get("pages"), "summary": job.get("summary")}
+
+    await current_mind_map_state()
+    return await run_io(pdf_text_index.search, q, None, limit, describe)
+
+async def _backfill_pdf_jobs() -> None:
+    """Queue extraction for PDFs linked from literature that have never been processed"""
+    state = await current_mind_map_state()
+    for entity in state.data.literature:
+        if entity.pdf_path and pdf_jobs.get(entity.pdf_path) is None:
+            await pdf_jobs.enqueue(entity.pdf_path)
+
+# Snapshot history: versions of the map kept in history/ as deltas over
+# content-addressed entities (objects/<aa>/<sha256>.json). An entity that never
+# changes is stored once for every version, and a snapshot encodes only the
+# entities touched since the previous one (tracked through the store listener).
+HISTORY_DIR = ROOT_DIR / 'history'
+# Seconds from the first unsnapshotted change to the automatic snapshot; 0 turns them off
+HISTORY_INTERVAL = float(os.environ.get('MINDMAP_HISTORY_INTERVAL', 300))
+# Every Nth version stores its full manifest, so rebuilding any version replays at most N deltas
+HISTORY_CHECKPOINT_EVERY = 50
+# Retention: every version for a day, the newest per hour for a week, the newest per
+# day up to HISTORY_RETENTION_DAYS, nothing older. Labelled versions are always kept.
+HISTORY_KEEP_ALL_SECONDS = 24 * 3600
+HISTORY_HOURLY_SECONDS = 7 * 24 * 3600
+HISTORY_RETENTION_DAYS = int(os.environ.get('MINDMAP_HISTORY_RETENTION_DAYS', 90))
+
+Manifest = Dict[str, Dict[str, str]]  # collection -> {entity id: object hash}
+
+class SnapshotHistory:
+    """
+    Version i is stored as versions/<i>.json: either {"full": true, "entities":
+    manifest} or a delta {"changed": manifest, "removed": {collection: [ids]}}
+    over the version before it in index.json.
+    """
+
+    def __init__(self, store: MindMapStore, directory: Path):
+        self.store = store
+        self.directory = directory
+        self.objects_dir = directory / 'objects'
+        self.versions_dir = directory / 'versions'
+        self.index_path = directory / 'index.json'
+        self.lock = threading.RLock()  # serializes snapshots, pruning and reads of version files
+        self.dirty_lock = threading.Lock()  # taken inside store.lock by on_commit
+        self.dirty: set = set()
+        self.rescan = True  # no record of what changed (start-up, reload): compare every entity
+        self.head: Optional[Manifest] = None
+        self.timer: Optional[threading.Timer] = None
+        self.versions: List[Dict[str, Any]] = []
+        if self.index_path.exists():
+            try:
+                self.versions = json.loads(self.index_path.read_text())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable history index {self.index_path}: {e}")
+        store.listeners.append(self.on_commit)
+
+    def on_commit(self, state: StoreState, ops: Optional[List[list]]) -> None:
+        with self.dirty_lock:
+            if ops is None:
+                self.rescan = True
+            else:
+                self.dirty.update((collection, key) for _, collection, key, _ in ops)
+            if HISTORY_INTERVAL > 0 and self.timer is None:
+                self.timer = threading.Timer(HISTORY_INTERVAL, self._snapshot_in_background)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def _snapshot_in_background(self) -> None:
+        try:
+            self.snapshot()
+        except Exception as e:
+            logger.error(f"Error taking mind map snapshot: {e}")
+
+    # Storage
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / f'{digest}.json'
+
+    def _store_object(self, payload: bytes, new_dirs: set) -> str:
+        """
+        Write an object unless it exists; adds the directories whose entries
+        changed to new_dirs, which the caller syncs before writing the version
+        that refers to the object (the version file is the commit point).
+        """
+        digest = hashlib.sha256(payload).hexdigest()
+        path = self._object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _write_bytes_atomic(path, payload)
+            new_dirs.update((path.parent, self.objects_dir))
+        return digest
+
+    def _version_path(self, version: int) -> Path:
+        return self.versions_dir / f'{version:08d}.json'
+
+    def _read_version(self, version: int) -> Dict[str, Any]:
+        with open(self._version_path(version), 'rb') as f:
+            return json.loads(f.read())
+
+    def _write_version(self, version: int, record: Dict[str, Any]) -> None:
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        _write_bytes_atomic(self._version_path(version), json.dumps(record, separators=(',', ':')).encode('utf-8'))
+        # Durable before index.json, which lists it, is replaced
+        _fsync_dir(self.versions_dir)
+
+    def _save_index(self) -> None:
+        _write_bytes_atomic(self.index_path, json.dumps(self.versions, separators=(',', ':')).encode('utf-8'))
+
+    @staticmethod
+    def _apply_delta(manifest: Manifest, record: Dict[str, Any]) -> None:
+        if record.get('full'):
+            manifest.clear()
+            manifest.update({collection: dict(items) for collection, items in record['entities'].items()})
+            return
+        for collection, items in record['changed'].items():
+            manifest.setdefault(collection, {}).update(items)
+        for collection, keys in record['removed'].items():
+            for key in keys:
+                manifest.get(collection, {}).pop(key, None)
+
+    def _position(self, version: int) -> int:
+        for position, meta in enumerate(self.versions):
+            if meta['version'] == version:
+                return position
+        raise HTTPException(status_code=404, detail=f"Version {version} not found")
+
+    def manifest(self, version: int) -> Manifest:
+        """Entity hashes of one version: its last checkpoint plus the deltas after it"""
+        with self.lock:
+            position = self._position(version)
+            start = position
+            while start > 0 and not self.versions[start]['full']:
+                start -= 1
+            manifest: Manifest = {}
+            for meta in self.versions[start:position + 1]:
+                self._apply_delta(manifest, self._read_version(meta['version']))
+            return manifest
+
+    def load(self, version: int) -> MindMapData:
+        collections = {}
+        # Held while reading objects too: prune's garbage collection may otherwise
+        # delete the ones a dropped version referred to halfway through the read
+        with self.lock:
+            manifest = self.manifest(version)
+            for collection, model in COLLECTION_MODELS.items():
+                items = []
+                for digest in manifest.get(collection, {}).values():
+                    with open(self._object_path(digest), 'rb') as f:
+                        payload = f.read()
+                    items.append(model.model_validate_json(payload) if model else json.loads(payload))
+                collections[collection] = items
+        return MindMapData.model_construct(**collections)
+
+    @staticmethod
+    def _entity_digest(entity: Any) -> Tuple[bytes, str]:
+        payload = _encode_entity(entity).encode('utf-8')
+        return payload, hashlib.sha256(payload).hexdigest()
+
+    def current_manifest(self) -> Tuple[int, Manifest]:
+        """(revision, manifest) of the live map, without storing anything"""
+        state = self.store.state()
+        return state.revision, {
+            collection: {_entity_key(item): self._entity_digest(item)[1] for item in getattr(state.data, collection)}
+            for collection in COLLECTION_MODELS
+        }
+
+    # Snapshots
+    def snapshot(self, label: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Record the current map as a new version. Without a label, nothing is
+        recorded when the map has not changed since the last version.
+        """
+        with self.lock:
+            if self.head is None:
+                self.head = self.manifest(self.versions[-1]['version']) if self.versions else {}
+            # Under the store lock, so the dirty set and the state describe the same revision
+            with self.store.lock:
+                state = self.store.state()
+                with self.dirty_lock:
+                    dirty, rescan = self.dirty, self.rescan
+                    self.dirty, self.rescan = set(), False
+                    if self.timer is not None:
+                        self.timer.cancel()
+                        self.timer = None
+            if rescan:
+                dirty = {(collection, key) for collection in COLLECTION_MODELS for key in state.index[collection]}
+                dirty.update((collection, key) for collection, items in self.head.items() for key in items)
+            changed: Manifest = {}
+            removed: Dict[str, List[str]] = {}
+            new_dirs: set = set()
+            for collection, key in dirty:
+                position = state.index[collection].get(key)
+                known = self.head.get(collection, {}).get(key)
+                if position is None:
+                    if known is not None:
+                        removed.setdefault(collection, []).append(key)
+                    continue
+                payload, digest = self._entity_digest(getattr(state.data, collection)[position])
+                if digest != known:
+                    self._store_object(payload, new_dirs)
+                    changed.setdefault(collection, {})[key] = digest
+            if not changed and not removed and label is None and self.versions:
+                return None
+
+            version = self.versions[-1]['version'] + 1 if self.versions else 1
+            self._apply_delta(self.head, {"changed": changed, "removed": removed})
+            full = not self.versions or version % HISTORY_CHECKPOINT_EVERY == 0
+            if full:
+                # Entity order follows the live map rather than the order changes arrived in
+                self.head = {
+                    collection: {key: self.head.get(collection, {})[key] for key in state.index[collection]
+                                 if key in self.head.get(collection, {})}
+                    for collection in COLLECTION_MODELS
+                }
+                record = {"full": True, "entities": self.head}
+            else:
+                record = {"full": False, "changed": changed, "removed": removed}
+            for directory in new_dirs:
+                _fsync_dir(directory)
+            self._write_version(version, record)
+            now = time.time()
+            meta = {
+                "version": version, "revision": state.revision, "label": label, "full": full,
+                "created_at": datetime.utcfromtimestamp(now).isoformat() + 'Z', "ts": now,
+                "changes": sum(len(items) for items in changed.values()) + sum(len(keys) for keys in removed.values()),
+                "counts": {collection: len(self.head.get(collection, {})) for collection in COLLECTION_MODELS},
+            }
+            self.versions.append(meta)
+            self.prune(now)
+            self._save_index()
+            return meta
+
+    # Retention
+    def prune(self, now: float) -> List[int]:
+        """Drop versions the retention policy no longer keeps; returns their numbers"""
+        with self.lock:
+            kept_buckets = set()
+            dropped = []
+            for meta in reversed(self.versions[:-1]):  # the latest version is always kept
+                age = now - meta['ts']
+                if meta['label']:
+                    continue
+                if age < HISTORY_KEEP_ALL_SECONDS:
+                    continue
+                if age < HISTORY_HOURLY_SECONDS:
+                    bucket = ('hour', int(meta['ts'] // 3600))
+                elif age < HISTORY_RETENTION_DAYS * 86400:
+                    bucket = ('day', int(meta['ts'] // 86400))
+                else:
+                    bucket = None
+                if bucket is not None and bucket not in kept_buckets:
+                    kept_buckets.add(bucket)
+                    continue
+                dropped.append(meta['version'])
+            for version in sorted(dropped):
+                self._drop(version)
+            if dropped:
+                self._collect_garbage()
+            return dropped
+
+    def _drop(self, version: int) -> None:
+        """Remove one version, folding its delta into the version after it"""
+        position = self._position(version)
+        record = self._read_version(version)
+        successor = self.versions[position + 1]
+        following = self._read_version(successor['version'])
+        if not following['full']:
+            if record['full']:
+                merged: Manifest = {}
+                self._apply_delta(merged, record)
+                self._apply_delta(merged, following)
+                following = {"full": True, "entities": merged}
+            else:
+                changed = {collection: dict(items) for collection, items in record['changed'].items()}
+                removed = {collection: set(keys) for collection, keys in record['removed'].items()}
+                for collection, items in following['changed'].items():
+                    changed.setdefault(collection, {}).update(items)
+                    removed.get(collection, set()).difference_update(items)
+                for collection, keys in following['removed'].items():
+                    for key in keys:
+                        changed.get(collection, {}).pop(key, None)
+                    removed.setdefault(collection, set()).update(keys)
+                following = {"full": False, "changed": changed,
+                             "removed": {collection: sorted(keys) for collection, keys in removed.items() if keys}}
+            self._write_version(successor['version'], following)
+            successor['full'] = following['full']
+        del self.versions[position]
+        self._version_path(version).unlink(missing_ok=True)
+
+    def _collect_garbage(self) -> None:
+        """Delete objects no remaining version refers to"""
+        referenced = set()
+        for meta in self.versions:
+            record = self._read_version(meta['version'])
+            for items in (record['entities'] if record['full'] else record['changed']).values():
+                referenced.update(items.values())
+        for path in self.objects_dir.glob('*/*.json'):
+            if path.stem not in referenced:
+                path.unlink(missing_ok=True)
+
+    def listing(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [{key: value for key, value in meta.items() if key not in ('ts', 'full')}
+                    for meta in reversed(self.versions)]
+
+history = SnapshotHistory(mindmap_store, HISTORY_DIR)
+
+def _manifest_diff(old: Manifest, new: Manifest) -> Dict[str, Dict[str, List[str]]]:
+    diff = {}
+    for collection in COLLECTION_MODELS:
+        before, after = old.get(collection, {}), new.get(collection, {})
+        entry = {
+            "added": [key for key in after if key not in before],
+            "removed": [key for key in before if key not in after],
+            "changed": [key for key, digest in after.items() if key in before and before[key] != digest],
+        }
+        if any(entry.values()):
+            diff[collection] = entry
+    return diff
+
+class SnapshotRequest(BaseModel):
+    label: Optional[str] = None
+
+@api_router.get("/history")
+async def list_versions():
+    """Stored versions of the map, newest first"""
+    return {"versions": await run_io(history.listing)}
+
+@api_router.post("/history", status_code=201)
+async def create_version(request: SnapshotRequest):
+    """Snapshot the map now; labelled (manual) versions are never thinned out by retention"""
+    await current_mind_map_state()
+    return await run_io(history.snapshot, request.label or 'manual')
+
+@api_router.get("/history/diff")
+async def diff_versions(from_version: int = Query(..., alias='from'), to_version: Optional[int] = Query(None, alias='to')):
+    """Entity ids added, removed and changed between two versions (to defaults to the live map)"""
+    old = await run_io(history.manifest, from_version)
+    if to_version is None:
+        await current_mind_map_state()
+        revision, new = await run_io(history.current_manifest)
+        target = {"revision": revision}
+    else:
+        new = await run_io(history.manifest, to_version)
+        target = {"version": to_version}
+    return {"from": from_version, "to": target, "collections": _manifest_diff(old, new)}
+
+@api_router.get("/history/{version}", response_model=MindMapData)
+async def get_version(version: int):
+    """The whole map as it was at a version"""
+    return await run_io(history.load, version)
+
+@api_router.post("/history/{version}/restore")
+async def restore_version(version: int, response: Response,
+                          expected: Optional[List[WritePrecondition]] = Depends(write_precondition)):
+    """
+    Make a version the live map, through the normal save path. Unsnapshotted
+    changes are recorded first, so a restore can itself be undone.
+    """
+    data = await run_io(history.load, version)
+    async with write_lock:
+        await current_mind_map_state()
+        mindmap_store.check_precondition(expected)
+        await run_io(history.snapshot)
+        revision = await run_io(save_mind_map_data, data, expected)
+        restored = await run_io(history.snapshot, f"restored version {version}")
+    _revision_headers(response, revision)
+    return {"message": f"Restored version {version}", "revision": revision, "version": restored}
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Event-loop lag and I/O executor load, for spotting handlers that block the loop"""
+    return {
+        "event_loop_lag": loop_lag_monitor.snapshot(),
+        "io_executor": {"workers": IO_WORKERS, "in_flight": _in_flight['io']},
+        "encode_executor": {"workers": ENCODE_WORKERS, "in_flight": _in_flight['encode']},
+        "write_behind": {"interval_ms": mindmap_store.write_behind_ms,
+                         "pending": mindmap_store.pending_writes, "flushes": mindmap_store.flush_count},
+        "change_feed": {"subscribers": change_feed.subscribers, "published": change_feed.published,
+                        "resyncs": change_feed.resyncs},
+        "pdf_jobs": pdf_jobs.counts(),
+        "history_versions": len(history.versions),
+        "revision": mindmap_store.revision,
+    }
+
+@app.on_event("startup")
+async def start_loop_lag_monitor():
+    loop_lag_monitor.start()
+
+@app.on_event("startup")
+async def check_file_locking():
+    if not InterProcessLock.available():
+        logger.error("No file locking on this platform: writes from several server processes sharing "
+                     f"{ROOT_DIR} are NOT serialized. Run a single worker process.")
+
+@app.on_event("shutdown")
+async def stop_loop_lag_monitor():
+    # io_executor is left running: its threads finish queued writes and are joined at interpreter exit
+    await loop_lag_monitor.stop()
+
+@app.on_event("startup")
+async def start_pdf_jobs():
+    pdf_jobs.start()
+    await _backfill_pdf_jobs()
+
+@app.on_event("shutdown")
+async def stop_pdf_jobs():
+    await pdf_jobs.stop()
+
+@app.on_event("shutdown")
+async def flush_pending_writes():
+    await run_io(mindmap_store.flush)
+
+@app.on_event("shutdown")
+async def snapshot_history():
+    await run_io(history.snapshot)
+
+@app.on_event("shutdown")
+async def save_search_index():
+    await run_io(search_index.save)
+
 # Include the router in the main app
 app.include_router(api_router)
 
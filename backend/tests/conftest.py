@@ -0,0 +1,53 @@
+"""
+Paths, storage mode and other settings are read when server.py is imported, so
+each test imports a fresh copy of the module against its own scratch data
+directory (MINDMAP_DATA_DIR=tmp_path).
+
+Run from the backend directory: python -m pytest tests
+"""
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture
+def load_server(tmp_path, monkeypatch):
+    """Import server.py with MINDMAP_DATA_DIR=tmp_path plus any MINDMAP_* overrides"""
+    loaded = []
+
+    def load(**env):
+        monkeypatch.setenv('MINDMAP_DATA_DIR', str(tmp_path))
+        # No background snapshots or extraction workers racing the assertions
+        monkeypatch.setenv('MINDMAP_HISTORY_INTERVAL', '0')
+        monkeypatch.setenv('MINDMAP_PDF_WORKERS', '0')
+        for name, value in env.items():
+            monkeypatch.setenv(name, str(value))
+        sys.modules.pop('server', None)
+        module = importlib.import_module('server')
+        loaded.append(module)
+        return module
+
+    yield load
+    for module in loaded:
+        module.mindmap_store.flush()
+    sys.modules.pop('server', None)
+
+
+@pytest.fixture
+def server(load_server):
+    return load_server()
+
+
+@pytest.fixture
+def client(server):
+    return TestClient(server.app)
+
+
+def reload_data(server):
+    """Read the map back from the data directory with a fresh backend and store"""
+    return server.MindMapStore(server.create_storage_backend()).state().data
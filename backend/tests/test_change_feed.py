@@ -0,0 +1,84 @@
+"""
+The event stream never ends, so these tests drive the ASGI app directly rather
+than through TestClient, which waits for the whole response body.
+"""
+import asyncio
+import json
+
+EVENTS_PATH = '/api/mindmap-data/events'
+
+
+class EventStream:
+    def __init__(self, app, hold_headers: bool = False):
+        self.app = app
+        self.sent: asyncio.Queue = asyncio.Queue()
+        self.disconnected = asyncio.Event()
+        self.hold_headers = hold_headers  # a client gone before the response could start
+        self.buffer = ''
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if self.hold_headers and message['type'] == 'http.response.start':
+            await asyncio.Event().wait()
+        await self.sent.put(message)
+
+    def start(self) -> asyncio.Task:
+        scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                 'scheme': 'http', 'path': EVENTS_PATH, 'raw_path': EVENTS_PATH.encode(), 'root_path': '',
+                 'query_string': b'', 'headers': [(b'host', b'testserver')],
+                 'client': ('testclient', 50000), 'server': ('testserver', 80)}
+        return asyncio.create_task(self.app(scope, self.receive, self.send))
+
+    async def next_event(self) -> dict:
+        """The next event as {field: value}, skipping comments and the retry hint"""
+        while True:
+            while '\n\n' in self.buffer:
+                block, self.buffer = self.buffer.split('\n\n', 1)
+                fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+                if 'event' in fields:
+                    return fields
+            message = await asyncio.wait_for(self.sent.get(), 5)
+            if message['type'] == 'http.response.body':
+                self.buffer += message['body'].decode()
+
+
+def test_commit_is_delivered_after_ready_and_disconnect_unsubscribes(server):
+    topic = server.load_mind_map_data().topics[0]
+
+    async def scenario():
+        stream = EventStream(server.app)
+        task = stream.start()
+        ready = await stream.next_event()
+        assert ready['event'] == 'ready'
+        assert server.change_feed.subscribers == 1
+
+        revision = server.mindmap_store.commit(
+            [['put', 'topics', topic.id, topic.model_copy(update={'title': 'live'})]])
+        change = await stream.next_event()
+        assert change['event'] == 'change'
+        assert change['id'] == str(revision) and int(ready['id']) < revision
+        op, collection, key, value = json.loads(change['data'])['ops'][0]
+        assert (op, collection, key, value['title']) == ('put', 'topics', topic.id, 'live')
+
+        stream.disconnected.set()
+        await asyncio.wait_for(task, 5)
+        assert server.change_feed.subscribers == 0
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_before_the_first_event_leaves_no_subscriber(server):
+    server.load_mind_map_data()
+
+    async def scenario():
+        stream = EventStream(server.app, hold_headers=True)
+        task = stream.start()
+        await asyncio.sleep(0.1)
+        stream.disconnected.set()
+        await asyncio.wait_for(task, 5)
+        assert server.change_feed.subscribers == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,75 @@
+def add(client, collection, **fields):
+    response = client.post(f'/api/{collection}', json=fields)
+    assert response.status_code == 201
+    return response.json()['id']
+
+
+def pages(client, path, **params):
+    """Follow X-Next-Cursor to the end: the id lists of each page"""
+    result, cursor = [], None
+    while True:
+        response = client.get(path, params={**params, **({'cursor': cursor} if cursor else {})})
+        assert response.status_code == 200
+        result.append([item['id'] for item in response.json()])
+        cursor = response.headers.get('x-next-cursor')
+        if cursor is None:
+            return result
+        assert cursor == result[-1][-1]
+
+
+def test_pages_cover_the_filtered_collection_once(server, client):
+    server.load_mind_map_data()
+    paged = [add(client, 'topics', title=f'Paged {n}', category='Paged') for n in range(7)]
+    add(client, 'topics', title='Elsewhere', category='Other')
+    assert pages(client, '/api/topics', category='Paged', limit=3) == [paged[:3], paged[3:6], paged[6:]]
+    # A page that ends exactly at the last match has no next cursor
+    assert pages(client, '/api/topics', category='Paged', limit=7) == [paged]
+    everything = [topic.id for topic in server.load_mind_map_data().topics]
+    assert sum(pages(client, '/api/topics', limit=4), []) == everything
+    assert client.get('/api/topics', params={'cursor': 'no-such-id'}).status_code == 400
+    assert client.get('/api/topics', params={'limit': 0}).status_code == 422
+
+
+def test_filters_match_each_collections_fields(server, client):
+    server.load_mind_map_data()
+    topic = add(client, 'topics', title='Filtered', category='Filter')
+    urgent = add(client, 'tasks', title='Urgent', priority='high', linked_topic_id=topic)
+    later = add(client, 'tasks', title='Later', priority='low', linked_topic_id=topic)
+    client.patch(f'/api/tasks/{later}', json={'status': 'completed'})
+    paper = add(client, 'literature', title='Paper', linked_topics=[topic])
+
+    def ids(path, **params):
+        response = client.get(path, params=params)
+        assert response.status_code == 200
+        return [item['id'] for item in response.json()]
+
+    assert ids('/api/tasks', linked_topic=topic) == [urgent, later]
+    assert ids('/api/tasks', linked_topic=topic, priority='high') == [urgent]
+    assert ids('/api/tasks', linked_topic=topic, status='completed') == [later]
+    assert ids('/api/literature', linked_topic=topic) == [paper]
+    assert ids('/api/topics', category='Filter') == [topic]
+    unsupported = client.get('/api/topics', params={'priority': 'high'})
+    assert unsupported.status_code == 400
+    assert 'priority' in unsupported.json()['detail']
+
+
+def test_fields_project_each_item(server, client):
+    server.load_mind_map_data()
+    topics = client.get('/api/topics', params={'fields': 'title, position'}).json()
+    assert topics and all(set(topic) == {'id', 'title', 'position'} for topic in topics)
+    assert [topic['title'] for topic in topics] == [topic.title for topic in server.load_mind_map_data().topics]
+    connections = client.get('/api/connections', params={'fields': 'source'}).json()
+    assert all(set(connection) <= {'id', 'source'} for connection in connections)
+    unknown = client.get('/api/topics', params={'fields': 'title,shoe_size'})
+    assert unknown.status_code == 400
+    assert 'shoe_size' in unknown.json()['detail']
+
+
+def test_delta_responses_are_filtered_and_projected_too(server, client):
+    server.load_mind_map_data()
+    revision = server.mindmap_store.revision
+    kept = add(client, 'topics', title='Kept', category='Delta')
+    add(client, 'topics', title='Dropped', category='Other')
+    body = client.get('/api/topics', params={'since': revision, 'category': 'Delta', 'fields': 'title'}).json()
+    assert body['full'] is False
+    assert body['items'] == [{'id': kept, 'title': 'Kept'}]
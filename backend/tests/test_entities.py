@@ -0,0 +1,56 @@
+import random
+
+from conftest import reload_data
+
+
+def node_ids(connection):
+    return {connection['source'], connection['target']}
+
+
+def test_deleting_a_topic_cleans_up_every_reference(server, client):
+    data = server.load_mind_map_data()
+    topic = data.topics[0]
+    task = data.tasks[0]
+    client.patch(f'/api/tasks/{task.id}', json={'linked_topic_id': topic.id})
+    client.post('/api/connections', json={'source': f'topic-{topic.id}', 'target': f'task-{task.id}'})
+    assert any(topic.id in case.linked_topics for case in server.load_mind_map_data().cases)
+
+    response = client.delete(f'/api/topics/{topic.id}')
+    assert response.status_code == 200
+
+    data = server.load_mind_map_data()
+    assert server.mindmap_store.lookup('topics', topic.id) is None
+    assert all(topic.id not in item.linked_topics for item in data.cases + data.literature)
+    assert all(item.linked_topic_id != topic.id for item in data.tasks)
+    assert all(f'topic-{topic.id}' not in node_ids(connection) for connection in data.connections)
+    assert reload_data(server).model_dump() == data.model_dump()
+
+
+def test_deleting_a_case_unlinks_tasks_and_drops_its_connections(server, client):
+    data = server.load_mind_map_data()
+    case, task = data.cases[0], data.tasks[0]
+    client.patch(f'/api/tasks/{task.id}', json={'linked_case_id': case.id})
+    client.post('/api/connections', json={'source': f'case-{case.id}', 'target': f'task-{task.id}'})
+
+    assert client.delete(f'/api/cases/{case.id}').status_code == 200
+
+    data = server.load_mind_map_data()
+    assert server.mindmap_store.lookup('tasks', task.id).linked_case_id is None
+    assert all(f'case-{case.id}' not in node_ids(connection) for connection in data.connections)
+    assert client.get(f'/api/cases/{case.id}').status_code == 404
+
+
+def test_batched_deletes_keep_order_and_index_in_sync(server):
+    rng = random.Random(3)
+    data = server.MindMapData(topics=[server.PsychiatricTopic(id=f't{i}', title=str(i), category='c')
+                                      for i in range(50)])
+    index = server._build_index(data)
+    deleted = rng.sample(range(50), 15)
+    ops = [['del', 'topics', f't{i}', None] for i in deleted]
+    # Re-added in the same batch: it goes to the end
+    ops.append(['put', 'topics', f't{deleted[0]}', data.topics[deleted[0]]])
+    server._apply_ops(data, ops, index)
+
+    expected = [f't{i}' for i in range(50) if i not in deleted] + [f't{deleted[0]}']
+    assert [topic.id for topic in data.topics] == expected
+    assert index == server._build_index(data)
@@ -0,0 +1,42 @@
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def saturate(server):
+    """Occupy every thread of an executor until the test ends (or 10 seconds pass)"""
+    release = threading.Event()
+
+    def fill(executor, workers):
+        for _ in range(workers):
+            executor.submit(release.wait, 10)
+
+    yield fill
+    release.set()
+
+
+def timed(call):
+    started = time.monotonic()
+    response = call()
+    return response, time.monotonic() - started
+
+
+def test_cached_reads_do_not_wait_for_the_io_executor(server, client, saturate):
+    topic = server.load_mind_map_data().topics[0]
+    saturate(server.io_executor, server.IO_WORKERS)
+
+    response, elapsed = timed(lambda: client.get(f'/api/topics/{topic.id}'))
+    assert response.status_code == 200
+    assert elapsed < 2
+
+
+def test_writes_do_not_queue_behind_response_encoding(server, client, saturate):
+    topic = server.load_mind_map_data().topics[0]
+    saturate(server.encode_executor, server.ENCODE_WORKERS)
+
+    response, elapsed = timed(lambda: client.patch(f'/api/topics/{topic.id}', json={'title': 'renamed'}))
+    assert response.status_code == 200
+    assert elapsed < 2
+    assert server.mindmap_store.lookup('topics', topic.id).title == 'renamed'
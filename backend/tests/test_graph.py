@@ -0,0 +1,72 @@
+def add(client, collection, **fields):
+    response = client.post(f'/api/{collection}', json=fields)
+    assert response.status_code == 201
+    return response.json()['id']
+
+
+def connect(client, source, target):
+    return add(client, 'connections', source=source, target=target)
+
+
+def chain(server, client):
+    """topic a - topic b (connection) - task (linked_topic_id) - case (linked_case_id), plus an island"""
+    server.load_mind_map_data()
+    a = add(client, 'topics', title='A', category='Graph')
+    b = add(client, 'topics', title='B', category='Graph')
+    case = add(client, 'cases', case_id='G-1', encounter_date='2024-01-01T00:00:00',
+               primary_diagnosis='MDD', chief_complaint='low mood')
+    task = add(client, 'tasks', title='Follow up', linked_topic_id=b, linked_case_id=case)
+    island = add(client, 'topics', title='Island', category='Graph')
+    connect(client, f'topic-{a}', f'topic-{b}')
+    # Warm the index so the edits in the tests go through the incremental path
+    client.get(f'/api/graph/neighbors/topic-{a}')
+    return f'topic-{a}', f'topic-{b}', f'task-{task}', f'case-{case}', f'topic-{island}'
+
+
+def neighbors(client, node):
+    response = client.get(f'/api/graph/neighbors/{node}')
+    assert response.status_code == 200
+    return {neighbor['node_id']: [edge['kind'] for edge in neighbor['edges']]
+            for neighbor in response.json()['neighbors']}
+
+
+def path(client, source, target):
+    return client.get('/api/graph/path', params={'source': source, 'target': target})
+
+
+def test_neighbors_cover_every_kind_of_link(server, client):
+    a, b, task, case, island = chain(server, client)
+    assert neighbors(client, b) == {a: ['connection'], task: ['linked_topic']}
+    assert neighbors(client, task) == {b: ['linked_topic'], case: ['linked_case']}
+    assert neighbors(client, island) == {}
+    assert client.get('/api/graph/neighbors/topic-missing').status_code == 404
+
+
+def test_shortest_path_across_link_kinds(server, client):
+    a, b, task, case, island = chain(server, client)
+    response = path(client, a, case)
+    assert response.status_code == 200
+    body = response.json()
+    assert body['path'] == [a, b, task, case]
+    assert body['length'] == 3
+    assert [edge['kind'] for edge in body['edges']] == ['connection', 'linked_topic', 'linked_case']
+    # A shortcut is found as soon as it exists
+    connect(client, a, case)
+    assert path(client, a, case).json()['path'] == [a, case]
+    assert path(client, a, a).json()['length'] == 0
+    assert path(client, a, island).status_code == 404
+
+
+def test_cascade_delete_drops_the_links_it_removes(server, client):
+    a, b, task, case, _ = chain(server, client)
+    assert client.delete(f'/api/topics/{b.split("-", 1)[1]}').status_code == 200
+    assert neighbors(client, a) == {}
+    # The task survives with only its case link
+    assert neighbors(client, task) == {case: ['linked_case']}
+    assert path(client, a, case).status_code == 404
+    assert path(client, b, case).status_code == 404
+
+    rebuilt = server.GraphIndex(server.mindmap_store)
+    rebuilt.ensure_built()
+    assert rebuilt._incident == server.graph_index._incident
+    assert rebuilt._owned == server.graph_index._owned
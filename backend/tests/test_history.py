@@ -0,0 +1,55 @@
+import threading
+import time
+
+
+def test_load_is_not_broken_by_a_concurrent_prune(server):
+    history = server.history
+    topic = server.load_mind_map_data().topics[0]
+    first = history.snapshot()['version']
+    server.mindmap_store.commit([['put', 'topics', topic.id, topic.model_copy(update={'title': 'renamed'})]])
+    history.snapshot()
+    expected = history.load(first).model_dump()
+
+    reading = threading.Event()
+    object_path = history._object_path
+
+    def slow_object_path(digest):
+        # Stall the load between resolving the manifest and reading the objects
+        reading.set()
+        time.sleep(0.01)
+        return object_path(digest)
+
+    history._object_path = slow_object_path
+    result = {}
+    loader = threading.Thread(target=lambda: result.update(data=history.load(first)))
+    loader.start()
+    reading.wait(5)
+    # Far in the future: every version but the latest is dropped and its objects collected
+    assert history.prune(time.time() + 1000 * 86400) == [first]
+    loader.join(10)
+
+    assert result['data'].model_dump() == expected
+    # The version really was collected: its copy of the topic is gone
+    assert not object_path(history._entity_digest(topic)[1]).exists()
+
+
+def test_objects_are_durable_before_the_version_that_refers_to_them(server, monkeypatch):
+    history = server.history
+    events = []
+    write_tmp, fsync_dir = server._write_bytes_tmp, server._fsync_dir
+    monkeypatch.setattr(server, '_write_bytes_tmp', lambda path, payload: (
+        events.append(('write', path)), write_tmp(path, payload))[1])
+    monkeypatch.setattr(server, '_fsync_dir', lambda path: (events.append(('sync', path)), fsync_dir(path))[1])
+
+    topic = server.load_mind_map_data().topics[0]
+    history.snapshot()
+    events.clear()
+    server.mindmap_store.commit([['put', 'topics', topic.id, topic.model_copy(update={'title': 'synced'})]])
+    version = history.snapshot()['version']
+
+    version_write = events.index(('write', history._version_path(version)))
+    object_path = history._object_path(history._entity_digest(server.mindmap_store.lookup('topics', topic.id))[1])
+    assert events.index(('write', object_path)) < version_write
+    assert events.index(('sync', object_path.parent)) < version_write
+    assert events.index(('sync', history.objects_dir)) < version_write
+    assert events.index(('sync', history.versions_dir)) < events.index(('write', history.index_path))
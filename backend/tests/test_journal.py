@@ -0,0 +1,134 @@
+import os
+import random
+import time
+
+import pytest
+
+from conftest import reload_data
+
+MODES = {
+    'journal': {'MINDMAP_PERSISTENCE': 'journal'},
+    'snapshot': {'MINDMAP_PERSISTENCE': 'snapshot'},
+    'write-behind': {'MINDMAP_PERSISTENCE': 'journal', 'MINDMAP_WRITE_BEHIND_MS': 20},
+}
+NODE_COLLECTIONS = ('topics', 'cases', 'tasks', 'literature')
+
+
+def dump(data):
+    return data.model_dump(mode='json')
+
+
+def edit(server, data, rng, removed):
+    """A copy of data with one random change, made the way the frontend saves (entities are never mutated)"""
+    lists = {name: list(getattr(data, name)) for name in server.COLLECTION_MODELS}
+    collection = rng.choice(NODE_COLLECTIONS)
+    items = lists[collection]
+    roll = rng.random()
+    if items and roll < 0.4:
+        i = rng.randrange(len(items))
+        items[i] = items[i].model_copy(update={'position': {'x': rng.uniform(-500, 500), 'y': rng.uniform(-500, 500)}})
+    elif items and roll < 0.6:
+        i = rng.randrange(len(items))
+        items[i] = items[i].model_copy(update={'notes': f'note {rng.random()}'})
+    elif items and roll < 0.7:
+        removed.append((collection, items.pop(rng.randrange(len(items)))))
+    elif removed and roll < 0.75:
+        # Re-added under the same id after a delete
+        collection, entity = removed.pop()
+        lists[collection].append(entity)
+    elif roll < 0.85:
+        lists['topics'].append(server.PsychiatricTopic(title=f'Topic {rng.random()}', category='Mood Disorders'))
+    elif lists['connections'] and roll < 0.9:
+        lists['connections'].pop(rng.randrange(len(lists['connections'])))
+    elif lists['topics']:
+        source, target = rng.choice(lists['topics']), rng.choice(lists['topics'])
+        lists['connections'].append({'id': f'conn-{rng.random()}', 'source': f'topic-{source.id}',
+                                     'target': f'topic-{target.id}', 'label': ''})
+    return server.MindMapData.model_construct(**lists)
+
+
+def random_edits(server, count, seed=1):
+    rng = random.Random(seed)
+    removed = []
+    data = server.load_mind_map_data()
+    for step in range(count):
+        if step % 7 == 0 and data.topics:
+            # Per-entity writes take the commit() path with position-only ops
+            topic = rng.choice(data.topics)
+            moved = topic.model_copy(update={'position': {'x': float(step), 'y': -float(step)}})
+            server.mindmap_store.commit([['pos', 'topics', topic.id, moved]])
+            data = server.load_mind_map_data()
+            continue
+        data = edit(server, data, rng, removed)
+        server.save_mind_map_data(data)
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_reload_matches_live_state_after_random_edits(load_server, mode):
+    server = load_server(**MODES[mode])
+    random_edits(server, 300)
+    server.mindmap_store.flush()
+    live = server.mindmap_store.state()
+
+    reloaded = server.MindMapStore(server.create_storage_backend()).state()
+    assert dump(reloaded.data) == dump(live.data)
+    assert reloaded.revision == live.revision
+    assert server.MINDMAP_JOURNAL_FILE.exists() == (mode != 'snapshot')
+
+
+def test_torn_final_journal_line_is_ignored(load_server):
+    server = load_server(MINDMAP_PERSISTENCE='journal')
+    random_edits(server, 20)
+    expected = dump(server.load_mind_map_data())
+    revision = server.mindmap_store.revision
+    with open(server.MINDMAP_JOURNAL_FILE, 'a', encoding='utf-8') as f:
+        f.write('{"rev":999,"ts":"2024-01-01T00:00:00","ops":[["del","topics","')
+
+    reloaded = server.MindMapStore(server.create_storage_backend()).state()
+    assert dump(reloaded.data) == expected
+    assert reloaded.revision == revision
+
+
+def test_write_after_a_torn_tail_survives_a_reload(load_server):
+    server = load_server(MINDMAP_PERSISTENCE='journal')
+    random_edits(server, 5)
+    with open(server.MINDMAP_JOURNAL_FILE, 'a', encoding='utf-8') as f:
+        f.write('{"rev":999,"ts":"2024-01-01T00:00:00","ops":[["put","topics","')
+
+    # As if restarted after the crash: a new process appends to the same journal
+    restarted = server.MindMapStore(server.create_storage_backend())
+    topic = restarted.state().data.topics[0]
+    restarted.commit([['put', 'topics', topic.id, topic.model_copy(update={'title': 'after restart'})]])
+    restarted.commit([['put', 'topics', topic.id, topic.model_copy(update={'title': 'B'})]])
+
+    reloaded = reload_data(server)
+    assert reloaded.topics[0].title == 'B'
+    assert dump(reloaded) == dump(restarted.state().data)
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(load_server):
+    server = load_server(MINDMAP_PERSISTENCE='journal', MINDMAP_JOURNAL_COMPACT_BYTES=1)
+    random_edits(server, 50)
+    deadline = time.monotonic() + 10
+    while server.mindmap_store.backend._compacting and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert not server.mindmap_store.backend._compacting
+    assert not server.MINDMAP_COMPACTING_FILE.exists()
+    _, snapshot_revision = server.decode_mind_map(server.MINDMAP_DATA_FILE.read_bytes())
+    assert snapshot_revision > 1
+    assert dump(reload_data(server)) == dump(server.load_mind_map_data())
+
+
+def test_interrupted_compaction_is_replayed_and_finished(load_server):
+    server = load_server(MINDMAP_PERSISTENCE='journal')
+    random_edits(server, 30, seed=2)
+    # As if the process died after rotating the journal but before writing the snapshot
+    os.replace(server.MINDMAP_JOURNAL_FILE, server.MINDMAP_COMPACTING_FILE)
+    random_edits(server, 30, seed=3)
+    assert dump(reload_data(server)) == dump(server.load_mind_map_data())
+
+    server.mindmap_store.backend._compact(server.mindmap_store)
+    assert not server.MINDMAP_COMPACTING_FILE.exists()
+    assert not server.MINDMAP_JOURNAL_FILE.exists()
+    assert dump(reload_data(server)) == dump(server.load_mind_map_data())
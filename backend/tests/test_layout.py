@@ -0,0 +1,60 @@
+import math
+import random
+
+import pytest
+
+
+@pytest.fixture
+def cluster(server):
+    """400 linked topics packed into a 100 x 100 box, half of them stacked on one spot"""
+    rng = random.Random(5)
+    topics = [server.PsychiatricTopic(id=f't{i}', title=f'Topic {i}', category='Mood Disorders',
+                                      position={'x': 0.0, 'y': 0.0} if i % 2 else
+                                      {'x': rng.uniform(0, 100), 'y': rng.uniform(0, 100)})
+              for i in range(400)]
+    connections = [{'id': f'c{i}', 'source': f'topic-t{i}', 'target': f'topic-t{rng.randrange(400)}', 'label': ''}
+                   for i in range(400)]
+    server.save_mind_map_data(server.MindMapData(topics=topics, connections=connections))
+    return topics
+
+
+def positions(server):
+    return {topic.id: topic.position for topic in server.load_mind_map_data().topics}
+
+
+def test_dry_run_returns_positions_without_saving(server, client, cluster):
+    before, revision = positions(server), server.load_mind_map_state().revision
+
+    response = client.post('/api/layout', json={'dry_run': True, 'iterations': 50})
+    assert response.status_code == 200
+    body = response.json()
+    assert body['saved'] is False
+    assert len(body['positions']) == len(cluster)
+    assert positions(server) == before
+    assert server.load_mind_map_state().revision == revision
+
+
+def test_layout_spreads_a_dense_cluster_with_finite_positions(server, client, cluster):
+    response = client.post('/api/layout', json={'iterations': 100})
+    assert response.status_code == 200
+    assert response.json()['saved'] is True
+
+    saved = positions(server)
+    coordinates = [value for position in saved.values() for value in (position['x'], position['y'])]
+    assert all(math.isfinite(value) for value in coordinates)
+    assert len({(position['x'], position['y']) for position in saved.values()}) == len(cluster)
+    # Linked nodes end up about spacing (150) apart, not packed into the original 100 x 100 box
+    assert max(coordinates) - min(coordinates) > 1000
+
+
+def test_time_budget_stops_the_iterations(server, client, cluster):
+    response = client.post('/api/layout', json={'dry_run': True, 'iterations': 5000, 'time_budget_ms': 10})
+    body = response.json()
+    assert 1 <= body['iterations'] < 5000
+    assert body['elapsed_ms'] < 1000
+
+
+def test_pinned_nodes_keep_their_position(server, client, cluster):
+    pinned = cluster[0]
+    response = client.post('/api/layout', json={'dry_run': True, 'iterations': 20, 'pinned': [f'topic-{pinned.id}']})
+    assert f'topic-{pinned.id}' not in response.json()['positions']
@@ -0,0 +1,21 @@
+def test_full_get_matches_the_stored_map(server, client):
+    response = client.get('/api/mindmap-data')
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/json'
+    assert response.json() == server.load_mind_map_data().model_dump(mode='json')
+
+
+def test_repeated_get_with_etag_is_304(client):
+    etag = client.get('/api/mindmap-data').headers['etag']
+    assert client.get('/api/mindmap-data', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_collection_list_and_delta_encode_models(server, client):
+    data = server.load_mind_map_data()
+    assert client.get('/api/topics').json() == [topic.model_dump(mode='json') for topic in data.topics]
+    revision = int(client.get('/api/mindmap-data').headers['x-revision'])
+    topic = data.topics[0]
+    client.patch(f'/api/topics/{topic.id}', json={'title': 'Renamed'})
+    delta = client.get(f'/api/mindmap-data?since={revision}').json()
+    assert delta['full'] is False
+    assert [item['title'] for item in delta['topics']] == ['Renamed']
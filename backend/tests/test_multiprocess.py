@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from conftest import reload_data
+
+INCREMENTS = 150
+
+# Increments a counter in a topic's notes, retrying on conflicts like a client would
+WORKER = textwrap.dedent('''
+    import sys
+    import time
+    import server
+    store = server.mindmap_store
+    topic_id, count = sys.argv[1], int(sys.argv[2])
+    done = 0
+    while done < count:
+        state = store.state()
+        topic = state.data.topics[state.index['topics'][topic_id]]
+        try:
+            store.commit([['put', 'topics', topic_id, topic.model_copy(update={'notes': str(int(topic.notes) + 1)})]],
+                         [server.WritePrecondition(None, state.revision)])
+        except server.RevisionConflict:
+            continue
+        done += 1
+    while getattr(store.backend, '_compacting', False):
+        time.sleep(0.01)
+''')
+
+
+@pytest.mark.parametrize('env', [
+    {'MINDMAP_PERSISTENCE': 'journal'},
+    # Both workers compact every few records, often at the same time
+    {'MINDMAP_PERSISTENCE': 'journal', 'MINDMAP_JOURNAL_COMPACT_BYTES': '2000'},
+    {'MINDMAP_PERSISTENCE': 'snapshot'},
+    {'MINDMAP_STORAGE': 'sqlite'},
+], ids=['journal', 'compacting-journal', 'snapshot', 'sqlite'])
+def test_two_processes_lose_no_increments(load_server, tmp_path, env):
+    server = load_server(**env)
+    topic = server.load_mind_map_data().topics[0]
+    server.mindmap_store.commit([['put', 'topics', topic.id, topic.model_copy(update={'notes': '0'})]])
+
+    worker_env = dict(os.environ, MINDMAP_DATA_DIR=str(tmp_path), MINDMAP_HISTORY_INTERVAL='0',
+                      MINDMAP_PDF_WORKERS='0', **env)
+    backend_dir = Path(__file__).resolve().parents[1]
+    workers = [subprocess.Popen([sys.executable, '-c', WORKER, topic.id, str(INCREMENTS)], cwd=backend_dir,
+                                env=worker_env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+               for _ in range(2)]
+    logs = [worker.communicate(timeout=120)[0] for worker in workers]
+    assert [worker.returncode for worker in workers] == [0, 0], logs
+    assert not any('Error compacting' in log for log in logs), logs
+
+    reloaded = reload_data(server)
+    assert next(t for t in reloaded.topics if t.id == topic.id).notes == str(2 * INCREMENTS)
@@ -0,0 +1,123 @@
+import pytest
+
+from conftest import reload_data
+
+
+def patch(client, *operations):
+    return client.patch('/api/mindmap-data', json={'operations': list(operations)})
+
+
+def titles(server):
+    return [topic.title for topic in server.load_mind_map_data().topics]
+
+
+def test_add_then_replace_in_one_batch(server, client):
+    revision = server.load_mind_map_state().revision
+    response = patch(
+        client,
+        {'op': 'add', 'collection': 'topics', 'id': 'new-topic',
+         'value': {'title': 'Catatonia', 'category': 'Psychotic Disorders'}},
+        {'op': 'replace', 'collection': 'topics', 'id': 'new-topic', 'value': {'title': 'Catatonia (revised)'}},
+    )
+    assert response.status_code == 200
+    assert response.json()['applied'] == 2
+    assert response.json()['revision'] == revision + 1
+
+    topic = server.mindmap_store.lookup('topics', 'new-topic')
+    assert (topic.title, topic.category) == ('Catatonia (revised)', 'Psychotic Disorders')
+    assert reload_data(server).model_dump() == server.load_mind_map_data().model_dump()
+
+
+def test_remove_then_add_the_same_id_moves_it_to_the_end(server, client):
+    topic = server.load_mind_map_data().topics[0]
+    response = patch(
+        client,
+        {'op': 'remove', 'collection': 'topics', 'id': topic.id},
+        {'op': 'add', 'collection': 'topics', 'id': topic.id, 'value': {'title': 'Recreated', 'category': 'Other'}},
+    )
+    assert response.status_code == 200
+    data = server.load_mind_map_data()
+    assert data.topics[-1].id == topic.id
+    assert data.topics[-1].title == 'Recreated'
+    assert [t.id for t in data.topics].count(topic.id) == 1
+    assert reload_data(server).model_dump() == data.model_dump()
+
+
+def test_add_then_remove_leaves_nothing(server, client):
+    before = titles(server)
+    response = patch(
+        client,
+        {'op': 'add', 'collection': 'topics', 'id': 'temp', 'value': {'title': 'Temp', 'category': 'Other'}},
+        {'op': 'remove', 'collection': 'topics', 'id': 'temp'},
+    )
+    assert response.status_code == 200
+    assert titles(server) == before
+    assert server.mindmap_store.lookup('topics', 'temp') is None
+
+
+@pytest.mark.parametrize('operation, status', [
+    ({'op': 'add', 'collection': 'diagnoses', 'value': {'title': 'x'}}, 422),
+    ({'op': 'move', 'collection': 'topics', 'id': 'x'}, 422),
+    ({'op': 'replace', 'collection': 'topics', 'value': {'title': 'x'}}, 400),
+    ({'op': 'remove', 'collection': 'topics', 'id': 'missing'}, 404),
+    ({'op': 'replace', 'collection': 'topics', 'id': 'missing', 'value': {'title': 'x'}}, 404),
+    ({'op': 'add', 'collection': 'topics', 'value': {'category': 'no title'}}, 422),
+])
+def test_invalid_operations_are_rejected_and_nothing_is_applied(server, client, operation, status):
+    revision = server.load_mind_map_state().revision
+    before = titles(server)
+    valid = {'op': 'add', 'collection': 'topics', 'value': {'title': 'Would be added', 'category': 'Other'}}
+    response = patch(client, valid, operation)
+    assert response.status_code == status
+    assert server.mindmap_store.revision == revision
+    assert titles(server) == before
+
+
+def test_adding_an_existing_id_is_a_conflict(server, client):
+    topic = server.load_mind_map_data().topics[0]
+    response = patch(client, {'op': 'add', 'collection': 'topics', 'id': topic.id,
+                              'value': {'title': 'Duplicate', 'category': 'Other'}})
+    assert response.status_code == 409
+    assert server.mindmap_store.lookup('topics', topic.id).title == topic.title
+
+
+def connection_count(server):
+    return len(server.load_mind_map_data().connections)
+
+
+@pytest.mark.parametrize('value', [
+    {},
+    {'source': 'topic-missing', 'target': 'topic-missing-too'},
+    {'source': 'not a node id', 'target': 'topic-{topic}'},
+], ids=['empty', 'unknown-nodes', 'malformed-source'])
+def test_invalid_connection_adds_are_rejected(server, client, value):
+    topic = server.load_mind_map_data().topics[0]
+    value = {name: end.format(topic=topic.id) for name, end in value.items()}
+    before = connection_count(server)
+    response = patch(client, {'op': 'add', 'collection': 'connections', 'value': value})
+    assert response.status_code == 422
+    assert connection_count(server) == before
+
+
+def test_connection_to_a_node_added_in_the_same_batch(server, client):
+    topic = server.load_mind_map_data().topics[0]
+    response = patch(
+        client,
+        {'op': 'add', 'collection': 'topics', 'id': 'fresh', 'value': {'title': 'Fresh', 'category': 'Other'}},
+        {'op': 'add', 'collection': 'connections', 'id': 'link',
+         'value': {'source': f'topic-{topic.id}', 'target': 'topic-fresh'}},
+    )
+    assert response.status_code == 200
+    assert server.mindmap_store.lookup('connections', 'link')['target'] == 'topic-fresh'
+
+
+def test_connection_to_a_node_removed_in_the_same_batch_is_rejected(server, client):
+    first, second = server.load_mind_map_data().topics[:2]
+    response = patch(
+        client,
+        {'op': 'remove', 'collection': 'topics', 'id': second.id},
+        {'op': 'add', 'collection': 'connections',
+         'value': {'source': f'topic-{first.id}', 'target': f'topic-{second.id}'}},
+    )
+    assert response.status_code == 422
+    assert server.mindmap_store.lookup('topics', second.id) is not None
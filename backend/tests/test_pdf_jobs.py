@@ -0,0 +1,86 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+pytest.importorskip('pypdf')
+
+import pdf_worker  # noqa: E402
+
+
+def make_pdf(text: str) -> bytes:
+    """A one-page PDF showing text in Helvetica"""
+    stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'.encode()
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R '
+        b'/Resources << /Font << /F1 5 0 R >> >> >>',
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    pdf = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(pdf)
+    pdf += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    pdf += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    pdf += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(pdf)
+
+
+def test_extract_pdf_text_counts_terms(tmp_path):
+    path = tmp_path / 'paper.pdf'
+    path.write_bytes(make_pdf('Lithium augmentation in treatment resistant depression. Lithium works.'))
+    result = pdf_worker.extract_pdf_text(str(path), max_pages=10)
+    assert result['pages'] == 1
+    assert result['terms']['lithium'] == 2
+    assert result['summary'].startswith('Lithium augmentation')
+
+
+def test_uploaded_pdf_is_extracted_in_the_worker_pool(load_server):
+    server = load_server(MINDMAP_PDF_WORKERS=1)
+    with TestClient(server.app) as client:
+        upload = client.post('/api/upload-pdf', files={'pdf': ('paper.pdf', make_pdf('Clozapine monitoring'),
+                                                                'application/pdf')})
+        assert upload.status_code == 200
+        job_id = upload.json()['extraction']['job_id']
+        deadline = time.monotonic() + 60
+        while True:
+            job = client.get(f'/api/pdf-jobs/{job_id}').json()
+            if job['status'] not in ('queued', 'running') or time.monotonic() > deadline:
+                break
+            time.sleep(0.1)
+    assert job['status'] == 'done', job
+    assert job['pages'] == 1
+
+
+def link_pdf(server, key, pdf_path):
+    entity = server.Literature(id=key, title=f'Paper {key}', pdf_path=pdf_path)
+    server.mindmap_store.commit([['put', 'literature', key, entity]])
+
+
+def test_pdf_search_resolves_hits_against_one_state(server, client, monkeypatch):
+    pdf_path = '/uploads/lithium.pdf'
+    server.load_mind_map_data()
+    link_pdf(server, 'first', pdf_path)
+    server.pdf_jobs._update(pdf_path, status='running')
+    server.pdf_jobs._finish(pdf_path, {'pages': 3, 'summary': 'Lithium levels', 'chars': 20,
+                                       'terms': {'lithium': 4, 'levels': 1}})
+
+    search = server.pdf_text_index.search
+
+    def search_after_a_commit(*args):
+        # A literature entry linking the same PDF lands while the request is in flight
+        link_pdf(server, 'second', pdf_path)
+        return search(*args)
+
+    monkeypatch.setattr(server.pdf_text_index, 'search', search_after_a_commit)
+    response = client.get('/api/search/pdfs', params={'q': 'lithium'})
+    assert response.status_code == 200
+    hits = {hit['id']: hit for hit in response.json()['hits']}
+    assert set(hits) == {'first', 'second'}
+    assert hits['second']['pages'] == 3
+    assert hits['second']['pdf_path'] == pdf_path
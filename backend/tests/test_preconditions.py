@@ -0,0 +1,67 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+def rename(client, topic_id, title, headers=None, params=None):
+    return client.patch(f'/api/topics/{topic_id}', json={'title': title}, headers=headers or {}, params=params)
+
+
+@pytest.fixture
+def topic_id(server):
+    return server.load_mind_map_data().topics[0].id
+
+
+def test_current_map_revision_is_accepted_and_a_stale_one_is_409(server, client, topic_id):
+    etag = client.get('/api/mindmap-data').headers['etag']
+    assert rename(client, topic_id, 'first', {'If-Match': etag}).status_code == 200
+
+    response = rename(client, topic_id, 'second', {'If-Match': etag})
+    assert response.status_code == 409
+    revision = server.mindmap_store.revision
+    assert response.json()['detail']['revision'] == revision
+    assert response.headers['etag'] == f'"r{revision}"'
+    assert server.mindmap_store.lookup('topics', topic_id).title == 'first'
+
+
+def test_collection_validator_ignores_writes_to_other_collections(server, client, topic_id):
+    map_etag = client.get('/api/mindmap-data').headers['etag']
+    topics_etag = client.get('/api/topics').headers['etag']
+    assert topics_etag.startswith('"topics-r')
+    case_id = server.load_mind_map_data().cases[0].id
+    assert client.patch(f'/api/cases/{case_id}', json={'notes': 'elsewhere'}).status_code == 200
+
+    # A case changed: the whole-map validator is stale, the topics one still holds
+    assert rename(client, topic_id, 'renamed', {'If-Match': map_etag}).status_code == 409
+    assert rename(client, topic_id, 'renamed', {'If-Match': topics_etag}).status_code == 200
+    assert rename(client, topic_id, 'again', {'If-Match': topics_etag}).status_code == 409
+
+
+def test_any_matching_validator_in_the_list_is_enough(client, topic_id):
+    etag = client.get('/api/mindmap-data').headers['etag']
+    assert rename(client, topic_id, 'x', {'If-Match': f'"r0", {etag}'}).status_code == 200
+
+
+def test_revision_query_parameter_is_a_fallback_for_if_match(server, client, topic_id):
+    revision = server.load_mind_map_state().revision
+    assert rename(client, topic_id, 'by query', params={'revision': revision}).status_code == 200
+    assert rename(client, topic_id, 'stale', params={'revision': revision}).status_code == 409
+
+
+def test_unsupported_validator_is_400(client, topic_id):
+    assert rename(client, topic_id, 'x', {'If-Match': '"diagnoses-r1"'}).status_code == 400
+    assert rename(client, topic_id, 'x', {'If-Match': '"abc123"'}).status_code == 400
+
+
+def test_unconditional_writes_are_allowed_by_default(client, topic_id):
+    assert rename(client, topic_id, 'no precondition').status_code == 200
+
+
+def test_required_precondition_rejects_unconditional_writes_with_428(load_server):
+    server = load_server(MINDMAP_REQUIRE_IF_MATCH=1)
+    client = TestClient(server.app)
+    topic_id = server.load_mind_map_data().topics[0].id
+
+    assert rename(client, topic_id, 'x').status_code == 428
+    assert rename(client, topic_id, 'x', {'If-Match': '*'}).status_code == 200
+    etag = client.get('/api/mindmap-data').headers['etag']
+    assert rename(client, topic_id, 'y', {'If-Match': etag}).status_code == 200
@@ -0,0 +1,52 @@
+def add_topic(client, title, **fields):
+    response = client.post('/api/topics', json={'title': title, 'category': 'Search Test', **fields})
+    assert response.status_code == 201
+    return response.json()['id']
+
+
+def search(client, q, **params):
+    response = client.get('/api/search', params={'q': q, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_title_hits_outrank_body_hits(server, client):
+    server.load_mind_map_data()
+    in_notes = add_topic(client, 'Mood charting', notes='Quetiapine augmentation trial')
+    in_title = add_topic(client, 'Quetiapine dosing')
+    result = search(client, 'quetiapine')
+    assert [hit['id'] for hit in result['hits']] == [in_title, in_notes]
+    assert result['hits'][0]['label'] == 'Quetiapine dosing'
+    assert result['hits'][0]['node_id'] == f'topic-{in_title}'
+    # Every term must match; the last one also as a prefix
+    assert [hit['id'] for hit in search(client, 'quetiapine dos')['hits']] == [in_title]
+    assert search(client, 'quetiapine', collection='tasks')['hits'] == []
+
+
+def test_index_follows_updates_and_deletes(server, client):
+    server.load_mind_map_data()
+    key = add_topic(client, 'Vortioxetine')
+    # Built now, so the edits below go through the incremental path
+    assert [hit['id'] for hit in search(client, 'vortioxetine')['hits']] == [key]
+
+    assert client.patch(f'/api/topics/{key}', json={'title': 'Brexpiprazole'}).status_code == 200
+    assert search(client, 'vortioxetine')['hits'] == []
+    renamed = search(client, 'brexpiprazole')
+    assert [hit['id'] for hit in renamed['hits']] == [key]
+    assert renamed['revision'] == server.mindmap_store.revision
+
+    assert client.delete(f'/api/topics/{key}').status_code == 200
+    assert search(client, 'brexpiprazole')['hits'] == []
+
+    rebuilt = server.SearchIndex(server.mindmap_store)
+    rebuilt.ensure_built()
+    assert rebuilt._documents == server.search_index._documents
+    assert rebuilt._vocabulary == server.search_index._vocabulary
+
+
+def test_empty_query_matches_nothing(server, client):
+    server.load_mind_map_data()
+    add_topic(client, 'Lamotrigine')
+    for q in ('', '   ', '!!'):
+        result = search(client, q)
+        assert (result['total'], result['hits']) == (0, [])
@@ -0,0 +1,54 @@
+FAR = 100000.0  # clear of the seed data's positions
+
+
+def add_topic(client, title, x, y):
+    response = client.post('/api/topics', json={'title': title, 'category': 'Spatial',
+                                                'position': {'x': x, 'y': y}})
+    assert response.status_code == 201
+    return response.json()['id']
+
+
+def topics_in(client, *bbox):
+    response = client.get('/api/topics', params={'bbox': ','.join(map(str, bbox))})
+    assert response.status_code == 200
+    return {topic['id'] for topic in response.json()}
+
+
+def nearest(client, x, y, k=1):
+    response = client.get('/api/spatial/nearest', params={'x': x, 'y': y, 'k': k, 'collection': 'topics'})
+    assert response.status_code == 200
+    return response.json()['nodes']
+
+
+def test_bbox_and_nearest(server, client):
+    server.load_mind_map_data()
+    west = add_topic(client, 'West', FAR, FAR)
+    east = add_topic(client, 'East', FAR + 100, FAR)
+    assert topics_in(client, FAR - 10, FAR - 10, FAR + 10, FAR + 10) == {west}
+    # Corners in either order, edges inclusive
+    assert topics_in(client, FAR + 100, FAR, FAR, FAR) == {west, east}
+    assert client.get('/api/topics', params={'bbox': '1,2,3'}).status_code == 400
+
+    closest = nearest(client, FAR + 90, FAR + 5, k=2)
+    assert [node['id'] for node in closest] == [east, west]
+    assert closest[0]['distance'] == (10 ** 2 + 5 ** 2) ** 0.5
+    assert closest[0]['node_id'] == f'topic-{east}'
+
+
+def test_queries_follow_moves_and_deletes(server, client):
+    server.load_mind_map_data()
+    west = add_topic(client, 'West', FAR, FAR)
+    east = add_topic(client, 'East', FAR + 100, FAR)
+    # Built now, so the moves below go through the incremental path
+    assert nearest(client, FAR, FAR)[0]['id'] == west
+
+    moved = client.patch('/api/positions', json={'topics': [[west, -FAR, -FAR], [east, FAR, FAR]]})
+    assert moved.json()['moved'] == 2
+    assert topics_in(client, FAR - 10, FAR - 10, FAR + 10, FAR + 10) == {east}
+    assert topics_in(client, -FAR - 1, -FAR - 1, -FAR + 1, -FAR + 1) == {west}
+    node = nearest(client, -FAR, -FAR)[0]
+    assert (node['id'], node['x'], node['y'], node['distance']) == (west, -FAR, -FAR, 0.0)
+
+    assert client.delete(f'/api/topics/{east}').status_code == 200
+    assert topics_in(client, FAR - 10, FAR - 10, FAR + 10, FAR + 10) == set()
+    assert nearest(client, FAR, FAR)[0]['id'] != east
@@ -0,0 +1,119 @@
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+HEADER = ['First Name', 'Surname', 'Chief Complaint', 'Age', 'Status', 'Visit Date', 'Favourite Colour']
+ROWS = [
+    ['Ada', 'Byron', 'Low mood', '36', 'Active', '2024-03-01', 'blue'],
+    ['', '', '', '', '', '', ''],
+    ['Alan', 'Turing', 'Insomnia', 'forty', 'Active', '2024-03-02', 'green'],
+    ['Grace', 'Hopper', '', '79', 'follow-up', '', 'red'],
+    ['Kurt', 'Goedel', 'Paranoia', '71', 'unknown', 'not a date', ''],
+    ['Emmy', 'Noether', 'Anxiety', '', 'Completed', '2024-03-05', ''],
+]
+
+
+def csv_file(rows):
+    return '\n'.join(','.join(row) for row in [HEADER] + rows).encode()
+
+
+def xlsx_file(rows):
+    from openpyxl import Workbook
+    workbook = Workbook()
+    for row in [HEADER] + rows:
+        workbook.active.append([value or None for value in row])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+FORMATS = {'csv': csv_file, 'xlsx': xlsx_file}
+
+
+def post(client, kind, rows, stream=False, **params):
+    headers = {'Accept': 'application/x-ndjson'} if stream else {}
+    return client.post('/api/import-spreadsheet', params=params, headers=headers,
+                       files={'file': (f'cases.{kind}', FORMATS[kind](rows))})
+
+
+def check_report(result):
+    # Rows 3 (bad age) and 6 (bad status and date) are skipped; the blank row 3 is not an error
+    assert result['rows'] == 5
+    assert result['blank_rows'] == 1
+    assert result['imported'] == 3
+    assert result['error_count'] == 2
+    assert [error['row'] for error in result['errors']] == [4, 6]
+    assert result['errors'][0]['errors'] == ["age: invalid value 'forty'"]
+    assert [message.split(':')[0] for message in result['errors'][1]['errors']] == ['status', 'encounter_date']
+    assert result['incomplete_count'] == 1
+    assert result['incomplete'][0]['row'] == 5
+    assert result['incomplete'][0]['missing'] == ['chief_complaint']
+    assert result['ignored_columns'] == ['Favourite Colour']
+
+
+@pytest.fixture(params=[None, 2], ids=['one-chunk', 'chunked'])
+def chunked_client(request, load_server):
+    server = load_server() if request.param is None else load_server(MINDMAP_IMPORT_CHUNK_ROWS=request.param)
+    server.load_mind_map_data()
+    return server, TestClient(server.app)
+
+
+@pytest.mark.parametrize('kind', FORMATS)
+def test_import_reports_row_errors_and_commits_valid_rows(chunked_client, kind):
+    server, client = chunked_client
+    before = len(server.load_mind_map_data().cases)
+    response = post(client, kind, ROWS)
+    assert response.status_code == 200
+    result = response.json()
+    check_report(result)
+    assert result['revision'] == server.mindmap_store.revision
+    cases = server.load_mind_map_data().cases
+    assert len(cases) == before + 3
+    imported = {case.chief_complaint: case for case in cases[before:]}
+    assert imported['Low mood'].age == 36
+    assert imported['Low mood'].encounter_date.date().isoformat() == '2024-03-01'
+    assert imported[''].status.value == 'follow_up'
+    assert imported['Anxiety'].status.value == 'archived'
+
+
+@pytest.mark.parametrize('kind', FORMATS)
+def test_streamed_import_reports_progress_then_the_summary(chunked_client, kind):
+    server, client = chunked_client
+    response = post(client, kind, ROWS, stream=True)
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    progress, done = lines[:-1], lines[-1]
+    chunk_rows = server.IMPORT_CHUNK_ROWS
+    assert len(progress) == -(-len(ROWS) // chunk_rows)
+    assert [line['event'] for line in progress] == ['progress'] * len(progress)
+    assert done['event'] == 'done'
+    check_report(done)
+    assert done['revision'] == server.mindmap_store.revision
+
+
+def test_dry_run_validates_without_saving(server, client):
+    server.load_mind_map_data()
+    revision = server.mindmap_store.revision
+    before = len(server.load_mind_map_data().cases)
+    response = post(client, 'csv', ROWS, dry_run='true')
+    assert response.status_code == 200
+    result = response.json()
+    check_report(result)
+    assert result['dry_run'] is True
+    assert result['revision'] == revision == server.mindmap_store.revision
+    assert len(server.load_mind_map_data().cases) == before
+
+
+def test_unreadable_uploads_are_rejected(server, client):
+    server.load_mind_map_data()
+    assert client.post('/api/import-spreadsheet',
+                       files={'file': ('cases.pdf', b'%PDF-1.4')}).status_code == 415
+    unrecognised = client.post('/api/import-spreadsheet', files={'file': ('cases.csv', b'foo,bar\n1,2\n')})
+    assert unrecognised.status_code == 400
+    streamed = client.post('/api/import-spreadsheet', headers={'Accept': 'application/x-ndjson'},
+                           files={'file': ('cases.xlsx', b'not a workbook')})
+    error = json.loads(streamed.text.splitlines()[-1])
+    assert (error['event'], error['status']) == ('error', 400)
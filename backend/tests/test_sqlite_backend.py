@@ -0,0 +1,74 @@
+import json
+import sqlite3
+
+from conftest import reload_data
+
+
+def dump(data):
+    return data.model_dump(mode='json')
+
+
+def linked_topic_rows(server):
+    with sqlite3.connect(server.MINDMAP_DB_FILE) as conn:
+        return set(conn.execute('SELECT collection, entity_id, topic_id FROM linked_topics'))
+
+
+def expected_links(data):
+    return {(collection, item.id, topic_id)
+            for collection in ('cases', 'literature')
+            for item in getattr(data, collection)
+            for topic_id in item.linked_topics}
+
+
+def test_first_load_migrates_the_json_file_and_journal(load_server):
+    json_server = load_server(MINDMAP_STORAGE='json')
+    topic = json_server.load_mind_map_data().topics[0]
+    json_server.mindmap_store.commit([['put', 'topics', topic.id, topic.model_copy(update={'title': 'From journal'})]])
+    json_server.mindmap_store.flush()
+    expected = json_server.mindmap_store.state()
+    assert json_server.MINDMAP_JOURNAL_FILE.exists()
+
+    # The database starts out empty; the JSON file is what makes the data "exist"
+    server = load_server(MINDMAP_STORAGE='sqlite')
+    assert server.mindmap_store.backend.exists()
+    migrated = server.mindmap_store.state()
+    assert dump(migrated.data) == dump(expected.data)
+    assert migrated.revision == expected.revision
+    assert server.mindmap_store.lookup('topics', topic.id).title == 'From journal'
+    assert linked_topic_rows(server) == expected_links(migrated.data)
+    assert dump(reload_data(server)) == dump(migrated.data)
+
+
+def test_linked_topics_follow_updates_and_deletes(load_server):
+    server = load_server(MINDMAP_STORAGE='sqlite')
+    store = server.mindmap_store
+    data = server.load_mind_map_data()
+    case, item = data.cases[0], data.literature[0]
+    topic_ids = [topic.id for topic in data.topics]
+
+    store.commit([['put', 'cases', case.id, case.model_copy(update={'linked_topics': topic_ids[:1]})]])
+    store.commit([['put', 'literature', item.id, item.model_copy(update={'linked_topics': topic_ids})]])
+    assert linked_topic_rows(server) == expected_links(server.load_mind_map_data())
+
+    store.commit([['del', 'cases', case.id, None]])
+    rows = linked_topic_rows(server)
+    assert not any(entity_id == case.id for _, entity_id, _ in rows)
+    assert rows == expected_links(server.load_mind_map_data())
+
+    server.save_mind_map_data(server.MindMapData())
+    assert linked_topic_rows(server) == set()
+
+
+def test_commit_from_another_connection_invalidates_the_cache(load_server):
+    server = load_server(MINDMAP_STORAGE='sqlite')
+    topic = server.load_mind_map_data().topics[0]
+    revision = server.mindmap_store.revision
+
+    with sqlite3.connect(server.MINDMAP_DB_FILE) as conn:
+        body = json.loads(conn.execute('SELECT body FROM topics WHERE id = ?', (topic.id,)).fetchone()[0])
+        body['title'] = 'Edited elsewhere'
+        conn.execute('UPDATE topics SET body = ? WHERE id = ?', (json.dumps(body), topic.id))
+        conn.execute("UPDATE meta SET value = ? WHERE key = 'revision'", (str(revision + 5),))
+
+    assert server.mindmap_store.lookup('topics', topic.id).title == 'Edited elsewhere'
+    assert server.mindmap_store.revision == revision + 5
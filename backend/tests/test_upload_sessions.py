@@ -0,0 +1,75 @@
+import hashlib
+import os
+
+import pytest
+
+PDF = b'%PDF-1.4\n' + os.urandom(50_000)
+
+
+def start(client, body=PDF, **extra):
+    return client.post('/api/uploads', json={'filename': 'paper.pdf', 'size': len(body), **extra})
+
+
+def send(client, upload_id, offset, chunk):
+    return client.patch(f'/api/uploads/{upload_id}', content=chunk, headers={'Upload-Offset': str(offset)})
+
+
+def test_upload_resumes_from_the_stored_offset(server, client):
+    upload_id = start(client).json()['upload_id']
+    assert send(client, upload_id, 0, PDF[:20_000]).json()['offset'] == 20_000
+    # As after a restart: the running hash is rebuilt from the partial file
+    server.upload_sessions.hashers.clear()
+
+    status = client.get(f'/api/uploads/{upload_id}')
+    assert status.headers['upload-offset'] == '20000'
+    done = send(client, upload_id, 20_000, PDF[20_000:]).json()
+    assert done['complete'] is True
+    assert done['sha256'] == hashlib.sha256(PDF).hexdigest()
+    assert client.get(done['filePath']).content == PDF
+    assert upload_id not in server.upload_sessions.locks
+    assert client.get(f'/api/uploads/{upload_id}').status_code == 404
+
+
+def test_wrong_offset_is_409_with_the_current_one(client):
+    upload_id = start(client).json()['upload_id']
+    send(client, upload_id, 0, PDF[:1000])
+    response = send(client, upload_id, 0, PDF[:1000])
+    assert response.status_code == 409
+    assert response.headers['upload-offset'] == '1000'
+    assert response.json()['detail']['offset'] == 1000
+
+
+def test_same_content_is_stored_once(server, client):
+    first = client.post('/api/upload-pdf', files={'pdf': ('a.pdf', PDF, 'application/pdf')}).json()
+    second = client.post('/api/upload-pdf', files={'pdf': ('b.pdf', PDF, 'application/pdf')}).json()
+    assert (first['deduplicated'], second['deduplicated']) == (False, True)
+    assert second['filePath'] == first['filePath']
+    assert len(list(server.BLOBS_DIR.glob('*/*.pdf'))) == 1
+
+    # A known hash completes the resumable upload without sending any bytes
+    response = start(client, sha256=first['sha256'])
+    assert response.status_code == 200
+    assert response.json()['complete'] is True
+    assert response.json()['filePath'] == first['filePath']
+
+
+@pytest.mark.parametrize('upload_id', ['not-an-id', '0' * 32])
+def test_unknown_ids_are_404_and_leave_no_lock(server, client, upload_id):
+    assert send(client, upload_id, 0, PDF[:10]).status_code == 404
+    assert client.get(f'/api/uploads/{upload_id}').status_code == 404
+    assert client.delete(f'/api/uploads/{upload_id}').status_code == 404
+    assert server.upload_sessions.locks == {}
+
+
+def test_signature_split_across_requests_is_still_checked(client):
+    body = b'%PXXXXXXXXXXX'
+    upload_id = start(client, body).json()['upload_id']
+    assert send(client, upload_id, 0, body[:2]).status_code == 200
+    assert send(client, upload_id, 2, body[2:]).status_code == 400
+
+
+def test_upload_shorter_than_the_signature_is_rejected(client):
+    body = b'%PD'
+    upload_id = start(client, body).json()['upload_id']
+    assert send(client, upload_id, 0, body).status_code == 400
+    assert client.get(f'/api/uploads/{upload_id}').status_code == 404
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+
+def write_upload(server, name='notes.pdf', size=100_000):
+    body = b'%PDF-1.4\n' + os.urandom(size - 9)
+    (server.UPLOADS_DIR / name).write_bytes(body)
+    return body
+
+
+def test_range_request_returns_206_with_the_slice(server, client):
+    body = write_upload(server)
+    response = client.get('/uploads/notes.pdf', headers={'Range': 'bytes=1000-1999'})
+    assert response.status_code == 206
+    assert response.headers['content-range'] == f'bytes 1000-1999/{len(body)}'
+    assert response.headers['content-length'] == '1000'
+    assert response.content == body[1000:2000]
+
+
+def test_suffix_range_and_full_body_span_read_chunks(server, client):
+    size = server.UPLOAD_SEND_CHUNK_BYTES * 2 + 123
+    body = write_upload(server, size=size)
+    response = client.get('/uploads/notes.pdf', headers={'Range': 'bytes=-500'})
+    assert response.status_code == 206
+    assert response.content == body[-500:]
+    response = client.get('/uploads/notes.pdf')
+    assert response.status_code == 200
+    assert response.content == body
+
+
+def test_unsatisfiable_range_is_416(server, client):
+    body = write_upload(server)
+    response = client.get('/uploads/notes.pdf', headers={'Range': f'bytes={len(body)}-'})
+    assert response.status_code == 416
+    assert response.headers['content-range'] == f'bytes */{len(body)}'
+
+
+@pytest.mark.parametrize('size, header', [
+    (15, 'bytes=-0'),
+    (0, 'bytes=-5'),
+    (0, 'bytes=0-'),
+], ids=['zero-suffix', 'suffix-of-empty', 'start-of-empty'])
+def test_ranges_selecting_no_bytes_are_416(server, client, size, header):
+    (server.UPLOADS_DIR / 'small.pdf').write_bytes(b'x' * size)
+    response = client.get('/uploads/small.pdf', headers={'Range': header})
+    assert response.status_code == 416
+    assert response.headers['content-range'] == f'bytes */{size}'
+
+
+def test_matching_etag_is_304(server, client):
+    write_upload(server)
+    etag = client.get('/uploads/notes.pdf').headers['etag']
+    response = client.get('/uploads/notes.pdf', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response.headers['etag'] == etag
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+
+@pytest.mark.parametrize('accept, expected', [
+    ('application/msgpack', 'application/msgpack'),
+    ('application/x-msgpack', 'application/msgpack'),
+    ('application/json, application/msgpack', 'application/msgpack'),
+    ('application/msgpack;q=0.5, */*;q=0.1', 'application/msgpack'),
+    ('application/json, application/msgpack;q=0', 'application/json'),
+    ('application/json, application/msgpack;q=0.5', 'application/json'),
+    ('application/*;q=0.9, application/msgpack;q=0.8', 'application/json'),
+    ('*/*', 'application/json'),
+    ('', 'application/json'),
+])
+def test_msgpack_negotiation_respects_q_values(client, accept, expected):
+    pytest.importorskip('msgpack')
+    response = client.get('/api/mindmap-data', headers={'Accept': accept})
+    assert response.status_code == 200
+    assert response.headers['content-type'] == expected
+
+
+def test_msgpack_body_decodes_to_the_map(server, client):
+    msgpack = pytest.importorskip('msgpack')
+    response = client.get('/api/mindmap-data', headers={'Accept': 'application/msgpack'})
+    body = msgpack.unpackb(response.content)
+    assert [topic['id'] for topic in body['topics']] == [topic.id for topic in server.load_mind_map_data().topics]
+
+
+def test_full_map_is_gzipped_but_the_ndjson_stream_is_not(client):
+    headers = {'Accept-Encoding': 'gzip'}
+    assert client.get('/api/mindmap-data', headers=headers).headers.get('content-encoding') == 'gzip'
+    response = client.get('/api/mindmap-data/stream', headers=headers)
+    assert response.status_code == 200
+    assert 'content-encoding' not in response.headers
+    assert response.text.endswith('\n')
+
+
+def test_api_responses_are_gzipped_only_when_accepted(client):
+    plain = client.get('/api/mindmap-data', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in plain.headers
+    compressed = client.get('/api/mindmap-data', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['content-encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['vary']
+    assert int(compressed.headers['content-length']) < len(plain.content)
+    # httpx inflates the body, which must be the same document
+    assert compressed.json() == plain.json()
+
+
+def test_small_api_responses_are_sent_as_is(server, client):
+    response = client.get('/api/topics', params={'fields': 'id', 'limit': 1}, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert len(response.content) < server.COMPRESSION_MIN_BYTES
+    assert 'content-encoding' not in response.headers
+
+
+def test_uploads_are_never_gzipped(server, client):
+    (server.UPLOADS_DIR / 'notes.txt').write_text('lithium ' * 4096)
+    response = client.get('/uploads/notes.txt', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert 'content-encoding' not in response.headers
+    partial = client.get('/uploads/notes.txt', headers={'Accept-Encoding': 'gzip', 'Range': 'bytes=0-6'})
+    assert (partial.status_code, partial.content) == (206, b'lithium')
+
+
+def rebuild_from_stream(text):
+    lines = [json.loads(line) for line in text.splitlines()]
+    meta, end = lines[0], lines[-1]
+    assert (meta['kind'], end['kind']) == ('meta', 'end')
+    assert meta['revision'] == end['revision']
+    data = {collection: [] for collection in meta['counts']}
+    for line in lines[1:-1]:
+        data[line['kind']].append(line['data'])
+    assert {collection: len(items) for collection, items in data.items()} == meta['counts']
+    return meta['revision'], data
+
+
+def test_ndjson_stream_rebuilds_the_full_map(server, client, monkeypatch):
+    server.load_mind_map_data()
+    # More topics than one batch, so entities span several chunks
+    monkeypatch.setattr(server, 'STREAM_BATCH_SIZE', 3)
+    for n in range(10):
+        client.post('/api/topics', json={'title': f'Streamed {n}', 'category': 'Stream'})
+
+    response = client.get('/api/mindmap-data/stream')
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    revision, data = rebuild_from_stream(response.text)
+    assert revision == int(response.headers['x-revision']) == server.mindmap_store.revision
+    full = client.get('/api/mindmap-data', headers={'Accept': 'application/json'}).json()
+    assert data == {collection: full[collection] for collection in data}
+
+    again = client.get('/api/mindmap-data/stream', headers={'If-None-Match': response.headers['etag']})
+    assert again.status_code == 304
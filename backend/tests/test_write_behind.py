@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+from conftest import reload_data
+
+
+def dump(data):
+    return data.model_dump(mode='json')
+
+
+def moved(topic, x):
+    return topic.model_copy(update={'position': {'x': float(x), 'y': 0.0}})
+
+
+def test_timer_flushes_a_burst_as_few_writes(load_server):
+    server = load_server(MINDMAP_WRITE_BEHIND_MS=100)
+    store = server.mindmap_store
+    topic = server.load_mind_map_data().topics[0]
+    for x in range(30):
+        store.commit([['pos', 'topics', topic.id, moved(topic, x)]])
+    deadline = time.monotonic() + 5
+    while store.pending_writes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    with store.lock:
+        # The queue empties when a flush starts; the lock waits for it to finish writing
+        assert store.pending_writes == 0
+    assert 1 <= store.flush_count <= 3
+    assert len(server.MINDMAP_JOURNAL_FILE.read_text().splitlines()) == store.flush_count
+    assert dump(reload_data(server)) == dump(server.load_mind_map_data())
+
+
+def test_flush_after_delete_and_readd_keeps_list_order(load_server):
+    server = load_server(MINDMAP_WRITE_BEHIND_MS=60_000)
+    store = server.mindmap_store
+    data = server.load_mind_map_data()
+    first, second = data.topics[0], data.topics[1]
+    store.commit([['pos', 'topics', second.id, moved(second, 1)]])
+    store.flush()
+
+    # Both still queued: the topic now belongs at the end of the list, not in its old slot
+    store.commit([['del', 'topics', first.id, None]])
+    store.commit([['put', 'topics', first.id, moved(first, 2)]])
+    assert store.pending_writes == 1
+    store.flush()
+
+    live = server.load_mind_map_data()
+    assert live.topics[-1].id == first.id
+    assert dump(reload_data(server)) == dump(live)
+
+
+def test_queued_writes_are_flushed_at_exit(tmp_path):
+    script = textwrap.dedent('''
+        import server
+        store = server.mindmap_store
+        topic = server.load_mind_map_data().topics[0]
+        store.commit([['put', 'topics', topic.id, topic.model_copy(update={'title': 'first'})]])
+        store.flush()
+        # The next timer is a minute away: only the atexit flush can write this one
+        store.commit([['put', 'topics', topic.id, topic.model_copy(update={'title': 'written at exit'})]])
+        assert store.pending_writes == 1
+    ''')
+    env = dict(os.environ, MINDMAP_DATA_DIR=str(tmp_path), MINDMAP_WRITE_BEHIND_MS='60000',
+               MINDMAP_HISTORY_INTERVAL='0', MINDMAP_PDF_WORKERS='0')
+    backend_dir = Path(__file__).resolve().parents[1]
+    subprocess.run([sys.executable, '-c', script], cwd=backend_dir, env=env, check=True, capture_output=True)
+
+    journal = (tmp_path / 'mindmap_data.journal').read_text()
+    assert 'written at exit' in journal